@@ -0,0 +1,95 @@
+"""
+Benchmark the /compare word diff: difflib.SequenceMatcher vs word_diff.
+
+Synthetic pairs are thesis-sized (default 120 pages of ~400 words) with a skewed vocabulary
+so common words repeat the way they do in real text; the suspect copy gets inserted,
+deleted and rewritten spans. Real PDF pairs can be given instead.
+
+Usage:
+    cd backend
+    python benchmark_diff.py                        # synthetic 60/120/200-page pairs
+    python benchmark_diff.py --pages 150 --seed 3
+    python benchmark_diff.py source.pdf suspect.pdf
+    python benchmark_diff.py --no-difflib ...       # skip the slow baseline
+"""
+import argparse
+import difflib
+import random
+import time
+from typing import List, Tuple
+
+from word_diff import extra_indices
+
+WORDS_PER_PAGE = 400
+
+
+def _difflib_extra_indices(source: List[str], suspect: List[str]) -> List[int]:
+    # Same as diff_checker.find_extra_indices with DIFF_ENGINE=difflib.
+    sm = difflib.SequenceMatcher(None, source, suspect, autojunk=False)
+    extras = set()
+    for op, _i1, _i2, j1, j2 in sm.get_opcodes():
+        if op in ("insert", "replace"):
+            extras.update(range(j1, j2))
+    return sorted(extras)
+
+
+def synthetic_pair(pages: int, seed: int = 0, edit_rate: float = 0.02) -> Tuple[List[str], List[str]]:
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(20000)]
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]  # Zipf-like: "the", "of", ... dominate
+    source = rng.choices(vocab, weights=weights, k=pages * WORDS_PER_PAGE)
+    suspect: List[str] = []
+    i = 0
+    while i < len(source):
+        r = rng.random()
+        span = rng.randint(1, 40)
+        if r < edit_rate / 3:
+            suspect.extend(rng.choices(vocab, weights=weights, k=span))  # inserted text
+        elif r < 2 * edit_rate / 3:
+            i += span  # deleted text
+            continue
+        elif r < edit_rate:
+            suspect.extend(rng.choices(vocab, weights=weights, k=span))  # rewritten text
+            i += span
+            continue
+        suspect.append(source[i])
+        i += 1
+    return source, suspect
+
+
+def pdf_pair(source_pdf: str, suspect_pdf: str) -> Tuple[List[str], List[str]]:
+    from diff_checker import extract_words_with_positions, load_source
+    suspect = [w["norm"] for w in extract_words_with_positions(suspect_pdf)]
+    return load_source(source_pdf).norms, suspect
+
+
+def _time(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def run(label: str, source: List[str], suspect: List[str], with_difflib: bool = True) -> None:
+    print(f"{label}: {len(source)} source words, {len(suspect)} suspect words")
+    t_new, new = _time(extra_indices, source, suspect)
+    print(f"  word_diff   {t_new:8.3f}s  extra={len(new)}")
+    if with_difflib:
+        t_old, old = _time(_difflib_extra_indices, source, suspect)
+        print(f"  difflib     {t_old:8.3f}s  extra={len(old)}  speedup={t_old / max(t_new, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdfs", nargs="*", help="source.pdf suspect.pdf")
+    parser.add_argument("--pages", type=int, nargs="*", default=[60, 120, 200])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-difflib", action="store_true")
+    args = parser.parse_args()
+
+    if args.pdfs:
+        if len(args.pdfs) != 2:
+            parser.error("give exactly two PDFs: source and suspect")
+        run(f"{args.pdfs[0]} vs {args.pdfs[1]}", *pdf_pair(*args.pdfs), with_difflib=not args.no_difflib)
+    else:
+        for pages in args.pages:
+            run(f"{pages} pages", *synthetic_pair(pages, seed=args.seed), with_difflib=not args.no_difflib)
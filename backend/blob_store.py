@@ -0,0 +1,175 @@
+"""
+Content-addressed blob store for analysis artifacts (uploaded and highlighted PDFs).
+
+Blobs are stored once under artifacts/blobs/<aa>/<sha256> and referenced from results
+by URL (/blobs/<sha256>) instead of being inlined as base64, so result JSON stays small
+and identical PDFs submitted twice share one file. Blobs are immutable: the digest is
+the ETag and clients may cache them forever.
+
+A blob's mtime is its last write; storing an existing blob again refreshes it. The
+housekeeping sweep (prune) removes blobs that have not been written for max_age seconds
+and are not in the caller's set of referenced digests.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Iterable, Optional
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+BLOB_DIR = os.path.join(_THIS_DIR, "artifacts", "blobs")
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_READ_SIZE = 1024 * 1024
+
+
+def is_digest(value: str) -> bool:
+    return bool(value) and bool(_DIGEST_RE.match(value))
+
+
+def blob_path(digest: str) -> str:
+    if not is_digest(digest):
+        raise ValueError(f"Invalid blob digest: {digest!r}")
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
+def blob_url(digest: Optional[str]) -> Optional[str]:
+    return f"/blobs/{digest}" if digest else None
+
+
+def has_blob(digest: str) -> bool:
+    return is_digest(digest) and os.path.isfile(blob_path(digest))
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _touch(path: str) -> bool:
+    """Refresh an existing blob's mtime so prune() keeps it; False if it does not exist."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def put_file(path: str, digest: str = None) -> str:
+    """Copy a file into the store (no-op if already present) and return its sha256."""
+    digest = digest or file_sha256(path)
+    dest = blob_path(digest)
+    if _touch(dest):
+        return digest
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # Copy to a temp name in the same directory, then rename, so readers never see a partial blob.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as out, open(path, "rb") as src:
+            shutil.copyfileobj(src, out, _READ_SIZE)
+        os.replace(tmp, dest)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return digest
+
+
+def put_bytes(data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    dest = blob_path(digest)
+    if _touch(dest):
+        return digest
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as out:
+        out.write(data)
+    os.replace(tmp, dest)
+    return digest
+
+
+def prune(max_age: float, keep: Iterable[str] = ()) -> int:
+    """Delete blobs (and leftover temp files) not written for max_age seconds, except those in keep."""
+    if not os.path.isdir(BLOB_DIR):
+        return 0
+    keep = set(keep)
+    cutoff = time.time() - max_age
+    removed = 0
+    for prefix in os.listdir(BLOB_DIR):
+        shard = os.path.join(BLOB_DIR, prefix)
+        if not os.path.isdir(shard):
+            continue
+        for name in os.listdir(shard):
+            if name in keep or not (is_digest(name) or name.startswith(".tmp-")):
+                continue
+            path = os.path.join(shard, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def count() -> int:
+    if not os.path.isdir(BLOB_DIR):
+        return 0
+    return sum(
+        1 for prefix in os.listdir(BLOB_DIR) if os.path.isdir(os.path.join(BLOB_DIR, prefix))
+        for name in os.listdir(os.path.join(BLOB_DIR, prefix)) if is_digest(name)
+    )
+
+
+def resolve_artifact_url(url: Optional[str]) -> Optional[str]:
+    """Local file path for a /blobs/<digest> or legacy /artifacts/<name> URL, or None."""
+    if not url:
+        return None
+    if "/blobs/" in url:
+        digest = url.rsplit("/blobs/", 1)[-1].split("?", 1)[0]
+        return blob_path(digest) if has_blob(digest) else None
+    if "/artifacts/" in url:
+        name = os.path.basename(url.rsplit("/artifacts/", 1)[-1])
+        path = os.path.join(_THIS_DIR, "artifacts", name)
+        return path if name and os.path.isfile(path) else None
+    return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Parse a single 'bytes=start-end' Range header into (start, end) inclusive.
+    Returns None when absent or unsupported (multi-range), raises ValueError when unsatisfiable."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[6:].strip().partition("-")
+    if start_s == "":
+        # Suffix range: last N bytes.
+        length = int(end_s)
+        if length <= 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def iter_file(path: str, start: int = 0, end: int = None):
+    """Yield the bytes of path[start:end+1] in chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (end - start + 1) if end is not None else None
+        while remaining is None or remaining > 0:
+            n = _READ_SIZE if remaining is None else min(_READ_SIZE, remaining)
+            block = f.read(n)
+            if not block:
+                break
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
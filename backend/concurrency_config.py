@@ -0,0 +1,247 @@
+"""
+Unified thread configuration for the scan pipeline.
+
+find_matches runs MAX_CONCURRENT_WORKERS candidate threads while torch (encode_chunks),
+BLAS (numpy matmuls) and FAISS (OpenMP) each size their own pools to every core, so a
+scan oversubscribes the CPU. This module decides all of those numbers in one place:
+
+    defaults (derived from os.cpu_count())
+      < concurrency.json (written by `python concurrency_config.py autotune`)
+      < environment variables (SCAN_WORKERS, TORCH_INTRA_OP_THREADS, TORCH_INTER_OP_THREADS,
+                               BLAS_THREADS, FAISS_THREADS)
+
+Import it before numpy so the OpenMP/BLAS variables take effect. torch settings are applied
+by embedding_pipeline when torch is first loaded. FAISS is sized per search (apply_faiss):
+omp_set_num_threads only changes the calling thread, and searches run in worker threads
+that otherwise start from OMP_NUM_THREADS, i.e. the per-worker BLAS share.
+
+Usage:
+    cd backend
+    python concurrency_config.py show
+    python concurrency_config.py autotune
+"""
+import json
+import os
+import sys
+import time
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.getenv("CONCURRENCY_CONFIG_PATH", os.path.join(_THIS_DIR, "concurrency.json"))
+
+_ENV_KEYS = {
+    "scan_workers": "SCAN_WORKERS",
+    "torch_intra_op_threads": "TORCH_INTRA_OP_THREADS",
+    "torch_inter_op_threads": "TORCH_INTER_OP_THREADS",
+    "blas_threads": "BLAS_THREADS",
+    "faiss_threads": "FAISS_THREADS",
+}
+_BLAS_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def _defaults() -> dict:
+    cpu = os.cpu_count() or 4
+    workers = min(4, cpu)
+    # Encoding and FAISS search run between the candidate phases, so they may use every
+    # core; numpy calls made from inside the candidate threads get a per-worker share.
+    per_worker = max(1, cpu // workers)
+    return {
+        "scan_workers": workers,
+        "torch_intra_op_threads": cpu,
+        "torch_inter_op_threads": 1,
+        "blas_threads": per_worker,
+        "faiss_threads": cpu,
+    }
+
+
+def load_config() -> dict:
+    """Resolve the effective configuration (defaults < persisted file < environment).
+    cfg["sources"] records which layer each value came from."""
+    cfg = _defaults()
+    sources = {key: "defaults" for key in _ENV_KEYS}
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        for key in _ENV_KEYS:
+            if key in saved and int(saved[key]) > 0:
+                cfg[key] = int(saved[key])
+                sources[key] = "autotune"
+    except (OSError, ValueError, TypeError):
+        pass
+    for key, env in _ENV_KEYS.items():
+        val = os.getenv(env)
+        if val and val.isdigit() and int(val) > 0:
+            cfg[key] = int(val)
+            sources[key] = "env"
+    cfg["sources"] = sources
+    return cfg
+
+
+def save_config(cfg: dict) -> None:
+    data = {k: int(cfg[k]) for k in _ENV_KEYS}
+    data["tuned_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    data["cpu_count"] = os.cpu_count()
+    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+CONFIG = load_config()
+
+
+def apply_env(cfg: dict = None) -> None:
+    """Set OpenMP/BLAS thread env vars. Only effective before numpy/torch are imported.
+    Variables already set by the operator are left alone."""
+    cfg = cfg or CONFIG
+    for var in _BLAS_ENV_VARS:
+        os.environ.setdefault(var, str(cfg["blas_threads"]))
+
+
+def apply_torch(cfg: dict = None) -> None:
+    """Size torch's intra-op and inter-op pools. Safe to call more than once."""
+    cfg = cfg or CONFIG
+    try:
+        import torch
+    except ImportError:
+        return
+    try:
+        torch.set_num_threads(cfg["torch_intra_op_threads"])
+    except Exception:
+        pass
+    try:
+        # Raises once inter-op work has started; the first caller wins.
+        torch.set_num_interop_threads(cfg["torch_inter_op_threads"])
+    except Exception:
+        pass
+
+
+def apply_faiss(faiss_module, cfg: dict = None) -> None:
+    """Set FAISS's OpenMP thread count for the calling thread; call it in the thread that searches."""
+    cfg = cfg or CONFIG
+    try:
+        faiss_module.omp_set_num_threads(cfg["faiss_threads"])
+    except Exception:
+        pass
+
+
+apply_env()
+
+
+# =============================================================================
+# AUTOTUNE
+# =============================================================================
+
+def _candidate_configs() -> list:
+    cpu = os.cpu_count() or 4
+    sizes = sorted({n for n in (1, 2, 4, 8, cpu) if n <= cpu})
+    configs = []
+    for workers in sizes:
+        for threads in sizes:
+            if workers * threads > cpu * 2:
+                continue
+            configs.append({
+                "scan_workers": workers,
+                "torch_intra_op_threads": threads,
+                "torch_inter_op_threads": 1,
+                "blas_threads": threads,
+                "faiss_threads": threads,
+            })
+    return configs
+
+
+def _bench_workload() -> dict:
+    """One scan-shaped workload: encode, vector search, parallel lexical scoring. Runs in a child process."""
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    import embedding_pipeline as ep
+
+    rng = np.random.default_rng(0)
+    words = ("model data learning network result method analysis system paper study "
+             "accuracy training neural feature test sample approach value process design").split()
+    chunks = [" ".join(rng.choice(words, 150)) for _ in range(96)]
+    timings = {}
+
+    t = time.perf_counter()
+    try:
+        query = ep.encode_chunks(chunks[:64])
+    except Exception:
+        query = None  # model not downloaded; time the rest only
+    timings["encode"] = time.perf_counter() - t
+
+    repo = rng.standard_normal((20000, 768)).astype(np.float32)
+    repo /= np.linalg.norm(repo, axis=1, keepdims=True)
+    q = query if query is not None else rng.standard_normal((64, 768)).astype(np.float32)
+    t = time.perf_counter()
+    import faiss_index
+    faiss = faiss_index._load_faiss()
+    if faiss is not None:
+        index = faiss.IndexFlatIP(repo.shape[1])
+        index.add(repo)
+        apply_faiss(faiss)
+        index.search(np.ascontiguousarray(q, dtype=np.float32), 50)
+    else:
+        q @ repo.T
+    timings["search"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    pairs = [(chunks[i % len(chunks)], chunks[(i * 7) % len(chunks)]) for i in range(4000)]
+
+    def _score(batch):
+        return [ep.lexical_similarity(a, b) + ep.fingerprint_similarity(a, b) for a, b in batch]
+
+    step = max(1, len(pairs) // (ep.MAX_CONCURRENT_WORKERS * 4))
+    with ThreadPoolExecutor(max_workers=ep.MAX_CONCURRENT_WORKERS) as pool:
+        list(pool.map(_score, [pairs[i:i + step] for i in range(0, len(pairs), step)]))
+    timings["candidates"] = time.perf_counter() - t
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def autotune(repeats: int = 2) -> dict:
+    """Benchmark each candidate config in a fresh process and persist the fastest."""
+    import subprocess
+
+    results = []
+    for cfg in _candidate_configs():
+        env = dict(os.environ)
+        for key, var in _ENV_KEYS.items():
+            env[var] = str(cfg[key])
+        for var in _BLAS_ENV_VARS:
+            env[var] = str(cfg["blas_threads"])
+        best = None
+        for _ in range(repeats):
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "_bench"],
+                cwd=_THIS_DIR, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"  {cfg}: failed\n{proc.stderr.strip()[-400:]}")
+                break
+            timings = json.loads(proc.stdout.strip().splitlines()[-1])
+            if best is None or timings["total"] < best["total"]:
+                best = timings
+        if best is None:
+            continue
+        results.append((best["total"], cfg, best))
+        print(
+            f"  workers={cfg['scan_workers']:<2} threads={cfg['torch_intra_op_threads']:<2} "
+            f"encode={best['encode']:.2f}s search={best['search']:.2f}s "
+            f"candidates={best['candidates']:.2f}s total={best['total']:.2f}s"
+        )
+    if not results:
+        raise RuntimeError("autotune: no configuration completed")
+    results.sort(key=lambda r: r[0])
+    _, winner, _ = results[0]
+    save_config(winner)
+    return winner
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "show"
+    if cmd == "_bench":
+        print(json.dumps(_bench_workload()))
+    elif cmd == "autotune":
+        print(f"Autotuning on {os.cpu_count()} CPUs ...")
+        best = autotune()
+        print(f"Best: {best}")
+        print(f"Saved to {CONFIG_PATH}")
+    else:
+        print(json.dumps(CONFIG, indent=2))
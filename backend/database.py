@@ -50,6 +50,11 @@ class DatabaseManager:
                 )
                 conn.commit()
                 print(f"Seeded default admin account: {default_email}")
+
+            self._ensure_job_results_table(cursor)
+            conn.commit()
+            self._migrate_legacy_job_results(conn)
+            self._migrate_db_blobs(conn)
         finally:
             conn.close()
 
@@ -274,6 +279,15 @@ class DatabaseManager:
         return exists
 
     # ==================== JOB RESULTS (persistent across logout) ====================
+    # A saved result is split three ways:
+    #   job_result_summaries - small indexed row per job, enough to list a user's history
+    #   job_result_details   - the full result JSON, compressed (zstd if installed, else gzip)
+    #   job_result_blob_refs - sha256 digests of the PDFs the result points at (source /
+    #                          highlighted); the bytes stay in the on-disk blob store, and the
+    #                          blob sweep keeps every digest listed here
+    # The legacy single-table job_results rows are migrated on startup.
+
+    _SUMMARY_FIELDS = ("overall_similarity", "page_or_slide_count", "chunk_count", "warning")
 
     def _ensure_job_results_table(self, cursor):
         cursor.execute('''
@@ -286,19 +300,170 @@ class DatabaseManager:
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_result_summaries (
+                job_id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                filename TEXT,
+                overall_similarity REAL,
+                match_count INTEGER DEFAULT 0,
+                page_or_slide_count INTEGER DEFAULT 0,
+                chunk_count INTEGER DEFAULT 0,
+                warning TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_result_details (
+                job_id TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                raw_size INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_result_blob_refs (
+                job_id TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (job_id, digest)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_summaries_user_created ON job_result_summaries(user_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_blob_refs_digest ON job_result_blob_refs(digest)")
+
+    @staticmethod
+    def _compress(raw: bytes):
+        try:
+            import zstandard
+            return "zstd", zstandard.ZstdCompressor(level=10).compress(raw)
+        except ImportError:
+            import gzip
+            return "gzip", gzip.compress(raw, compresslevel=6)
+
+    @staticmethod
+    def _decompress(codec: str, payload: bytes) -> bytes:
+        if codec == "zstd":
+            import zstandard
+            return zstandard.ZstdDecompressor().decompress(payload)
+        if codec == "gzip":
+            import gzip
+            return gzip.decompress(payload)
+        return payload
+
+    def _store_job_result(self, cursor, user_id: int, job_id: str, filename: str, result_data: dict, created_at=None):
+        """Write summary + compressed detail + references to the PDF blobs. Caller commits."""
+        import base64
+        import json
+        result_data = dict(result_data)
+        digests = set()
+        # Legacy results inline the PDFs as base64; move them out into the blob store.
+        for b64_key, field in (("source_pdf_base64", "source_pdf"), ("highlighted_pdf_base64", "highlighted_pdf")):
+            b64 = result_data.pop(b64_key, None)
+            if b64 and not result_data.get(f"{field}_sha256"):
+                try:
+                    data = base64.b64decode(b64)
+                except Exception:
+                    continue
+                from blob_store import put_bytes
+                digest = put_bytes(data)
+                result_data[f"{field}_sha256"] = digest
+                result_data[f"{field}_url"] = f"/blobs/{digest}"
+        for field in ("source_pdf_sha256", "highlighted_pdf_sha256"):
+            if result_data.get(field):
+                digests.add(result_data[field])
+
+        raw = json.dumps(result_data).encode("utf-8")
+        codec, payload = self._compress(raw)
+        summary = {k: result_data.get(k) for k in self._SUMMARY_FIELDS}
+        cursor.execute(
+            """INSERT OR REPLACE INTO job_result_summaries
+               (job_id, user_id, filename, overall_similarity, match_count, page_or_slide_count, chunk_count, warning, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+            (job_id, user_id, filename, summary["overall_similarity"], len(result_data.get("matches") or []),
+             summary["page_or_slide_count"] or 0, summary["chunk_count"] or 0, summary["warning"], created_at),
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO job_result_details (job_id, codec, raw_size, payload) VALUES (?, ?, ?, ?)",
+            (job_id, codec, len(raw), payload),
+        )
+        for digest in digests:
+            cursor.execute(
+                "INSERT OR IGNORE INTO job_result_blob_refs (job_id, digest) VALUES (?, ?)",
+                (job_id, digest),
+            )
+
+    def _migrate_legacy_job_results(self, conn):
+        """Move rows from the old single-table job_results into the split tables, one at a time."""
+        import json
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM job_results ORDER BY id")
+        ids = [r[0] for r in cursor.fetchall()]
+        migrated = 0
+        for row_id in ids:
+            cursor.execute(
+                "SELECT user_id, job_id, filename, result_json, created_at FROM job_results WHERE id = ?",
+                (row_id,),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                continue
+            try:
+                result = json.loads(row[3]) if row[3] else {}
+                if not isinstance(result, dict):
+                    raise ValueError("result_json is not an object")
+            except ValueError as e:
+                # Unparseable legacy row: nothing to copy, so drop it rather than retry forever.
+                print(f"Dropping unreadable saved job result {row[1]} (user {row[0]}): {e}")
+                try:
+                    cursor.execute("DELETE FROM job_results WHERE id = ?", (row_id,))
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                continue
+            try:
+                # Copy and delete in one transaction, so a failed copy never loses the row.
+                self._store_job_result(cursor, row[0], row[1], row[2], result, created_at=row[4])
+                cursor.execute("DELETE FROM job_results WHERE id = ?", (row_id,))
+                conn.commit()
+                migrated += 1
+            except Exception as e:
+                # e.g. "database is locked" or disk full: keep the legacy row for the next start.
+                conn.rollback()
+                print(f"Could not migrate saved job result {row[1]} (user {row[0]}), will retry: {e}")
+        if migrated:
+            print(f"Migrated {migrated} saved job results to split storage")
+
+    def _migrate_db_blobs(self, conn):
+        """Move PDF bytes that older versions kept in job_result_blobs out to the blob store,
+        then drop the table."""
+        from blob_store import put_bytes
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'job_result_blobs'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT digest FROM job_result_blobs")
+        digests = [r[0] for r in cursor.fetchall()]
+        try:
+            for digest in digests:
+                cursor.execute("SELECT data FROM job_result_blobs WHERE digest = ?", (digest,))
+                put_bytes(cursor.fetchone()[0])
+            cursor.execute("DROP TABLE job_result_blobs")
+            conn.commit()
+        except Exception as e:
+            # e.g. disk full: keep the table and try again on the next start.
+            conn.rollback()
+            print(f"Could not move saved PDFs out of the database, will retry: {e}")
+            return
+        if digests:
+            print(f"Moved {len(digests)} saved PDFs from the database to the blob store")
 
     def save_job_result(self, user_id: int, job_id: str, filename: str, result_data: dict) -> bool:
         """Save a completed analysis result so it survives logout."""
-        import json
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             self._ensure_job_results_table(cursor)
-            conn.commit()
-            cursor.execute(
-                "INSERT OR REPLACE INTO job_results (user_id, job_id, filename, result_json) VALUES (?, ?, ?, ?)",
-                (user_id, job_id, filename, json.dumps(result_data))
-            )
+            self._store_job_result(cursor, user_id, job_id, filename, result_data)
             conn.commit()
             return True
         except Exception:
@@ -306,48 +471,145 @@ class DatabaseManager:
         finally:
             conn.close()
 
-    def get_user_job_results(self, user_id: int, limit: int = 100) -> List[Dict]:
-        """Fetch all saved results for a user (newest first)."""
-        import json
+    def get_user_job_summaries(self, user_id: int, limit: int = 50, before: Optional[tuple] = None) -> List[Dict]:
+        """List a user's saved results (newest first) from the summary index only.
+        before=(created_at, job_id) continues after the last row of the previous page."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             self._ensure_job_results_table(cursor)
-            conn.commit()
+            where, params = "user_id = ?", [user_id]
+            if before:
+                where += " AND (created_at < ? OR (created_at = ? AND job_id < ?))"
+                params += [before[0], before[0], before[1]]
             cursor.execute(
-                "SELECT job_id, filename, result_json, created_at FROM job_results WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
-                (user_id, limit)
+                f"""SELECT job_id, filename, overall_similarity, match_count, page_or_slide_count, chunk_count, warning, created_at
+                   FROM job_result_summaries WHERE {where} ORDER BY created_at DESC, job_id DESC LIMIT ?""",
+                (*params, limit)
             )
-            rows = cursor.fetchall()
-            results = []
-            for row in rows:
-                try:
-                    results.append({
-                        "job_id": row[0],
-                        "filename": row[1],
-                        "result": json.loads(row[2]),
-                        "created_at": row[3],
-                    })
-                except Exception:
-                    pass
-            return results
+            return [
+                {
+                    "job_id": r[0], "filename": r[1], "overall_similarity": r[2], "match_count": r[3],
+                    "page_or_slide_count": r[4], "chunk_count": r[5], "warning": r[6], "created_at": r[7],
+                }
+                for r in cursor.fetchall()
+            ]
         except Exception:
             return []
         finally:
             conn.close()
 
+    def get_job_result_detail(self, user_id: int, job_id: str) -> Optional[Dict]:
+        """Load and decompress one saved result, or None."""
+        import json
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            self._ensure_job_results_table(cursor)
+            cursor.execute(
+                """SELECT d.codec, d.payload FROM job_result_details d
+                   JOIN job_result_summaries s ON s.job_id = d.job_id
+                   WHERE s.user_id = ? AND s.job_id = ?""",
+                (user_id, job_id)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return json.loads(self._decompress(row[0], row[1]))
+        except Exception:
+            return None
+        finally:
+            conn.close()
+
+    def get_referenced_blob_digests(self) -> set:
+        """Digests of every PDF blob a saved result points at; the blob sweep keeps these."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            self._ensure_job_results_table(cursor)
+            cursor.execute("SELECT DISTINCT digest FROM job_result_blob_refs")
+            return {r[0] for r in cursor.fetchall()}
+        finally:
+            conn.close()
+
     def delete_job_result(self, user_id: int, job_id: str) -> bool:
-        """Delete a saved result for a user."""
+        """Delete a saved result for a user. Its PDF blobs are left to the blob sweep."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             self._ensure_job_results_table(cursor)
             cursor.execute(
-                "DELETE FROM job_results WHERE user_id = ? AND job_id = ?",
+                "DELETE FROM job_result_summaries WHERE user_id = ? AND job_id = ?",
                 (user_id, job_id)
             )
+            deleted = cursor.rowcount > 0
+            if deleted:
+                cursor.execute("DELETE FROM job_result_details WHERE job_id = ?", (job_id,))
+                cursor.execute("DELETE FROM job_result_blob_refs WHERE job_id = ?", (job_id,))
+            conn.commit()
+            return deleted
+        except Exception:
+            return False
+        finally:
+            conn.close()
+
+    # ==================== SCAN RESULT CACHE ====================
+    # Finished repository scans keyed by (content hash, repo_type, owner, model, repo generation,
+    # scan settings fingerprint), stored compressed like saved job details. A repo change bumps
+    # its generation and a settings change its fingerprint, so stale entries simply stop
+    # matching and age out after SCAN_CACHE_TTL_DAYS.
+
+    def _ensure_scan_cache_table(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_cache (
+                cache_key TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                hits INTEGER DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_cache_created ON scan_cache(created_at)")
+
+    def get_cached_scan(self, cache_key: str, max_age_days: float) -> Optional[Dict]:
+        """Return the cached scan result for cache_key, or None if absent or expired."""
+        import json
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            self._ensure_scan_cache_table(cursor)
+            cursor.execute(
+                "SELECT codec, payload FROM scan_cache WHERE cache_key = ? AND created_at >= datetime('now', ?)",
+                (cache_key, f"-{max_age_days} days")
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute("UPDATE scan_cache SET hits = hits + 1 WHERE cache_key = ?", (cache_key,))
+            conn.commit()
+            return json.loads(self._decompress(row[0], row[1]))
+        except Exception:
+            return None
+        finally:
+            conn.close()
+
+    def save_cached_scan(self, cache_key: str, result_data: dict, max_age_days: float) -> bool:
+        """Store a scan result and drop entries older than max_age_days."""
+        import json
+        codec, payload = self._compress(json.dumps(result_data).encode("utf-8"))
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            self._ensure_scan_cache_table(cursor)
+            cursor.execute(
+                "INSERT OR REPLACE INTO scan_cache (cache_key, codec, payload) VALUES (?, ?, ?)",
+                (cache_key, codec, payload)
+            )
+            cursor.execute(
+                "DELETE FROM scan_cache WHERE created_at < datetime('now', ?)", (f"-{max_age_days} days",)
+            )
             conn.commit()
-            return cursor.rowcount > 0
+            return True
         except Exception:
             return False
         finally:
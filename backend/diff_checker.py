@@ -3,16 +3,32 @@ Document Comparison – word-level diff between source & suspect PDFs.
 Extra/added text in the suspect is highlighted in yellow.
 """
 import difflib
+import logging
 import os
 import re
 import shutil
-from typing import Any, Dict, List, Tuple
+from array import array
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import process_pools
+from word_diff import extra_indices as _word_diff_extra_indices
 
 try:
     import fitz
 except ImportError:
     fitz = None
 
+# "patience" (word_diff: patience anchors + Myers, near-linear on long documents) or
+# "difflib" (the original SequenceMatcher diff, quadratic on long documents).
+DIFF_ENGINE = os.getenv("DIFF_ENGINE", "patience").strip().lower()
+# Batch comparisons diff targets in up to COMPARE_WORKERS processes (1 = in-process).
+COMPARE_WORKERS = int(os.getenv("COMPARE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+logger = logging.getLogger(__name__)
+
 
 def _require_pymupdf():
     if fitz is None:
@@ -24,44 +40,92 @@ def _norm(text: str) -> str:
     return re.sub(r"[^\w]", "", (text or "").lower()).strip()
 
 
-def extract_pdf_text(pdf_path: str) -> Tuple[str, int]:
-    """Return (full_text, page_count) from a PDF."""
+@dataclass
+class SourceDocument:
+    """Source side of a comparison: only its text and normalized words are needed."""
+    text: str
+    page_count: int
+    norms: List[str]
+
+
+@dataclass
+class SuspectDocument:
+    """Suspect side: text plus every word with its position, for scoring and highlighting."""
+    text: str
+    page_count: int
+    words: List[Dict]
+
+    @property
+    def norms(self) -> List[str]:
+        return [w["norm"] for w in self.words]
+
+
+def _normalized_words(text: str) -> List[str]:
+    norms = []
+    for token in text.split():
+        normalized = _norm(token)
+        if normalized:
+            norms.append(normalized)
+    return norms
+
+
+def load_source(pdf_path: str) -> SourceDocument:
+    """Read the source PDF once; no word boxes are extracted for it."""
     pymupdf = _require_pymupdf()
     parts = []
     with pymupdf.open(pdf_path) as doc:
         page_count = len(doc)
         for page in doc:
             parts.append(page.get_text("text") or "")
-    return "\n".join(parts), page_count
+    text = "\n".join(parts)
+    return SourceDocument(text=text, page_count=page_count, norms=_normalized_words(text))
+
+
+def _read_suspect(doc) -> SuspectDocument:
+    """Text and positioned words of an open suspect PDF, one text page per page."""
+    pymupdf = _require_pymupdf()
+    parts = []
+    words = []
+    for page_idx, page in enumerate(doc):
+        # "text" and "words" use the same text flags, so one text page serves both.
+        textpage = page.get_textpage(flags=pymupdf.TEXTFLAGS_TEXT)
+        parts.append(page.get_text("text", textpage=textpage) or "")
+        for w in (page.get_text("words", sort=True, textpage=textpage) or []):
+            if len(w) < 8:
+                continue
+            x0, y0, x1, y1, text, block_no, line_no, word_no = w[:8]
+            normalized = _norm(text)
+            if not normalized:
+                continue
+            words.append({
+                "page": page_idx,
+                "rect": (float(x0), float(y0), float(x1), float(y1)),
+                "text": text,
+                "norm": normalized,
+                "block_no": int(block_no),
+                "line_no": int(line_no),
+                "word_no": int(word_no),
+            })
+    return SuspectDocument(text="\n".join(parts), page_count=len(doc), words=words)
+
+
+def extract_pdf_text(pdf_path: str) -> Tuple[str, int]:
+    """Return (full_text, page_count) from a PDF."""
+    source = load_source(pdf_path)
+    return source.text, source.page_count
 
 
 def extract_words_with_positions(pdf_path: str) -> List[Dict]:
     """Extract every word from a PDF with page index and bounding box."""
     pymupdf = _require_pymupdf()
-    words = []
     with pymupdf.open(pdf_path) as doc:
-        for page_idx, page in enumerate(doc):
-            for w in (page.get_text("words", sort=True) or []):
-                if len(w) < 8:
-                    continue
-                x0, y0, x1, y1, text, block_no, line_no, word_no = w[:8]
-                normalized = _norm(text)
-                if not normalized:
-                    continue
-                words.append({
-                    "page": page_idx,
-                    "rect": (float(x0), float(y0), float(x1), float(y1)),
-                    "text": text,
-                    "norm": normalized,
-                    "block_no": int(block_no),
-                    "line_no": int(line_no),
-                    "word_no": int(word_no),
-                })
-    return words
+        return _read_suspect(doc).words
 
 
 def find_extra_indices(source_norms: List[str], suspect_norms: List[str]) -> List[int]:
     """Return indices of words in suspect that are extra (insert / replace vs source)."""
+    if DIFF_ENGINE != "difflib":
+        return _word_diff_extra_indices(source_norms, suspect_norms)
     sm = difflib.SequenceMatcher(None, source_norms, suspect_norms, autojunk=False)
     extras = set()
     for op, _i1, _i2, j1, j2 in sm.get_opcodes():
@@ -106,8 +170,10 @@ def highlight_extra_in_pdf(
     suspect_words: List[Dict],
     extra_indices: List[int],
     output_path: str,
+    doc=None,
 ) -> int:
-    """Highlight extra words in yellow on the suspect PDF. Returns annotation count."""
+    """Highlight extra words in yellow on the suspect PDF. Returns annotation count.
+    Pass the already open suspect `doc` to annotate it instead of reopening the file."""
     pymupdf = _require_pymupdf()
     os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
@@ -120,15 +186,18 @@ def highlight_extra_in_pdf(
     count = 0
     YELLOW = (1.0, 1.0, 0.0)
 
-    with pymupdf.open(suspect_pdf) as doc:
-        for region in regions:
-            page = doc[region["page"]]
-            annot = page.add_highlight_annot(pymupdf.Rect(region["rect"]))
-            if annot:
-                annot.set_colors(stroke=YELLOW)
-                annot.update(opacity=0.5)
-                count += 1
-        doc.save(output_path, garbage=4, deflate=True)
+    if doc is None:
+        with pymupdf.open(suspect_pdf) as opened:
+            return highlight_extra_in_pdf(suspect_pdf, suspect_words, extra_indices, output_path, doc=opened)
+
+    for region in regions:
+        page = doc[region["page"]]
+        annot = page.add_highlight_annot(pymupdf.Rect(region["rect"]))
+        if annot:
+            annot.set_colors(stroke=YELLOW)
+            annot.update(opacity=0.5)
+            count += 1
+    doc.save(output_path, garbage=4, deflate=True)
     return count
 
 
@@ -136,20 +205,42 @@ def compute_comparison(
     source_pdf: str,
     suspect_pdf: str,
     output_pdf: str,
+    progress_callback: Optional[Callable[..., None]] = None,
+    source: Optional[SourceDocument] = None,
 ) -> Dict:
     """
     Compare two PDFs word-by-word.
     Highlights extra/added text in the suspect document with yellow.
     Returns result dict with similarity scores and highlight info.
+    progress_callback(phase, done, total) reports "extract", "diff" and "highlight".
+    source: an already loaded source_pdf (load_source), so it is not read again.
     """
-    source_text, source_pages = extract_pdf_text(source_pdf)
-    suspect_text, suspect_pages = extract_pdf_text(suspect_pdf)
-    suspect_words = extract_words_with_positions(suspect_pdf)
+    report = progress_callback or (lambda *args: None)
+    pymupdf = _require_pymupdf()
+    report("extract", 0, 2)
+    if source is None:
+        source = load_source(source_pdf)
+    report("extract", 1, 2)
+    # The suspect is opened once: its words are read, diffed, and highlighted on the same doc.
+    with pymupdf.open(suspect_pdf) as doc:
+        suspect = _read_suspect(doc)
+        report("extract", 2, 2)
+        return _compare_loaded(source, suspect, doc, suspect_pdf, output_pdf, report)
+
 
-    source_norms = [_norm(w) for w in source_text.split() if _norm(w)]
-    suspect_norms = [w["norm"] for w in suspect_words]
+def _compare_loaded(
+    source: SourceDocument,
+    suspect: SuspectDocument,
+    doc: Any,
+    suspect_pdf: str,
+    output_pdf: str,
+    report: Callable[..., None],
+) -> Dict:
+    suspect_words = suspect.words
+    suspect_norms = suspect.norms
 
-    extra_indices = find_extra_indices(source_norms, suspect_norms)
+    report("diff", 0, 1)
+    extra_indices = find_extra_indices(source.norms, suspect_norms)
 
     extra_data = [suspect_words[i] for i in extra_indices if i < len(suspect_words)]
     merged = _merge_rects(extra_data)
@@ -163,8 +254,9 @@ def compute_comparison(
         for pg, rects in sorted(page_map.items())
     ]
 
+    report("highlight", 0, 1)
     highlight_count = highlight_extra_in_pdf(
-        suspect_pdf, suspect_words, extra_indices, output_pdf
+        suspect_pdf, suspect_words, extra_indices, output_pdf, doc=doc
     )
 
     total = len(suspect_norms)
@@ -195,10 +287,185 @@ def compute_comparison(
         "extra_word_count": extra_count,
         "common_word_count": common,
         "highlight_count": highlight_count,
-        "source_pages": source_pages,
-        "suspect_pages": suspect_pages,
-        "source_text": source_text,
-        "suspect_text": suspect_text,
+        "source_pages": source.page_count,
+        "suspect_pages": suspect.page_count,
+        "source_text": source.text,
+        "suspect_text": suspect.text,
         "extra_snippets": snippets[:100],
         "frontend_highlights": frontend_highlights,
     }
+
+
+# ==================== BATCH COMPARISON ====================
+# N targets against one source: the source is read once and shipped to the workers as its
+# normalized words, each target is read, diffed and highlighted once in a worker process.
+# With all_pairs the targets are also diffed against each other (e.g. lab reports copied
+# from one another), reusing the words read for the source comparison.
+
+def _get_compare_pool():
+    return process_pools.get_pool("compare", COMPARE_WORKERS)
+
+
+def _compare_target(source: SourceDocument, target_pdf: str, output_pdf: str, with_norms: bool) -> Tuple[Dict, Optional[List[str]]]:
+    """One batch target: (comparison result without the page texts, target words or None)."""
+    pymupdf = _require_pymupdf()
+    with pymupdf.open(target_pdf) as doc:
+        suspect = _read_suspect(doc)
+        result = _compare_loaded(source, suspect, doc, target_pdf, output_pdf, lambda *args: None)
+    result.pop("source_text", None)
+    result.pop("suspect_text", None)
+    return result, (suspect.norms if with_norms else None)
+
+
+def _common_word_counts(pairs: List[Tuple[int, int]], ids: Dict[int, array]) -> List[int]:
+    """Aligned word count of each (a, b) pair of id arrays."""
+    counts = []
+    for a, b in pairs:
+        counts.append(len(ids[b]) - len(find_extra_indices(list(ids[a]), list(ids[b]))))
+    return counts
+
+
+def _pair_similarities(norms: List[Optional[List[str]]], report: Callable[..., None]) -> List[Dict]:
+    """Similarity of every pair of targets. One diff per pair serves both directions: the
+    aligned words are a one-to-one matching, so their count over each side's length gives
+    how much of that document appears in the other."""
+    vocab: Dict[str, int] = {}
+    ids = {
+        i: array("i", [vocab.setdefault(w, len(vocab)) for w in words])
+        for i, words in enumerate(norms) if words
+    }
+    pairs = [(a, b) for a in sorted(ids) for b in sorted(ids) if a < b]
+    total = len(pairs)
+    report("pairs", 0, total)
+    if not pairs:
+        return []
+
+    chunk = max(1, -(-total // (COMPARE_WORKERS * 4)))
+    chunks = [pairs[k:k + chunk] for k in range(0, total, chunk)]
+    counts: List[int] = []
+    if COMPARE_WORKERS > 1 and len(chunks) > 1:
+        pool = None
+        try:
+            pool = _get_compare_pool()
+            futures = []
+            for part in chunks:
+                needed = {i for pair in part for i in pair}
+                futures.append(pool.submit(_common_word_counts, part, {i: ids[i] for i in needed}))
+            for future in futures:
+                counts.extend(future.result())
+                report("pairs", len(counts), total)
+        except Exception as e:
+            process_pools.reset_if_broken("compare", e, pool)
+            logger.warning("Parallel pair comparison failed; falling back to in-process", exc_info=True)
+            counts = []
+    if not counts:
+        for part in chunks:
+            counts.extend(_common_word_counts(part, ids))
+            report("pairs", len(counts), total)
+
+    rows = []
+    for (a, b), common in zip(pairs, counts):
+        len_a, len_b = len(ids[a]), len(ids[b])
+        rows.append({
+            "a": a,
+            "b": b,
+            "common_word_count": common,
+            "a_in_b": round(common / len_a * 100, 1) if len_a else 0.0,
+            "b_in_a": round(common / len_b * 100, 1) if len_b else 0.0,
+        })
+    rows.sort(key=lambda r: max(r["a_in_b"], r["b_in_a"]), reverse=True)
+    return rows
+
+
+def compare_batch(
+    source_pdf: str,
+    targets: List[Tuple[str, str]],
+    progress_callback: Optional[Callable[..., None]] = None,
+    all_pairs: bool = False,
+    on_result: Optional[Callable[[int, Dict], None]] = None,
+) -> Dict:
+    """
+    Compare each (target_pdf, output_pdf) in targets against one source PDF.
+    progress_callback(phase, done, total) reports "source", "targets" and, with all_pairs, "pairs".
+    on_result(index, result) is called as each target finishes (from the calling thread).
+    Returns {"source_pages", "source_word_count", "results": [...], "pairs": [...]}, where a
+    failed target's result is {"error": message}.
+    """
+    report = progress_callback or (lambda *args: None)
+    report("source", 0, 1)
+    source = load_source(source_pdf)
+    report("source", 1, 1)
+    # Workers only need the words; the page text would be pickled once per target for nothing.
+    shipped = replace(source, text="")
+
+    total = len(targets)
+    results: List[Optional[Dict]] = [None] * total
+    norms: List[Optional[List[str]]] = [None] * total
+    done = 0
+
+    def finish(i: int, outcome: Tuple[Dict, Optional[List[str]]]) -> None:
+        nonlocal done
+        results[i], norms[i] = outcome
+        done += 1
+        report("targets", done, total)
+        if on_result:
+            on_result(i, results[i])
+
+    def run_here(i: int) -> Tuple[Dict, Optional[List[str]]]:
+        try:
+            return _compare_target(shipped, targets[i][0], targets[i][1], all_pairs)
+        except Exception as e:
+            return {"error": str(e)}, None
+
+    report("targets", 0, total)
+    if COMPARE_WORKERS <= 1 or total <= 1:
+        for i in range(total):
+            finish(i, run_here(i))
+    else:
+        # A crashed worker breaks the whole pool and fails every future still in it. Each
+        # target hit that way gets one more try on a fresh pool; a second failure is
+        # recorded as that target's error rather than run in the server process.
+        futures: Dict[Any, Tuple[int, Any]] = {}
+        retried = set()
+
+        def submit(i: int) -> None:
+            while True:
+                pool = None
+                try:
+                    pool = _get_compare_pool()
+                    future = pool.submit(_compare_target, shipped, targets[i][0], targets[i][1], all_pairs)
+                    futures[future] = (i, pool)
+                    return
+                except Exception as e:
+                    process_pools.reset_if_broken("compare", e, pool)
+                    if not isinstance(e, BrokenProcessPool) or i in retried:
+                        finish(i, ({"error": str(e)}, None))
+                        return
+                    retried.add(i)
+
+        for i in range(total):
+            submit(i)
+        while futures:
+            completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in completed:
+                i, pool = futures.pop(future)
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    process_pools.reset_if_broken("compare", e, pool)
+                    if isinstance(e, BrokenProcessPool) and i not in retried:
+                        logger.warning("Batch target %d lost its worker; retrying on a fresh pool", i)
+                        retried.add(i)
+                        submit(i)
+                        continue
+                    logger.warning("Batch target %d failed in a worker", i, exc_info=True)
+                    outcome = ({"error": str(e)}, None)
+                finish(i, outcome)
+
+    pairs = _pair_similarities(norms, report) if all_pairs else []
+    return {
+        "source_pages": source.page_count,
+        "source_word_count": len(source.norms),
+        "results": results,
+        "pairs": pairs,
+    }
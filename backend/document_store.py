@@ -25,6 +25,8 @@ def _ensure_repo_columns(cursor) -> None:
         cursor.execute("ALTER TABLE documents ADD COLUMN owner_id INTEGER NULL")
     if "model_name" not in cols:
         cursor.execute("ALTER TABLE documents ADD COLUMN model_name TEXT NOT NULL DEFAULT 'default'")
+    if "content_sha256" not in cols:
+        cursor.execute("ALTER TABLE documents ADD COLUMN content_sha256 TEXT NULL")
 
 
 def init_db(db_path: str = DB_PATH) -> None:
@@ -45,7 +47,8 @@ def init_db(db_path: str = DB_PATH) -> None:
             indexed_at TEXT NOT NULL,
             repo_type TEXT NOT NULL DEFAULT 'university',
             owner_id INTEGER NULL,
-            model_name TEXT NOT NULL DEFAULT 'default'
+            model_name TEXT NOT NULL DEFAULT 'default',
+            content_sha256 TEXT NULL
         )
     """)
     # Migration for existing DBs that don't have repo columns
@@ -68,17 +71,87 @@ def init_db(db_path: str = DB_PATH) -> None:
             document_id TEXT NOT NULL,
             chunk_index INTEGER NOT NULL,
             embedding BLOB NOT NULL,
+            UNIQUE (document_id, chunk_index),
             FOREIGN KEY (document_id) REFERENCES documents(document_id)
         )
     """)
+    # Embeddings from the small prescreen model (see embedding_pipeline.PRESCREEN_MODEL_NAME),
+    # kept alongside the main ones so scans can skip chunks that match nothing.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS document_chunk_prescreen_embeddings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            embedding BLOB NOT NULL,
+            UNIQUE (document_id, chunk_index),
+            FOREIGN KEY (document_id) REFERENCES documents(document_id)
+        )
+    """)
+    # Bumped on every change to a repository's contents, so cached scan results know they are stale.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS repo_generations (
+            repo_type TEXT NOT NULL,
+            owner_id INTEGER NOT NULL DEFAULT 0,
+            generation INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (repo_type, owner_id)
+        )
+    """)
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON document_chunks(document_id)")
+    # Tables created before the UNIQUE constraint get it as an index instead.
+    _ensure_unique_chunk_rows(cursor, "document_chunk_embeddings")
+    _ensure_unique_chunk_rows(cursor, "document_chunk_prescreen_embeddings")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_doc_id ON document_chunk_embeddings(document_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_doc_chunk ON document_chunk_embeddings(document_id, chunk_index)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_repo_model ON documents(repo_type, model_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_content_sha256 ON documents(content_sha256)")
     conn.commit()
     conn.close()
 
 
+def _ensure_unique_chunk_rows(cursor, table: str) -> None:
+    """Make (document_id, chunk_index) unique in an embeddings table, keeping the newest of any duplicates."""
+    for _, name, unique, *_ in cursor.execute(f"PRAGMA index_list({table})").fetchall():
+        if unique and [c[2] for c in cursor.execute(f"PRAGMA index_info('{name}')").fetchall()] == ["document_id", "chunk_index"]:
+            return
+    cursor.execute(
+        f"DELETE FROM {table} WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY document_id, chunk_index)"
+    )
+    cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_doc_chunk ON {table}(document_id, chunk_index)")
+
+
+def _bump_generation(cursor, repo_type: str, owner_id: Optional[int]) -> None:
+    owner_key = owner_id if repo_type == "personal" and owner_id is not None else 0
+    cursor.execute(
+        """INSERT INTO repo_generations (repo_type, owner_id, generation) VALUES (?, ?, 1)
+           ON CONFLICT(repo_type, owner_id) DO UPDATE SET generation = generation + 1""",
+        (repo_type, owner_key),
+    )
+
+
+def get_repo_generation(repo_type: str = "university", owner_id: int = None, db_path: str = DB_PATH) -> str:
+    """Version tag of the repository a scan reads: changes whenever any document in it is added,
+    deleted or moved. 'both' combines the university and the owner's personal generation."""
+    init_db(db_path)
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    try:
+        def _gen(rt, owner_key):
+            cursor.execute(
+                "SELECT generation FROM repo_generations WHERE repo_type = ? AND owner_id = ?", (rt, owner_key)
+            )
+            row = cursor.fetchone()
+            return row[0] if row else 0
+
+        parts = []
+        if repo_type in ("university", "both"):
+            parts.append(f"u{_gen('university', 0)}")
+        if repo_type in ("personal", "both"):
+            parts.append(f"p{owner_id}:{_gen('personal', owner_id or 0)}")
+        return "-".join(parts)
+    finally:
+        conn.close()
+
+
 def save_document(
     document_id: str,
     file_name: str,
@@ -93,9 +166,12 @@ def save_document(
     owner_id: int = None,
     embeddings: Optional[List[bytes]] = None,
     model_name: str = "default",
+    prescreen_embeddings: Optional[List[bytes]] = None,
+    content_sha256: Optional[str] = None,
     db_path: str = DB_PATH,
 ) -> None:
-    """Save document metadata, chunks, and optional embeddings. embeddings: list of bytes (numpy float32 .tobytes())."""
+    """Save document metadata, chunks, and optional embeddings. embeddings: list of bytes (numpy float32 .tobytes()).
+    prescreen_embeddings: same, from the small prescreen model. content_sha256: hash of the uploaded file."""
     init_db(db_path)
     indexed_at = datetime.now(timezone.utc).isoformat()
     conn = get_connection(db_path)
@@ -105,8 +181,8 @@ def save_document(
             """INSERT INTO documents (
                 document_id, file_name, file_path, num_chunks, indexing_time,
                 file_type, num_pages_or_slides, raw_text_length, indexed_at,
-                repo_type, owner_id, model_name
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                repo_type, owner_id, model_name, content_sha256
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (
                 document_id,
                 file_name,
@@ -120,8 +196,10 @@ def save_document(
                 repo_type,
                 owner_id,
                 model_name,
+                content_sha256,
             ),
         )
+        _bump_generation(cursor, repo_type, owner_id)
         for i, text in enumerate(chunks):
             cursor.execute(
                 "INSERT INTO document_chunks (document_id, chunk_index, chunk_text) VALUES (?, ?, ?)",
@@ -131,9 +209,14 @@ def save_document(
             for i, emb_blob in enumerate(embeddings):
                 if i < len(chunks):
                     cursor.execute(
-                        "INSERT INTO document_chunk_embeddings (document_id, chunk_index, embedding) VALUES (?, ?, ?)",
+                        "INSERT OR REPLACE INTO document_chunk_embeddings (document_id, chunk_index, embedding) VALUES (?, ?, ?)",
                         (document_id, i, emb_blob),
                     )
+        if prescreen_embeddings:
+            cursor.executemany(
+                "INSERT OR REPLACE INTO document_chunk_prescreen_embeddings (document_id, chunk_index, embedding) VALUES (?, ?, ?)",
+                [(document_id, i, blob) for i, blob in enumerate(prescreen_embeddings) if i < len(chunks)],
+            )
         conn.commit()
         # Invalidate FAISS cache for this repo so next similarity search rebuilds index from DB.
         try:
@@ -166,45 +249,94 @@ def get_stats(db_path: str = DB_PATH):
         conn.close()
 
 
-def get_chunks_with_embeddings(repo_type: str = "university", owner_id: int = None, model_name: str = "default", db_path: str = DB_PATH):
-    """Get chunks with embeddings for semantic similarity scan, filtered by model_name."""
+def get_chunks_with_embeddings(repo_type: str = "university", owner_id: int = None, model_name: str = "default", include_prescreen: bool = False, db_path: str = DB_PATH):
+    """Get chunks with embeddings for semantic similarity scan, filtered by model_name.
+    include_prescreen also returns each chunk's prescreen-model embedding (None if missing)."""
     init_db(db_path)
+    pe_col = "pe.embedding" if include_prescreen else "NULL"
+    pe_join = (
+        "LEFT JOIN document_chunk_prescreen_embeddings pe ON dc.document_id = pe.document_id AND dc.chunk_index = pe.chunk_index"
+        if include_prescreen else ""
+    )
     conn = get_connection(db_path)
     cursor = conn.cursor()
     try:
         if repo_type == "both" and owner_id is not None:
             cursor.execute(
-                """SELECT dc.document_id, d.file_name, dc.chunk_index, dc.chunk_text, ce.embedding
+                f"""SELECT dc.document_id, d.file_name, dc.chunk_index, dc.chunk_text, ce.embedding, {pe_col}
                    FROM document_chunks dc
                    JOIN documents d ON dc.document_id = d.document_id
                    LEFT JOIN document_chunk_embeddings ce ON dc.document_id = ce.document_id AND dc.chunk_index = ce.chunk_index
+                   {pe_join}
                    WHERE (d.repo_type = 'university' OR (d.repo_type = 'personal' AND d.owner_id = ?))
                      AND d.model_name = ?""",
                 (owner_id, model_name)
             )
         elif repo_type == "personal" and owner_id is not None:
             cursor.execute(
-                """SELECT dc.document_id, d.file_name, dc.chunk_index, dc.chunk_text, ce.embedding
+                f"""SELECT dc.document_id, d.file_name, dc.chunk_index, dc.chunk_text, ce.embedding, {pe_col}
                    FROM document_chunks dc
                    JOIN documents d ON dc.document_id = d.document_id
                    LEFT JOIN document_chunk_embeddings ce ON dc.document_id = ce.document_id AND dc.chunk_index = ce.chunk_index
+                   {pe_join}
                    WHERE d.repo_type = ? AND d.owner_id = ? AND d.model_name = ?""",
                 (repo_type, owner_id, model_name)
             )
         else:
             cursor.execute(
-                """SELECT dc.document_id, d.file_name, dc.chunk_index, dc.chunk_text, ce.embedding
+                f"""SELECT dc.document_id, d.file_name, dc.chunk_index, dc.chunk_text, ce.embedding, {pe_col}
                    FROM document_chunks dc
                    JOIN documents d ON dc.document_id = d.document_id
                    LEFT JOIN document_chunk_embeddings ce ON dc.document_id = ce.document_id AND dc.chunk_index = ce.chunk_index
+                   {pe_join}
                    WHERE d.repo_type = 'university' AND d.model_name = ?""",
                 (model_name,)
             )
         rows = cursor.fetchall()
-        return [
+        chunks = [
             {"document_id": r[0], "file_name": r[1], "chunk_index": r[2], "chunk_text": r[3] or "", "embedding": r[4]}
             for r in rows
         ]
+        if include_prescreen:
+            for chunk, r in zip(chunks, rows):
+                chunk["prescreen_embedding"] = r[5]
+        return chunks
+    finally:
+        conn.close()
+
+
+def get_chunks_missing_prescreen(limit: int = 512, db_path: str = DB_PATH):
+    """Chunks that have no prescreen-model embedding yet (documents indexed before prescreening)."""
+    init_db(db_path)
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """SELECT dc.document_id, dc.chunk_index, dc.chunk_text
+               FROM document_chunks dc
+               LEFT JOIN document_chunk_prescreen_embeddings pe
+                 ON dc.document_id = pe.document_id AND dc.chunk_index = pe.chunk_index
+               WHERE pe.id IS NULL
+               LIMIT ?""",
+            (limit,)
+        )
+        return [{"document_id": r[0], "chunk_index": r[1], "chunk_text": r[2] or ""} for r in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def save_prescreen_embeddings(rows: List[tuple], db_path: str = DB_PATH) -> None:
+    """Write (document_id, chunk_index, embedding_blob) prescreen rows, replacing any already stored."""
+    if not rows:
+        return
+    init_db(db_path)
+    conn = get_connection(db_path)
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO document_chunk_prescreen_embeddings (document_id, chunk_index, embedding) VALUES (?, ?, ?)",
+            rows,
+        )
+        conn.commit()
     finally:
         conn.close()
 
@@ -265,6 +397,30 @@ def filename_exists(file_name: str, repo_type: str = "university", owner_id: int
         conn.close()
 
 
+def find_document_by_hash(content_sha256: str, repo_type: str = "university", owner_id: int = None, db_path: str = DB_PATH) -> Optional[dict]:
+    """Return {document_id, file_name} of a document with identical file content in the given repo, or None."""
+    if not content_sha256:
+        return None
+    init_db(db_path)
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    try:
+        if repo_type == "personal" and owner_id is not None:
+            cursor.execute(
+                "SELECT document_id, file_name FROM documents WHERE content_sha256 = ? AND repo_type = ? AND owner_id = ? LIMIT 1",
+                (content_sha256, repo_type, owner_id)
+            )
+        else:
+            cursor.execute(
+                "SELECT document_id, file_name FROM documents WHERE content_sha256 = ? AND repo_type = 'university' LIMIT 1",
+                (content_sha256,)
+            )
+        row = cursor.fetchone()
+        return {"document_id": row[0], "file_name": row[1]} if row else None
+    finally:
+        conn.close()
+
+
 def list_documents(repo_type: str = "university", owner_id: int = None, db_path: str = DB_PATH):
     """List documents. admin: repo_type=university, owner_id=None; teacher: repo_type=personal, owner_id=teacher_id."""
     init_db(db_path)
@@ -297,9 +453,13 @@ def delete_document(document_id: str, db_path: str = DB_PATH) -> bool:
     conn = get_connection(db_path)
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT COUNT(*) FROM documents WHERE document_id = ?", (document_id,))
-        exists = cursor.fetchone()[0] > 0
+        cursor.execute("SELECT repo_type, owner_id FROM documents WHERE document_id = ?", (document_id,))
+        row = cursor.fetchone()
+        exists = row is not None
+        if exists:
+            _bump_generation(cursor, row[0], row[1])
         cursor.execute("DELETE FROM document_chunk_embeddings WHERE document_id = ?", (document_id,))
+        cursor.execute("DELETE FROM document_chunk_prescreen_embeddings WHERE document_id = ?", (document_id,))
         cursor.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
         cursor.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
         conn.commit()
@@ -322,7 +482,11 @@ def update_document_path(document_id: str, new_path: str, repo_type: str = "univ
             cursor.execute("UPDATE documents SET file_name = ? WHERE document_id = ? AND repo_type = ? AND owner_id = ?", (new_path, document_id, repo_type, owner_id))
         else:
             cursor.execute("UPDATE documents SET file_name = ? WHERE document_id = ? AND repo_type = 'university'", (new_path, document_id))
+        updated = cursor.rowcount > 0
+        if updated:
+            # Match cards show the file name, so a move also makes cached scans stale.
+            _bump_generation(cursor, repo_type, owner_id)
         conn.commit()
-        return cursor.rowcount > 0
+        return updated
     finally:
         conn.close()
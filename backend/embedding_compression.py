@@ -0,0 +1,127 @@
+# embedding_compression.py
+# Reduced-size copies of the repository embeddings for the first-stage similarity search.
+# The full float32 vectors (768-dim, 3KB each) stay the source of truth; a compressed copy
+# is scanned first and only the survivors are re-scored with the full vectors. The copy is
+# held in addition to the full FAISS index, so it buys a faster scan with extra memory.
+#
+# Modes (EMBEDDING_COMPRESSION env var):
+#   off      - no first stage, search the full vectors directly (default)
+#   pca      - project onto the top EMBEDDING_PCA_DIM principal directions fitted on the repo
+#   float16  - half-precision copy (scans 1/2 the bytes of the full vectors)
+#   int8     - per-dimension symmetric scalar quantization (scans 1/4 the bytes)
+
+import os
+from typing import List
+
+import numpy as np
+
+COMPRESSION_MODES = ("off", "pca", "float16", "int8")
+EMBEDDING_COMPRESSION = os.getenv("EMBEDDING_COMPRESSION", "off").strip().lower()
+# Target dimension for the PCA projection (clamped to the repo size and embedding dim).
+PCA_DIM = int(os.getenv("EMBEDDING_PCA_DIM", "128"))
+# A repo chunk survives the first stage when its approximate score is within this margin
+# of the semantic threshold. Larger margin = better recall, more re-scoring.
+COMPRESSION_MARGIN = float(os.getenv("EMBEDDING_COMPRESSION_MARGIN", "0.10"))
+# The best TOP_K approximate hits per query always survive, whatever their score.
+COMPRESSION_TOP_K = int(os.getenv("EMBEDDING_COMPRESSION_TOP_K", "50"))
+# Rows scored per block so a large repo never materializes a full (queries x repo) float32 matrix.
+_BLOCK_ROWS = 32768
+
+
+def compression_mode() -> str:
+    """Return the configured mode, falling back to 'off' for unknown values."""
+    return EMBEDDING_COMPRESSION if EMBEDDING_COMPRESSION in COMPRESSION_MODES else "off"
+
+
+def build_compressed(embeddings: np.ndarray, mode: str) -> dict:
+    """Build the compressed representation of L2-normalized (n, d) float32 embeddings."""
+    X = np.asarray(embeddings, dtype=np.float32)
+    n, d = X.shape
+    if mode == "pca":
+        # Uncentered projection: orthonormal basis from the SVD of X itself, so
+        # (q @ P) . (x @ P) approximates the cosine q . x on the repo's dominant subspace.
+        k = max(1, min(PCA_DIM, n, d))
+        _, _, vt = np.linalg.svd(X, full_matrices=False)
+        basis = np.ascontiguousarray(vt[:k].T, dtype=np.float32)
+        return {"mode": mode, "codes": X @ basis, "basis": basis}
+    if mode == "float16":
+        return {"mode": mode, "codes": X.astype(np.float16)}
+    if mode == "int8":
+        scale = np.abs(X).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        codes = np.clip(np.rint(X / scale), -127, 127).astype(np.int8)
+        return {"mode": mode, "codes": codes, "scale": scale.astype(np.float32)}
+    raise ValueError(f"Unknown compression mode: {mode}")
+
+
+def compressed_nbytes(comp: dict) -> int:
+    """Memory held by the compressed representation, in bytes."""
+    return sum(v.nbytes for v in comp.values() if isinstance(v, np.ndarray))
+
+
+def save_compressed(path: str, comp: dict, source_mtime=None):
+    # Store alongside the FAISS index; source_mtime ties the file to the .faiss it was built from.
+    arrays = {k: v for k, v in comp.items() if isinstance(v, np.ndarray)}
+    np.savez(path, mode=np.array(comp["mode"]), source_mtime=np.array(source_mtime or 0.0), **arrays)
+
+
+def load_compressed(path: str) -> tuple:
+    """Return (comp, source_mtime) or (None, None) if the file is missing or unreadable."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            comp = {k: data[k] for k in data.files if k not in ("mode", "source_mtime")}
+            comp["mode"] = str(data["mode"])
+            return comp, float(data["source_mtime"])
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+def _project_queries(comp: dict, Q: np.ndarray) -> np.ndarray:
+    if comp["mode"] == "pca":
+        return Q @ comp["basis"]
+    if comp["mode"] == "int8":
+        # Fold the per-dimension scale into the query instead of de-quantizing the repo.
+        return Q * comp["scale"]
+    return Q
+
+
+def first_stage(comp: dict, Q: np.ndarray, threshold: float,
+                margin: float = None, top_k: int = None) -> List[np.ndarray]:
+    """Return, per query row, the repo row ids whose approximate score may reach the threshold."""
+    if margin is None:
+        margin = COMPRESSION_MARGIN
+    if top_k is None:
+        top_k = COMPRESSION_TOP_K
+    Qp = _project_queries(comp, np.asarray(Q, dtype=np.float32))
+    codes = comp["codes"]
+    n = codes.shape[0]
+    cutoff = threshold - margin
+    keep = min(top_k, n)
+
+    hits: List[List[np.ndarray]] = [[] for _ in range(Qp.shape[0])]
+    best_ids = np.empty((Qp.shape[0], 0), dtype=np.int64)
+    best_scores = np.empty((Qp.shape[0], 0), dtype=np.float32)
+    for start in range(0, n, _BLOCK_ROWS):
+        block = codes[start:start + _BLOCK_ROWS].astype(np.float32, copy=False)
+        scores = Qp @ block.T
+        for qi in range(Qp.shape[0]):
+            above = np.nonzero(scores[qi] >= cutoff)[0]
+            if above.size:
+                hits[qi].append(above + start)
+        if keep:
+            # Running top-K: the block's own top-K merged with the best seen so far.
+            k_blk = min(keep, scores.shape[1])
+            part = np.argpartition(-scores, k_blk - 1, axis=1)[:, :k_blk]
+            ids = np.concatenate([best_ids, part + start], axis=1)
+            sc = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            if sc.shape[1] > keep:
+                part = np.argpartition(-sc, keep - 1, axis=1)[:, :keep]
+                ids = np.take_along_axis(ids, part, axis=1)
+                sc = np.take_along_axis(sc, part, axis=1)
+            best_ids, best_scores = ids, sc
+
+    survivors = []
+    for qi in range(Qp.shape[0]):
+        parts = hits[qi] + ([best_ids[qi]] if keep else [])
+        survivors.append(np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64))
+    return survivors
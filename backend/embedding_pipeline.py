@@ -8,15 +8,20 @@ import logging
 import os
 import re
 import time
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from difflib import SequenceMatcher
-from typing import List, Optional
+from typing import Callable, List, Optional
+
+# Sets OpenMP/BLAS thread counts, so it must come before numpy.
+from concurrency_config import CONFIG as _CONCURRENCY, apply_torch as _apply_torch_threads
 
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
-MAX_CONCURRENT_WORKERS = min(4, os.cpu_count() or 4)
+# Candidate thread pool size; see concurrency_config for how it is chosen alongside torch/BLAS/FAISS.
+MAX_CONCURRENT_WORKERS = _CONCURRENCY["scan_workers"]
 
 # =============================================================================
 # SIMILARITY CONFIG — edit these constants to tune detection sensitivity
@@ -63,11 +68,30 @@ AVAILABLE_MODELS = {
 }
 DEFAULT_MODEL_NAME = "default"
 
+# ---------------------------------------------------------------------------
+# Prescreen model (internal, not user-selectable)
+# ---------------------------------------------------------------------------
+# Most scanned chunks match nothing. With PRESCREEN_ENABLED=1 a small MiniLM encoder
+# embeds every query chunk first, and only chunks whose nearest repo chunk (under the
+# same small model) reaches PRESCREEN_THRESHOLD are encoded with the selected model.
+# Repo chunks get a prescreen embedding at ingest (document_chunk_prescreen_embeddings);
+# if any repo chunk is missing one, the scan falls back to the full path.
+PRESCREEN_MODEL_NAME = "prescreen"
+PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "0") == "1"
+PRESCREEN_THRESHOLD = float(os.getenv("PRESCREEN_THRESHOLD", "0.40"))
+_INTERNAL_MODELS = {
+    PRESCREEN_MODEL_NAME: {
+        "model_id": "sentence-transformers/all-MiniLM-L6-v2",
+        "dim": 384,
+        "label": "Prescreen (MiniLM)",
+    },
+}
+
 # ---------------------------------------------------------------------------
 # GPU / device detection
 # ---------------------------------------------------------------------------
 def _detect_device() -> str:
-    """Auto-detect the best available compute device (cuda > mps > cpu)."""
+    """Auto-detect the best available compute device (cuda > mps > cpu). Imports torch."""
     try:
         import torch
         if torch.cuda.is_available():
@@ -81,7 +105,24 @@ def _detect_device() -> str:
     logger.info("No GPU detected: using CPU")
     return "cpu"
 
-DEVICE = _detect_device()
+_DEVICE = None
+
+
+def _get_device() -> str:
+    """Detect the device on first use rather than at import, so importing this module stays cheap."""
+    global _DEVICE
+    if _DEVICE is None:
+        _DEVICE = _detect_device()
+        _apply_torch_threads()
+    return _DEVICE
+
+
+def __getattr__(name: str):
+    # Keep `from embedding_pipeline import DEVICE` working without importing torch at module load.
+    if name == "DEVICE":
+        return _get_device()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_CACHE_DIR = os.path.join(_THIS_DIR, "model_cache")
@@ -91,9 +132,16 @@ MODEL_CACHE_DIR = os.path.join(_THIS_DIR, "model_cache")
 # which avoids any network call for cached models without blocking downloads for new ones.
 
 # ---------------------------------------------------------------------------
-# Multi-model cache: one loaded model per model_name key
+# Multi-model cache: several models stay resident under a RAM budget (LRU eviction)
 # ---------------------------------------------------------------------------
-_MODEL_CACHE: dict = {}
+# Teachers alternate between "default" and "paraphrase" scans; keeping both resident
+# avoids a multi-second reload from model_cache on every switch.  When loading a
+# model would exceed the budget, the least-recently-used models are unloaded first.
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "2048"))
+
+_MODEL_CACHE: "OrderedDict[str, object]" = OrderedDict()
+_MODEL_SIZES_MB: dict = {}      # model_name -> measured footprint (kept after eviction for planning)
+_MODEL_LAST_USED: dict = {}     # model_name -> time.time() of last _get_model() hit
 _MODEL_LOCK = __import__("threading").Lock()
 
 
@@ -118,38 +166,108 @@ def _is_model_cached(model_id: str) -> bool:
     return False
 
 
+def _model_memory_mb(model) -> float:
+    """Approximate resident size of a loaded model: parameters + buffers."""
+    total = 0
+    try:
+        for p in model.parameters():
+            total += p.numel() * p.element_size()
+        for b in model.buffers():
+            total += b.numel() * b.element_size()
+    except Exception:
+        return 0.0
+    return round(total / (1024 * 1024), 1)
+
+
+def _resident_mb() -> float:
+    return sum(_MODEL_SIZES_MB.get(name, 0.0) for name in _MODEL_CACHE)
+
+
+def _evict_for(model_name: str, incoming_mb: float) -> None:
+    """Unload least-recently-used models until incoming_mb fits the budget. Caller holds _MODEL_LOCK."""
+    while _MODEL_CACHE:
+        if _resident_mb() + incoming_mb <= MODEL_MEMORY_BUDGET_MB:
+            return
+        victim = next(iter(_MODEL_CACHE))
+        if victim == model_name:
+            return
+        logger.info(
+            "Unloading model '%s' (%.0f MB) to stay within %d MB budget.",
+            victim, _MODEL_SIZES_MB.get(victim, 0.0), MODEL_MEMORY_BUDGET_MB,
+        )
+        del _MODEL_CACHE[victim]
+        _MODEL_LAST_USED.pop(victim, None)
+        if _get_device() == "cuda":
+            try:
+                import torch
+                torch.cuda.empty_cache()
+            except Exception:
+                pass
+
+
+def _register_model(model_name: str, model) -> None:
+    """Insert a freshly loaded model as most-recently-used, evicting others if over budget."""
+    size_mb = _model_memory_mb(model)
+    _MODEL_SIZES_MB[model_name] = size_mb
+    _evict_for(model_name, size_mb)
+    _MODEL_CACHE[model_name] = model
+    _MODEL_CACHE.move_to_end(model_name)
+    _MODEL_LAST_USED[model_name] = time.time()
+
+
+def get_model_residency() -> dict:
+    """Snapshot of loaded models and their memory use (for /models/status)."""
+    with _MODEL_LOCK:
+        loaded = [
+            {
+                "model_name": name,
+                "memory_mb": _MODEL_SIZES_MB.get(name, 0.0),
+                "last_used_at": _MODEL_LAST_USED.get(name),
+            }
+            for name in reversed(_MODEL_CACHE)  # most-recently-used first
+        ]
+        return {
+            "budget_mb": MODEL_MEMORY_BUDGET_MB,
+            "resident_mb": round(_resident_mb(), 1),
+            "device": _get_device(),
+            "loaded": loaded,
+        }
+
+
 def _get_model(model_name: str = DEFAULT_MODEL_NAME):
-    """Load the requested model, unloading any other model first (one model in memory at a time).
+    """Load the requested model, keeping other models resident while they fit MODEL_MEMORY_BUDGET_MB.
+    - If already resident: marks it most-recently-used and returns it.
     - If already cached on disk: loads with local_files_only=True (no network call).
     - If not cached: downloads from HuggingFace (requires internet on first use).
     """
-    if model_name not in AVAILABLE_MODELS:
+    if model_name not in AVAILABLE_MODELS and model_name not in _INTERNAL_MODELS:
         model_name = DEFAULT_MODEL_NAME
-
-    if model_name in _MODEL_CACHE:
-        return _MODEL_CACHE[model_name]
+    spec = AVAILABLE_MODELS.get(model_name) or _INTERNAL_MODELS[model_name]
 
     with _MODEL_LOCK:
-        if model_name in _MODEL_CACHE:
-            return _MODEL_CACHE[model_name]
+        model = _MODEL_CACHE.get(model_name)
+        if model is not None:
+            _MODEL_CACHE.move_to_end(model_name)
+            _MODEL_LAST_USED[model_name] = time.time()
+            return model
 
-        # Unload any other model from memory before loading the new one
-        for other in list(_MODEL_CACHE.keys()):
-            if other != model_name:
-                logger.info("Unloading model '%s' to free memory.", other)
-                del _MODEL_CACHE[other]
+        # Make room up-front when we already know this model's footprint from an earlier load,
+        # so peak memory never holds the victim and the newcomer at the same time.
+        if model_name in _MODEL_SIZES_MB:
+            _evict_for(model_name, _MODEL_SIZES_MB[model_name])
 
         from sentence_transformers import SentenceTransformer
         os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
-        model_id = AVAILABLE_MODELS[model_name]["model_id"]
+        model_id = spec["model_id"]
         cached = _is_model_cached(model_id)
+        device = _get_device()
 
         try:
             if cached:
                 model = SentenceTransformer(
                     model_id,
                     cache_folder=MODEL_CACHE_DIR,
-                    device=DEVICE,
+                    device=device,
                     local_files_only=True,
                 )
             else:
@@ -157,7 +275,7 @@ def _get_model(model_name: str = DEFAULT_MODEL_NAME):
                 model = SentenceTransformer(
                     model_id,
                     cache_folder=MODEL_CACHE_DIR,
-                    device=DEVICE,
+                    device=device,
                 )
                 logger.info("Model '%s' downloaded and cached successfully.", model_id)
         except Exception as err:
@@ -165,27 +283,35 @@ def _get_model(model_name: str = DEFAULT_MODEL_NAME):
                 f"MODEL_NOT_AVAILABLE:{model_name}:{model_id}"
             ) from err
 
-        _MODEL_CACHE[model_name] = model
-        logger.info("Model '%s' (%s) loaded on device: %s", model_name, model_id, DEVICE)
+        _register_model(model_name, model)
+        logger.info(
+            "Model '%s' (%s) loaded on device: %s (%.0f MB, %d resident)",
+            model_name, model_id, device, _MODEL_SIZES_MB[model_name], len(_MODEL_CACHE),
+        )
         return model
 
 
 # Optional import of FAISS index module; if missing or FAISS not installed, we use brute-force only.
+# faiss itself is imported lazily by faiss_index on first use (see _faiss_available).
 try:
     import faiss_index as _faiss_mod
-    faiss = getattr(_faiss_mod, "faiss", None)
+    _faiss_available = getattr(_faiss_mod, "faiss_available", lambda: False)
     build_index_from_chunks = getattr(_faiss_mod, "build_index_from_chunks", None)
     search_faiss = getattr(_faiss_mod, "search_faiss", None)
     load_index_from_disk = getattr(_faiss_mod, "load_index_from_disk", None)
     save_index_to_disk = getattr(_faiss_mod, "save_index_to_disk", None)
+    get_compressed_index = getattr(_faiss_mod, "get_compressed_index", None)
+    search_faiss_compressed = getattr(_faiss_mod, "search_faiss_compressed", None)
     FAISS_MIN_CHUNKS = getattr(_faiss_mod, "FAISS_MIN_CHUNKS", 999999)
     DEFAULT_TOP_K = getattr(_faiss_mod, "DEFAULT_TOP_K", 10)
 except Exception:
-    faiss = None
+    _faiss_available = lambda: False
     build_index_from_chunks = None
     search_faiss = None
     load_index_from_disk = None
     save_index_to_disk = None
+    get_compressed_index = None
+    search_faiss_compressed = None
     FAISS_MIN_CHUNKS = 999999
     DEFAULT_TOP_K = 10
 
@@ -510,19 +636,67 @@ def get_embedding_dim(model_name: str = DEFAULT_MODEL_NAME) -> int:
     return _get_model(model_name).get_embedding_dimension()
 
 
-def encode_chunks(chunks: List[str], model_name: str = DEFAULT_MODEL_NAME) -> np.ndarray:
-    """Encode a list of text chunks to embedding vectors using the specified model."""
+def encode_chunks(
+    chunks: List[str],
+    model_name: str = DEFAULT_MODEL_NAME,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> np.ndarray:
+    """Encode a list of text chunks to embedding vectors using the specified model.
+    progress_callback(chunks_done, total) is called after each encoding batch."""
     if not chunks:
         return np.array([]).reshape(0, DEFAULT_EMBEDDING_DIM)
     model = _get_model(model_name)
-    batch_size = 128 if DEVICE in ("cuda", "mps") else 32
-    embeddings = model.encode(
-        chunks,
-        convert_to_numpy=True,
-        batch_size=batch_size,
-        show_progress_bar=False,
-    )
-    return np.asarray(embeddings, dtype=np.float32)
+    batch_size = 128 if _get_device() in ("cuda", "mps") else 32
+    if progress_callback is None:
+        embeddings = model.encode(
+            chunks,
+            convert_to_numpy=True,
+            batch_size=batch_size,
+            show_progress_bar=False,
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+    parts = []
+    for start in range(0, len(chunks), batch_size):
+        parts.append(model.encode(
+            chunks[start:start + batch_size],
+            convert_to_numpy=True,
+            batch_size=batch_size,
+            show_progress_bar=False,
+        ))
+        progress_callback(min(start + batch_size, len(chunks)), len(chunks))
+    return np.asarray(np.concatenate(parts), dtype=np.float32)
+
+
+def encode_prescreen_chunks(chunks: List[str]) -> List[bytes]:
+    """Prescreen-model embeddings for repo chunks at ingest, as float32 blobs (empty when disabled)."""
+    if not PRESCREEN_ENABLED or not chunks:
+        return []
+    return [arr.tobytes() for arr in encode_chunks(chunks, model_name=PRESCREEN_MODEL_NAME)]
+
+
+def _prescreen_query_chunks(query_chunks: List[str], repo_chunks: List[dict]) -> Optional[List[int]]:
+    """Indices of query chunks whose nearest repo chunk clears PRESCREEN_THRESHOLD under the small model.
+    Returns None when prescreening does not apply (disabled, model missing, incomplete repo coverage)."""
+    if not PRESCREEN_ENABLED or not query_chunks or not repo_chunks:
+        return None
+    dim = _INTERNAL_MODELS[PRESCREEN_MODEL_NAME]["dim"]
+    blobs = [rc.get("prescreen_embedding") for rc in repo_chunks]
+    missing = sum(1 for b in blobs if b is None or len(b) != dim * 4)
+    if missing:
+        logger.info("prescreen: %d/%d repo chunks lack prescreen embeddings, using full path", missing, len(blobs))
+        return None
+    try:
+        Q = encode_chunks(query_chunks, model_name=PRESCREEN_MODEL_NAME)
+    except Exception:
+        logger.warning("prescreen: model unavailable, using full path", exc_info=True)
+        return None
+    R = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(-1, dim)
+    Q = Q / np.maximum(np.linalg.norm(Q, axis=1, keepdims=True), 1e-12)
+    R = R / np.maximum(np.linalg.norm(R, axis=1, keepdims=True), 1e-12)
+    best = np.full(len(Q), -1.0, dtype=np.float32)
+    for start in range(0, len(R), 32768):
+        best = np.maximum(best, (Q @ R[start:start + 32768].T).max(axis=1))
+    return [qi for qi in range(len(query_chunks)) if best[qi] >= PRESCREEN_THRESHOLD]
 
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
@@ -1027,9 +1201,16 @@ def find_matches(
     min_fingerprint: float = None,
     max_workers: int = None,
     model_name: str = DEFAULT_MODEL_NAME,
+    progress_callback: Optional[Callable[..., None]] = None,
 ) -> tuple:
-    """Compare query chunks to repository in parallel; returns (sem_%, lex_%, fp_%, overall_%, matches)."""
+    """Compare query chunks to repository in parallel; returns (sem_%, lex_%, fp_%, overall_%, matches).
+
+    progress_callback(phase, done, total, detail="") is called as the scan moves through
+    its phases: "prescreen", "encode" (per batch), "search", "candidates" (per query chunk)
+    and "sentences". It runs on the calling thread.
+    """
     t_start = time.perf_counter()
+    report = progress_callback or (lambda *args, **kwargs: None)
 
     thr_cfg = _get_thresholds(model_name)
     if threshold is None:
@@ -1048,17 +1229,35 @@ def find_matches(
     if not repo_chunks:
         return 0.0, 0.0, 0.0, 0.0, []
 
-    n_workers = min(max_workers, len(query_chunks))
+    # Early exit: with prescreening on, only chunks that look close to something in the
+    # repo under the small model are encoded and scored. The overall score is still
+    # divided by all query chunks, so skipped chunks count as unmatched.
+    active = list(range(len(query_chunks)))
+    t_pre = time.perf_counter()
+    if PRESCREEN_ENABLED:
+        report("prescreen", 0, 1)
+    screened = _prescreen_query_chunks(query_chunks, repo_chunks)
+    if screened is not None:
+        logger.info(
+            "find_matches: prescreen kept %d/%d query chunks in %.3fs",
+            len(screened), len(query_chunks), time.perf_counter() - t_pre,
+        )
+        active = screened
+        if not active:
+            return 0.0, 0.0, 0.0, 0.0, []
+    active_chunks = [query_chunks[qi] for qi in active]
+
+    n_workers = min(max_workers, len(active))
     logger.info(
         "find_matches[%s]: %d query chunks x %d repo chunks (workers=%d)",
-        model_name, len(query_chunks), len(repo_chunks), n_workers,
+        model_name, len(active), len(repo_chunks), n_workers,
     )
 
     use_faiss = (
-        faiss is not None
-        and build_index_from_chunks is not None
+        build_index_from_chunks is not None
         and search_faiss is not None
         and len(repo_chunks) >= FAISS_MIN_CHUNKS
+        and _faiss_available()
     )
 
     if use_faiss:
@@ -1072,10 +1271,33 @@ def find_matches(
                 save_index_to_disk(repo_type, owner_id, index, chunk_infos, model_name)
         if index is not None and chunk_infos:
             t_enc = time.perf_counter()
-            query_embeddings = encode_chunks(query_chunks, model_name=model_name)
+            report("encode", 0, len(active_chunks))
+            query_embeddings = encode_chunks(
+                active_chunks, model_name=model_name,
+                progress_callback=lambda done, total: report("encode", done, total),
+            )
             logger.info("find_matches: query encoding %.3fs", time.perf_counter() - t_enc)
-
-            faiss_results = search_faiss(index, chunk_infos, query_embeddings, k=DEFAULT_TOP_K)
+            report("search", 0, 1)
+
+            # Optional compressed first stage (EMBEDDING_COMPRESSION); survivors are re-scored
+            # with the full vectors, everything else goes straight to the full search.
+            from embedding_compression import compression_mode
+            comp_mode = compression_mode()
+            comp = None
+            if comp_mode != "off" and get_compressed_index is not None:
+                try:
+                    comp = get_compressed_index(repo_type, owner_id, index, model_name, comp_mode)
+                except Exception:
+                    logger.warning("find_matches: %s first stage unavailable, using full search", comp_mode, exc_info=True)
+            t_search = time.perf_counter()
+            if comp is not None:
+                faiss_results = search_faiss_compressed(index, chunk_infos, comp, query_embeddings, threshold)
+            else:
+                faiss_results = search_faiss(index, chunk_infos, query_embeddings, k=DEFAULT_TOP_K)
+            logger.info(
+                "find_matches[faiss]: search %.3fs (first stage: %s)",
+                time.perf_counter() - t_search, comp_mode if comp is not None else "off",
+            )
 
             # Phase 1: collect candidates in parallel (no sentence encoding)
             t_par = time.perf_counter()
@@ -1085,11 +1307,11 @@ def find_matches(
                 futures = {
                     pool.submit(
                         _collect_candidates_faiss, qi, query_chunks[qi],
-                        faiss_results[qi], threshold, min_lexical, min_fingerprint, model_name,
+                        faiss_results[pos], threshold, min_lexical, min_fingerprint, model_name,
                     ): qi
-                    for qi in range(len(query_chunks))
+                    for pos, qi in enumerate(active)
                 }
-                for future in as_completed(futures):
+                for done, future in enumerate(as_completed(futures), 1):
                     try:
                         res = future.result()
                         all_candidates.extend(res["candidates"])
@@ -1098,17 +1320,23 @@ def find_matches(
                             top_per_qi[qi] = res["top"]
                     except Exception:
                         logger.warning("find_matches: chunk %d failed", futures[future], exc_info=True)
+                    report("candidates", done, len(futures), f"{len(all_candidates)} candidates")
 
             logger.info("find_matches[faiss]: candidate collection %.3fs (%d candidates)", time.perf_counter() - t_par, len(all_candidates))
 
             # Phase 2: batch encode all sentences at once, then build match records
+            report("sentences", 0, 1)
             final = _batch_sentence_match(all_candidates, top_per_qi, len(query_chunks), model_name, thr_cfg)
             logger.info("find_matches: completed in %.3fs — %d matches", time.perf_counter() - t_start, len(final[4]))
             return final
 
     # Brute-force path: parallel comparison of each query chunk against every repo chunk.
     t_enc = time.perf_counter()
-    query_embeddings = encode_chunks(query_chunks, model_name=model_name)
+    report("encode", 0, len(active_chunks))
+    query_embeddings = encode_chunks(
+        active_chunks, model_name=model_name,
+        progress_callback=lambda done, total: report("encode", done, total),
+    )
     logger.info("find_matches: query encoding %.3fs", time.perf_counter() - t_enc)
 
     # Phase 1: collect candidates in parallel (no sentence encoding)
@@ -1118,12 +1346,12 @@ def find_matches(
     with ThreadPoolExecutor(max_workers=n_workers) as pool:
         futures = {
             pool.submit(
-                _collect_candidates_bruteforce, qi, query_embeddings[qi],
+                _collect_candidates_bruteforce, qi, query_embeddings[pos],
                 query_chunks[qi], repo_chunks, threshold, min_lexical, min_fingerprint, model_name,
             ): qi
-            for qi in range(len(query_chunks))
+            for pos, qi in enumerate(active)
         }
-        for future in as_completed(futures):
+        for done, future in enumerate(as_completed(futures), 1):
             try:
                 res = future.result()
                 all_candidates.extend(res["candidates"])
@@ -1132,10 +1360,12 @@ def find_matches(
                     top_per_qi[qi] = res["top"]
             except Exception:
                 logger.warning("find_matches: chunk %d failed", futures[future], exc_info=True)
+            report("candidates", done, len(futures), f"{len(all_candidates)} candidates")
 
     logger.info("find_matches[brute-force]: candidate collection %.3fs (%d candidates)", time.perf_counter() - t_par, len(all_candidates))
 
     # Phase 2: batch encode all sentences at once, then build match records
+    report("sentences", 0, 1)
     final = _batch_sentence_match(all_candidates, top_per_qi, len(query_chunks), model_name, thr_cfg)
     logger.info("find_matches: completed in %.3fs — %d matches", time.perf_counter() - t_start, len(final[4]))
     return final
@@ -11,6 +11,7 @@ Ki dekhabe:
   3. Paraphrase detection test
   4. Lexical / Fingerprint / Winnowing scores breakdown
   5. Large paragraph vs query sentences - top matches table
+  6. Compressed first-stage search (PCA / float16 / int8) - recall, memory, latency
 """
 
 import sys
@@ -253,8 +254,84 @@ def main():
         r_short = (best_ref[:48] + "…") if len(best_ref) > 48 else best_ref
         print(f"  {qi+1:<3} {sim_str:<15} {c(q_short, BOLD):<54} {c(r_short, DIM)}{flag}")
 
-    # ── 5. Summary ───────────────────────────────────────────────────────────
-    section("5 ▸ Summary")
+    # ── 5. Compressed first-stage search ─────────────────────────────────────
+    section("5 ▸ Compressed First-Stage Search (EMBEDDING_COMPRESSION)")
+    import numpy as np
+    from embedding_compression import build_compressed, compressed_nbytes, COMPRESSION_MARGIN
+
+    # Repo = every reference vector above, padded with noisy copies of them so the
+    # latency / memory numbers are measured on a repository of realistic size. Recall is
+    # reported separately for the real reference rows and for the synthetic padding.
+    N_REPO = 20000
+    real = np.vstack([r_embs, ref_embs2]).astype(np.float32)
+    n_real = len(real)
+    rng = np.random.default_rng(0)
+    base = real[rng.integers(0, n_real, N_REPO - n_real)]
+    noise = rng.standard_normal(base.shape).astype(np.float32) * 0.06
+    repo = np.vstack([real, base + noise])
+    repo /= np.linalg.norm(repo, axis=1, keepdims=True)
+    queries = np.vstack([q_embs, q_embs2]).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    import faiss_index
+    faiss = faiss_index._load_faiss()
+    if faiss is None:
+        print(c("  [SKIP] faiss is not installed; the compressed first stage is only used with FAISS.", YELLOW))
+    else:
+        # The production path: a flat FAISS index searched by search_faiss, which the compressed
+        # first stage (search_faiss_compressed) replaces. The full index stays resident either way.
+        index = faiss.IndexFlatIP(repo.shape[1])
+        index.add(repo)
+        chunk_infos = [{"row": i} for i in range(N_REPO)]
+        index_bytes = index.ntotal * index.d * 4
+
+        t_full = time.perf_counter()
+        full_results = faiss_index.search_faiss(index, chunk_infos, queries)
+        full_ms = (time.perf_counter() - t_full) * 1000
+        exact = queries @ repo.T
+        relevant = [set(np.nonzero(exact[qi] >= THRESHOLD)[0].tolist()) for qi in range(len(queries))]
+        best = [int(full_results[qi][0][0]["row"]) for qi in range(len(queries))]
+
+        def split_recall(kept_sets):
+            # (recall on the real reference rows, recall on the padding rows); 1.0 when nothing is relevant.
+            out = []
+            for in_part in (lambda i: i < n_real, lambda i: i >= n_real):
+                want = [{i for i in rel if in_part(i)} for rel in relevant]
+                total = sum(len(w) for w in want)
+                got = sum(len(w & kept) for w, kept in zip(want, kept_sets))
+                out.append(got / total if total else 1.0)
+            return out
+
+        def fmt_recall(value):
+            colour = GREEN if value >= 0.99 else (YELLOW if value >= 0.95 else RED)
+            return c(f"{value*100:6.1f}%", colour)
+
+        n_rel_real = sum(1 for rel in relevant for i in rel if i < n_real)
+        n_rel_pad = sum(1 for rel in relevant for i in rel if i >= n_real)
+        print(f"  Repo     : {c(str(N_REPO), CYAN)} vectors x {repo.shape[1]} dims ({n_real} real + {N_REPO - n_real} synthetic), "
+              f"{len(queries)} queries, margin {COMPRESSION_MARGIN:.2f}")
+        print(f"  Relevant : {c(str(n_rel_real), CYAN)} real / {n_rel_pad} synthetic (query, chunk) pairs at or above {THRESHOLD:.2f}")
+        print("  Memory   : resident = full FAISS index + compressed copy; scanned = bytes read by the first stage")
+        print()
+        print(c(f"  {'Mode':<10} {'Resident':>10} {'vs full':>8} {'Scanned':>9} {'Recall real':>12} {'Recall synth':>13} {'Top-1':>6} {'Survivors/q':>12} {'Search':>10}", DIM))
+        print(c("  " + "─"*98, DIM))
+        print(f"  {'full':<10} {index_bytes/1e6:>8.1f}MB {'1.00x':>8} {index_bytes/1e6:>7.1f}MB {fmt_recall(1.0):>21} {fmt_recall(1.0):>22} {'100%':>6} {N_REPO:>12} {full_ms:>8.1f}ms")
+        for mode in ("pca", "float16", "int8"):
+            comp = build_compressed(repo, mode)
+            t_cmp = time.perf_counter()
+            rows = faiss_index.search_faiss_compressed(index, chunk_infos, comp, queries, THRESHOLD)
+            cmp_ms = (time.perf_counter() - t_cmp) * 1000
+            kept_sets = [{info["row"] for info, _ in row} for row in rows]
+            recall_real, recall_pad = split_recall(kept_sets)
+            top1 = sum(1 for qi, row in enumerate(rows) if row and row[0][0]["row"] == best[qi]) / len(queries)
+            mem = compressed_nbytes(comp)
+            resident = index_bytes + mem
+            avg_surv = sum(len(row) for row in rows) / len(queries)
+            print(f"  {mode:<10} {resident/1e6:>8.1f}MB {resident/index_bytes:>7.2f}x {mem/1e6:>7.1f}MB "
+                  f"{fmt_recall(recall_real):>21} {fmt_recall(recall_pad):>22} {top1*100:>5.0f}% {avg_surv:>12.0f} {cmp_ms:>8.1f}ms")
+
+    # ── 6. Summary ───────────────────────────────────────────────────────────
+    section("6 ▸ Summary")
     matched_pairs  = sum(1 for i in range(len(SENTENCE_PAIRS))
                          if cosine_similarity(q_embs[i], r_embs[i]) >= THRESHOLD
                          and SENTENCE_PAIRS[i][2] == "plagiarism")
@@ -4,22 +4,48 @@
 
 import os
 # Used for joining path when saving/loading index to disk.
+import threading
+import concurrency_config  # first: sets BLAS/OpenMP threads before numpy loads
 import numpy as np
 # NumPy arrays for embeddings; FAISS expects float32 arrays.
 
 # Optional import: FAISS is used for fast nearest-neighbor search over vectors.
-try:
-    import faiss
-    # Move index to GPU if CUDA is available (faiss-gpu must be installed).
-    try:
-        import torch as _torch
-        _GPU_AVAILABLE = _torch.cuda.is_available()
-    except Exception:
-        _GPU_AVAILABLE = False
-except ImportError:
-    faiss = None
-    _GPU_AVAILABLE = False
-    # If faiss-cpu is not installed, we fall back to brute-force in embedding_pipeline.
+# Imported lazily on first use so that importing this module (e.g. just to invalidate
+# the cache from main.py) does not pay for faiss + torch at server startup.
+faiss = None
+_GPU_AVAILABLE = False
+_FAISS_LOADED = False
+_FAISS_LOCK = threading.Lock()
+
+
+def _load_faiss():
+    # Import faiss once; returns the module or None if faiss-cpu is not installed.
+    global faiss, _GPU_AVAILABLE, _FAISS_LOADED
+    if _FAISS_LOADED:
+        return faiss
+    with _FAISS_LOCK:
+        if _FAISS_LOADED:
+            return faiss
+        try:
+            import faiss as _faiss
+            faiss = _faiss
+            # Move index to GPU if CUDA is available (faiss-gpu must be installed).
+            try:
+                import torch as _torch
+                _GPU_AVAILABLE = _torch.cuda.is_available()
+            except Exception:
+                _GPU_AVAILABLE = False
+        except ImportError:
+            # If faiss-cpu is not installed, we fall back to brute-force in embedding_pipeline.
+            faiss = None
+            _GPU_AVAILABLE = False
+        _FAISS_LOADED = True
+    return faiss
+
+
+def faiss_available() -> bool:
+    # True when faiss-cpu (or faiss-gpu) can be imported.
+    return _load_faiss() is not None
 
 # Resolve this file's directory so we can place cache next to backend.
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -31,6 +57,21 @@ FAISS_MIN_CHUNKS = 20
 # Set high enough so large documents (250-page PDFs) return all matching chunks.
 DEFAULT_TOP_K = 50
 
+# In-process copies of indexes already read from disk (key -> (mtime, index, chunk_infos)),
+# so repeated scans and the startup warmup do not re-read the .faiss/.meta files.
+# The .faiss file mtime is re-checked on every load, so an index rebuilt or invalidated
+# by another process is never served stale.
+_LOADED_INDEXES: dict = {}
+# Compressed first-stage copies (key -> (source .faiss mtime, comp)); see embedding_compression.
+_LOADED_COMPRESSED: dict = {}
+
+
+def _file_mtime(path: str):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
 
 def _index_key(repo_type: str, owner_id, model_name: str = "default") -> str:
     # Build a unique key for this repository + model so we never mix indexes from different models.
@@ -50,6 +91,7 @@ def _ensure_index_dir():
 
 def build_index_from_chunks(repo_chunks: list) -> tuple:
     # Build a FAISS index from repo chunks; returns (index, chunk_infos) with chunk_infos[i] = metadata for index row i.
+    faiss = _load_faiss()
     if faiss is None:
         return None, []
     if not repo_chunks:
@@ -99,7 +141,8 @@ def build_index_from_chunks(repo_chunks: list) -> tuple:
 
 def search_faiss(index, chunk_infos: list, query_embeddings: np.ndarray, k: int = DEFAULT_TOP_K):
     # Run Top-K search: for each query vector, return k nearest repo chunks (chunk_info, similarity).
-    if index is None or not chunk_infos or query_embeddings is None or len(query_embeddings) == 0:
+    faiss = _load_faiss()
+    if faiss is None or index is None or not chunk_infos or query_embeddings is None or len(query_embeddings) == 0:
         return []
     # Copy and ensure float32; FAISS expects 2D array (n_queries, dim).
     Q = np.asarray(query_embeddings, dtype=np.float32)
@@ -111,6 +154,8 @@ def search_faiss(index, chunk_infos: list, query_embeddings: np.ndarray, k: int
     k = index.ntotal
     if k <= 0:
         return []
+    # OpenMP thread counts are per thread, so size FAISS in the thread that runs the search.
+    concurrency_config.apply_faiss(faiss)
     # D = similarities (inner products), I = indices into chunk_infos.
     D, I = index.search(Q, k)
     results = []
@@ -128,8 +173,68 @@ def search_faiss(index, chunk_infos: list, query_embeddings: np.ndarray, k: int
     return results
 
 
+def _reconstruct_rows(index, ids: np.ndarray) -> np.ndarray:
+    # Pull the full (normalized) vectors for the given rows back out of the flat index.
+    ids = np.asarray(ids, dtype=np.int64)
+    try:
+        return index.reconstruct_batch(ids)
+    except Exception:
+        return np.vstack([index.reconstruct(int(i)) for i in ids]) if len(ids) else np.empty((0, index.d), dtype=np.float32)
+
+
+def get_compressed_index(repo_type, owner_id, index, model_name: str = "default", mode: str = "off"):
+    # Return the compressed copy of this index's vectors, loading or building (and saving) it as needed.
+    from embedding_compression import build_compressed, save_compressed, load_compressed
+    # Unsaved indexes are rebuilt for every scan, so compressing one would cost more than
+    # the single full search it replaces.
+    if index is None or mode == "off" or index.ntotal == 0 or repo_type is None:
+        return None
+    key = _index_key(repo_type, owner_id, model_name)
+    src_mtime = _file_mtime(os.path.join(INDEX_DIR, f"{key}.faiss")) or 0.0
+    cached = _LOADED_COMPRESSED.get((key, mode))
+    if cached is not None and cached[0] == src_mtime:
+        return cached[1]
+    path = os.path.join(INDEX_DIR, f"{key}.{mode}.npz")
+    comp, saved_mtime = load_compressed(path) if os.path.isfile(path) else (None, None)
+    if comp is None or saved_mtime != src_mtime or comp["codes"].shape[0] != index.ntotal:
+        comp = build_compressed(_reconstruct_rows(index, np.arange(index.ntotal)), mode)
+        _ensure_index_dir()
+        save_compressed(path, comp, src_mtime)
+    _LOADED_COMPRESSED[(key, mode)] = (src_mtime, comp)
+    return comp
+
+
+def search_faiss_compressed(index, chunk_infos: list, comp: dict, query_embeddings: np.ndarray, threshold: float):
+    # Two-stage search: scan the compressed copy, then re-score the survivors with the full vectors.
+    # Returns the same per-query [(chunk_info, similarity), ...] rows as search_faiss, best first.
+    from embedding_compression import first_stage
+    faiss = _load_faiss()
+    if faiss is None or index is None or comp is None or not chunk_infos or query_embeddings is None or len(query_embeddings) == 0:
+        return []
+    Q = np.array(query_embeddings, dtype=np.float32)
+    if Q.ndim == 1:
+        Q = Q.reshape(1, -1)
+    faiss.normalize_L2(Q)
+    survivors = first_stage(comp, Q, threshold)
+    union = np.unique(np.concatenate(survivors)) if survivors else np.empty(0, dtype=np.int64)
+    union = union[union < len(chunk_infos)]
+    if union.size == 0:
+        return [[] for _ in range(Q.shape[0])]
+    full = _reconstruct_rows(index, union)
+    results = []
+    for qi in range(Q.shape[0]):
+        ids = survivors[qi]
+        # Every surviving id is in `union`, so searchsorted gives its row in `full`.
+        pos = np.searchsorted(union, ids[ids < len(chunk_infos)])
+        sims = full[pos] @ Q[qi]
+        order = np.argsort(-sims)
+        results.append([(chunk_infos[int(union[pos[j]])], float(sims[j])) for j in order])
+    return results
+
+
 def save_index_to_disk(repo_type: str, owner_id, index, chunk_infos: list, model_name: str = "default"):
     # Save FAISS index and chunk metadata to disk so we can reload without rebuilding from DB.
+    faiss = _load_faiss()
     if faiss is None or index is None:
         return
     _ensure_index_dir()
@@ -145,17 +250,23 @@ def save_index_to_disk(repo_type: str, owner_id, index, chunk_infos: list, model
     meta_path = os.path.join(INDEX_DIR, f"{key}.meta")
     with open(meta_path, "w", encoding="utf-8") as f:
         json.dump(chunk_infos, f)
+    _LOADED_INDEXES[key] = (_file_mtime(index_path), index, chunk_infos)
 
 
 def load_index_from_disk(repo_type: str, owner_id, model_name: str = "default") -> tuple:
     # Load FAISS index and chunk_infos from disk; returns (index, chunk_infos) or (None, []).
+    faiss = _load_faiss()
     if faiss is None:
         return None, []
     key = _index_key(repo_type, owner_id, model_name)
     index_path = os.path.join(INDEX_DIR, f"{key}.faiss")
     meta_path = os.path.join(INDEX_DIR, f"{key}.meta")
     if not os.path.isfile(index_path) or not os.path.isfile(meta_path):
+        _LOADED_INDEXES.pop(key, None)
         return None, []
+    cached = _LOADED_INDEXES.get(key)
+    if cached is not None and cached[0] == _file_mtime(index_path):
+        return cached[1], cached[2]
     try:
         index = faiss.read_index(index_path)
         # Move to GPU if available for faster search.
@@ -173,6 +284,7 @@ def load_index_from_disk(repo_type: str, owner_id, model_name: str = "default")
             chunk_infos = json.load(f)
     except Exception:
         return None, []
+    _LOADED_INDEXES[key] = (_file_mtime(index_path), index, chunk_infos)
     return index, chunk_infos
 
 
@@ -180,7 +292,10 @@ def invalidate_cached_index(repo_type: str, owner_id, model_name: str = "default
     # Remove cached index for this repo+model so next search rebuilds from DB.
     _ensure_index_dir()
     key = _index_key(repo_type, owner_id, model_name)
-    for ext in (".faiss", ".meta"):
+    _LOADED_INDEXES.pop(key, None)
+    for cached_key in [k for k in _LOADED_COMPRESSED if k[0] == key]:
+        _LOADED_COMPRESSED.pop(cached_key, None)
+    for ext in (".faiss", ".meta", ".pca.npz", ".float16.npz", ".int8.npz"):
         path = os.path.join(INDEX_DIR, f"{key}{ext}")
         try:
             if os.path.isfile(path):
@@ -191,6 +306,8 @@ def invalidate_cached_index(repo_type: str, owner_id, model_name: str = "default
 
 def invalidate_all_cached_indexes():
     # Remove all cached FAISS indexes (e.g. when a document is deleted and we do not know its repo).
+    _LOADED_INDEXES.clear()
+    _LOADED_COMPRESSED.clear()
     if not os.path.isdir(INDEX_DIR):
         return
     for name in os.listdir(INDEX_DIR):
@@ -0,0 +1,131 @@
+"""
+Background expiry for the server's in-memory state.
+
+Sessions, rate-limit windows and finished jobs used to be pruned only as a side effect of
+new requests (or never), and each prune scanned everything. Here every expiring key sits in
+an ExpiryIndex, a min-heap of deadlines with one entry per key, and a single Housekeeper
+task wakes every HOUSEKEEPING_INTERVAL seconds to run the registered sweeps. A sweep only
+touches keys whose deadline has passed, so its cost follows what expires, not what exists.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_INTERVAL = float(os.getenv("HOUSEKEEPING_INTERVAL", "30"))
+
+
+class ExpiryIndex:
+    """Deadline per key, popped in deadline order.
+
+    Extending a key's deadline only updates a dict; the heap entry is re-pushed when it
+    surfaces early, so a hot key (a busy client IP) never piles up heap entries. Thread-safe:
+    keys are scheduled from request threads and popped from the housekeeping thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deadlines: Dict[Hashable, float] = {}
+        self._heap: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        with self._lock:
+            current = self._deadlines.get(key)
+            self._deadlines[key] = deadline
+            if current is None or deadline < current:
+                heapq.heappush(self._heap, (deadline, key))
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._deadlines.pop(key, None)  # its heap entry is skipped when it surfaces
+
+    def pop_expired(self, now: float = None) -> List[Hashable]:
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._pop_expired_locked(now)
+
+    def _pop_expired_locked(self, now: float) -> List[Hashable]:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            when, key = heapq.heappop(self._heap)
+            deadline = self._deadlines.get(key)
+            if deadline is None or deadline < when:
+                continue  # discarded, or superseded by an earlier entry
+            if deadline > when:
+                heapq.heappush(self._heap, (deadline, key))  # extended since it was pushed
+                continue
+            del self._deadlines[key]
+            expired.append(key)
+        # Discarded keys leave stale heap entries behind; rebuild once they dominate.
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, k) for k, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+        return expired
+
+
+class Housekeeper:
+    """Runs named sweep functions on a timer and keeps their last results for /admin stats."""
+
+    def __init__(self, interval: float = HOUSEKEEPING_INTERVAL):
+        self.interval = max(1.0, interval)
+        self._sweeps: Dict[str, Callable[[], int]] = {}
+        self._gauges: Dict[str, Callable[[], object]] = {}
+        self._stats: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.last_run_at: Optional[float] = None
+
+    def add_sweep(self, name: str, fn: Callable[[], int]) -> None:
+        """fn() removes what has expired and returns how many entries it dropped."""
+        self._sweeps[name] = fn
+        self._stats[name] = {"last_removed": 0, "total_removed": 0, "last_seconds": 0.0, "error": None}
+
+    def add_gauge(self, name: str, fn: Callable[[], object]) -> None:
+        """fn() reports the current size of something, for counts()."""
+        self._gauges[name] = fn
+
+    def run_once(self) -> None:
+        for name, fn in self._sweeps.items():
+            stats = self._stats[name]
+            started = time.perf_counter()
+            try:
+                removed = int(fn() or 0)
+                stats["last_removed"] = removed
+                stats["total_removed"] += removed
+                stats["error"] = None
+            except Exception as e:
+                logger.exception("Housekeeping sweep %s failed", name)
+                stats["error"] = str(e)
+            stats["last_seconds"] = round(time.perf_counter() - started, 4)
+        self.last_run_at = time.time()
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # Sweeps are small and mostly in-memory; the job store one touches SQLite.
+            await asyncio.to_thread(self.run_once)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    def counts(self) -> dict:
+        sizes = {}
+        for name, fn in self._gauges.items():
+            try:
+                sizes[name] = fn()
+            except Exception as e:
+                sizes[name] = {"error": str(e)}
+        return {
+            "interval_seconds": self.interval,
+            "last_run_at": self.last_run_at,
+            "sizes": sizes,
+            "sweeps": self._stats,
+        }
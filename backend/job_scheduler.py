@@ -0,0 +1,204 @@
+"""
+Bounded job scheduler for analysis jobs.
+
+A fixed number of asyncio workers pull from a bounded priority queue:
+teachers/admins before students, then smaller submissions first. Jobs that have
+waited a long time are aged forward so a large document is never starved. When the
+queue is full (or a user already has too many jobs waiting) submit() raises, and the
+caller answers 503/429 with a Retry-After header instead of letting every job slow down.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "2"))
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "200"))
+# Max queued + running jobs per user (0 = unlimited). Teachers bulk-upload, so no cap by default.
+SCHEDULER_STUDENT_LIMIT = int(os.getenv("SCHEDULER_STUDENT_LIMIT", "3"))
+SCHEDULER_TEACHER_LIMIT = int(os.getenv("SCHEDULER_TEACHER_LIMIT", "0"))
+# Every SCHEDULER_AGING_SECONDS of waiting halves a job's effective size.
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "60"))
+# Initial guess for one job's run time, refined by a moving average of real runs.
+_INITIAL_JOB_SECONDS = 20.0
+
+
+class SchedulerFull(Exception):
+    """Queue is at capacity (HTTP 503)."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy. Please try again shortly.")
+        self.retry_after = retry_after
+
+
+class UserLimitExceeded(Exception):
+    """The user already has the maximum number of jobs waiting or running (HTTP 429)."""
+
+    def __init__(self, retry_after: int, limit: int):
+        super().__init__(f"You already have {limit} submissions in progress. Please wait for one to finish.")
+        self.retry_after = retry_after
+
+
+def role_priority(role: str) -> int:
+    # Lower runs first.
+    return 1 if (role or "").lower() == "student" else 0
+
+
+class _QueuedJob:
+    __slots__ = ("job_id", "run", "priority", "size", "user_key", "seq", "enqueued_at", "last_position")
+
+    def __init__(self, job_id, run, priority, size, user_key, seq):
+        self.job_id = job_id
+        self.run = run
+        self.priority = priority
+        self.size = max(1, int(size or 1))
+        self.user_key = user_key
+        self.seq = seq
+        self.enqueued_at = time.time()
+        self.last_position = None
+
+    def sort_key(self, now: float):
+        waited = now - self.enqueued_at
+        effective = self.size / (2 ** (waited / SCHEDULER_AGING_SECONDS)) if SCHEDULER_AGING_SECONDS > 0 else self.size
+        return (self.priority, effective, self.seq)
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        workers: int = SCHEDULER_WORKERS,
+        max_queue: int = SCHEDULER_MAX_QUEUE,
+        on_position: Optional[Callable[[str, int, int, int], Awaitable[None]]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        # on_position(job_id, position, queue_length, eta_seconds) — reported whenever a job moves.
+        self.on_position = on_position
+        self._pending: list = []
+        self._running: Dict[str, _QueuedJob] = {}
+        self._per_user: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+        self._tasks: list = []
+        self._avg_seconds = _INITIAL_JOB_SECONDS
+        self._completed = 0
+        self._rejected = 0
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+    def start(self):
+        if self._tasks:
+            return
+        self._cond = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info("JobScheduler: %d workers, queue capacity %d", self.workers, self.max_queue)
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ── admission ────────────────────────────────────────────────────────────
+    def _retry_after(self, ahead: int) -> int:
+        return int(min(600, max(5, math.ceil(ahead / self.workers) * self._avg_seconds)))
+
+    def check_admission(self, user_key: Optional[str], role: str) -> None:
+        """Raise SchedulerFull / UserLimitExceeded if a new job from this user would be refused."""
+        if len(self._pending) >= self.max_queue:
+            self._rejected += 1
+            raise SchedulerFull(self._retry_after(len(self._pending)))
+        limit = SCHEDULER_STUDENT_LIMIT if role_priority(role) else SCHEDULER_TEACHER_LIMIT
+        if user_key and limit > 0 and self._per_user.get(user_key, 0) >= limit:
+            self._rejected += 1
+            raise UserLimitExceeded(self._retry_after(1), limit)
+
+    async def submit(
+        self,
+        job_id: str,
+        run: Callable[[], Awaitable[None]],
+        role: str = "teacher",
+        size: int = 1,
+        user_key: Optional[str] = None,
+    ) -> int:
+        """Queue run() and return the job's initial queue position (1-based)."""
+        if self._cond is None:
+            self.start()
+        self.check_admission(user_key, role)
+        job = _QueuedJob(job_id, run, role_priority(role), size, user_key, next(self._seq))
+        async with self._cond:
+            self._pending.append(job)
+            if user_key:
+                self._per_user[user_key] = self._per_user.get(user_key, 0) + 1
+            self._cond.notify()
+        positions = await self._publish_positions()
+        return positions.get(job_id, 1)
+
+    # ── execution ────────────────────────────────────────────────────────────
+    def _ordered(self) -> list:
+        now = time.time()
+        return sorted(self._pending, key=lambda j: j.sort_key(now))
+
+    async def _publish_positions(self) -> dict:
+        ordered = self._ordered()
+        positions = {}
+        for i, job in enumerate(ordered):
+            pos = i + 1
+            positions[job.job_id] = pos
+            if job.last_position == pos or self.on_position is None:
+                continue
+            job.last_position = pos
+            # Jobs ahead of this one plus those running, spread over the workers.
+            eta = int(math.ceil((pos - 1 + len(self._running)) / self.workers) * self._avg_seconds)
+            try:
+                await self.on_position(job.job_id, pos, len(ordered), eta)
+            except Exception:
+                logger.debug("JobScheduler: position callback failed for %s", job.job_id, exc_info=True)
+        return positions
+
+    async def _worker(self, idx: int):
+        while True:
+            async with self._cond:
+                while not self._pending:
+                    await self._cond.wait()
+                job = self._ordered()[0]
+                self._pending.remove(job)
+                self._running[job.job_id] = job
+            await self._publish_positions()
+            started = time.time()
+            try:
+                await job.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("JobScheduler: job %s failed", job.job_id)
+            finally:
+                elapsed = time.time() - started
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+                self._completed += 1
+                self._running.pop(job.job_id, None)
+                if job.user_key:
+                    left = self._per_user.get(job.user_key, 1) - 1
+                    if left > 0:
+                        self._per_user[job.user_key] = left
+                    else:
+                        self._per_user.pop(job.user_key, None)
+
+    def is_active(self, job_id: str) -> bool:
+        """True while the job is queued or running."""
+        return job_id in self._running or any(j.job_id == job_id for j in self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": len(self._running),
+            "queued": len(self._pending),
+            "capacity": self.max_queue,
+            "avg_job_seconds": round(self._avg_seconds, 1),
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
@@ -0,0 +1,369 @@
+"""
+Job store for analysis and comparison jobs: state, progress events and results.
+
+main.py used to keep these in module-level dicts, which tied every job to the process that
+accepted it. The store puts them behind one interface with two implementations:
+
+    JOB_STORE=sqlite (default)  jobs.db next to auth.db; shared by all uvicorn workers on the
+                                host and kept across restarts
+    JOB_STORE=memory            plain dicts guarded by a lock, for tests and single-process runs
+
+Progress events get a per-job sequence number (1, 2, 3, ...) so a client can resume a stream
+after the last event it saw. Each active job has an owner (the worker process running it)
+that refreshes a heartbeat; a job whose owner stops heartbeating is an orphan, and another
+worker claims it and runs it again from its stored params.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+JOB_STORE = os.getenv("JOB_STORE", "sqlite").strip().lower()
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.abspath(os.path.join(_THIS_DIR, "..", "jobs.db")))
+# Workers refresh their jobs' heartbeat this often; a job unrefreshed for JOB_ORPHAN_SECONDS is requeued.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_ORPHAN_SECONDS = float(os.getenv("JOB_ORPHAN_SECONDS", "45"))
+# A job that keeps getting orphaned is failed after this many runs.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+ACTIVE_STATES = ("queued", "running")
+FINAL_STATES = ("done", "failed")
+# Result fields holding blob_store digests; the blob sweep keeps these while the job exists.
+BLOB_DIGEST_FIELDS = ("source_pdf_sha256", "highlighted_pdf_sha256")
+
+
+def _final_state_for(event: dict) -> Optional[str]:
+    if "error" in event:
+        return "failed"
+    if event.get("progress") == 100 and event.get("stage") == "Done":
+        return "done"
+    return None
+
+
+class MemoryJobStore:
+    """In-process store. Jobs are lost on restart and invisible to other workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, dict] = {}
+        self._events: Dict[str, List[Tuple[int, dict]]] = {}
+        self._results: Dict[str, dict] = {}
+
+    def create(self, job_id: str, kind: str, params: dict, owner: Optional[str], state: str = "queued") -> None:
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id, "kind": kind, "state": state, "params": params, "owner": owner,
+                "heartbeat_at": now, "attempts": 0, "error": None,
+                "created_at": now, "updated_at": now, "last_seq": 0,
+            }
+            self._events[job_id] = []
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def set_state(self, job_id: str, state: str, error: str = None) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(state=state, error=error, updated_at=time.time())
+
+    def append_event(self, job_id: str, event: dict) -> int:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return 0
+            job["last_seq"] += 1
+            self._events[job_id].append((job["last_seq"], event))
+            final = _final_state_for(event)
+            if final:
+                job.update(state=final, error=event.get("error"), updated_at=time.time())
+            return job["last_seq"]
+
+    def events(self, job_id: str, after: int = 0) -> List[Tuple[int, dict]]:
+        with self._lock:
+            return [(seq, ev) for seq, ev in self._events.get(job_id, ()) if seq > after]
+
+    def save_result(self, job_id: str, data: dict) -> None:
+        with self._lock:
+            self._results[job_id] = data
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._results.get(job_id)
+
+    def blob_digests(self) -> Set[str]:
+        with self._lock:
+            return {r[f] for r in self._results.values() for f in BLOB_DIGEST_FIELDS if r.get(f)}
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["state"] not in ACTIVE_STATES:
+                return False
+            if job["owner"] not in (None, owner) and now - job["heartbeat_at"] < JOB_ORPHAN_SECONDS:
+                return False
+            job.update(owner=owner, state="running", heartbeat_at=now, updated_at=now)
+            return True
+
+    def heartbeat(self, owner: str) -> int:
+        now = time.time()
+        with self._lock:
+            mine = [j for j in self._jobs.values() if j["owner"] == owner and j["state"] in ACTIVE_STATES]
+            for job in mine:
+                job["heartbeat_at"] = now
+            return len(mine)
+
+    def claim_orphans(self, owner: str) -> List[dict]:
+        now = time.time()
+        claimed = []
+        with self._lock:
+            for job in self._jobs.values():
+                if job["state"] not in ACTIVE_STATES or now - job["heartbeat_at"] < JOB_ORPHAN_SECONDS:
+                    continue
+                job.update(owner=owner, state="queued", heartbeat_at=now, updated_at=now, attempts=job["attempts"] + 1)
+                claimed.append(dict(job))
+        return claimed
+
+    def release(self, job_id: str, owner: str) -> bool:
+        """Give back a claimed job that could not be started, so the next orphan sweep retries it."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["owner"] != owner or job["state"] not in ACTIVE_STATES:
+                return False
+            job.update(owner=None, state="queued", heartbeat_at=0.0, updated_at=time.time(),
+                       attempts=max(job["attempts"] - 1, 0))
+            return True
+
+    def expire(self, ttl: float) -> int:
+        cutoff = time.time() - ttl
+        with self._lock:
+            stale = [k for k, j in self._jobs.items() if j["state"] in FINAL_STATES and j["updated_at"] < cutoff]
+            for k in stale:
+                self._jobs.pop(k, None)
+                self._events.pop(k, None)
+                self._results.pop(k, None)
+            return len(stale)
+
+    def counts(self) -> dict:
+        with self._lock:
+            counts = {state: 0 for state in ACTIVE_STATES + FINAL_STATES}
+            for job in self._jobs.values():
+                counts[job["state"]] = counts.get(job["state"], 0) + 1
+            counts["events"] = sum(len(v) for v in self._events.values())
+            counts["results"] = len(self._results)
+            return counts
+
+
+class SqliteJobStore:
+    """Store in a SQLite file (WAL mode) that every worker process on the host opens."""
+
+    def __init__(self, db_path: str = JOB_STORE_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL,
+                params TEXT,
+                owner TEXT,
+                heartbeat_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                last_seq INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS job_results (
+                job_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_state_heartbeat ON jobs(state, heartbeat_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_state_updated ON jobs(state, updated_at);
+        """)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread: calls come from the event loop and from worker threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        return {
+            "job_id": row[0], "kind": row[1], "state": row[2],
+            "params": json.loads(row[3]) if row[3] else {}, "owner": row[4],
+            "heartbeat_at": row[5], "attempts": row[6], "error": row[7],
+            "created_at": row[8], "updated_at": row[9], "last_seq": row[10],
+        }
+
+    _JOB_COLUMNS = "job_id, kind, state, params, owner, heartbeat_at, attempts, error, created_at, updated_at, last_seq"
+
+    def create(self, job_id: str, kind: str, params: dict, owner: Optional[str], state: str = "queued") -> None:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, kind, state, params, owner, heartbeat_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, state, json.dumps(params), owner, now, now, now),
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute(f"SELECT {self._JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def set_state(self, job_id: str, state: str, error: str = None) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (state, error, time.time(), job_id),
+            )
+
+    def append_event(self, job_id: str, event: dict) -> int:
+        conn = self._conn()
+        with conn:
+            # The UPDATE takes the write lock, so the sequence read back is ours alone.
+            if conn.execute("UPDATE jobs SET last_seq = last_seq + 1 WHERE job_id = ?", (job_id,)).rowcount == 0:
+                return 0
+            row = conn.execute("SELECT last_seq FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            seq = row[0]
+            conn.execute("INSERT INTO job_events (job_id, seq, event) VALUES (?, ?, ?)", (job_id, seq, json.dumps(event)))
+            final = _final_state_for(event)
+            if final:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                    (final, event.get("error"), time.time(), job_id),
+                )
+            return seq
+
+    def events(self, job_id: str, after: int = 0) -> List[Tuple[int, dict]]:
+        rows = self._conn().execute(
+            "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+        ).fetchall()
+        return [(seq, json.loads(ev)) for seq, ev in rows]
+
+    def save_result(self, job_id: str, data: dict) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO job_results (job_id, data) VALUES (?, ?)", (job_id, json.dumps(data)))
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT data FROM job_results WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def blob_digests(self) -> Set[str]:
+        digests = set()
+        for field in BLOB_DIGEST_FIELDS:
+            rows = self._conn().execute(
+                f"SELECT DISTINCT json_extract(data, '$.{field}') FROM job_results "
+                f"WHERE json_extract(data, '$.{field}') IS NOT NULL"
+            ).fetchall()
+            digests.update(r[0] for r in rows)
+        return digests
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "UPDATE jobs SET owner = ?, state = 'running', heartbeat_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND state IN ('queued', 'running') "
+                "AND (owner IS NULL OR owner = ? OR heartbeat_at < ?)",
+                (owner, now, now, job_id, owner, now - JOB_ORPHAN_SECONDS),
+            )
+            return cur.rowcount > 0
+
+    def heartbeat(self, owner: str) -> int:
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND state IN ('queued', 'running')",
+                (time.time(), owner),
+            )
+            return cur.rowcount
+
+    def claim_orphans(self, owner: str) -> List[dict]:
+        now = time.time()
+        conn = self._conn()
+        rows = conn.execute(
+            f"SELECT {self._JOB_COLUMNS} FROM jobs WHERE state IN ('queued', 'running') AND heartbeat_at < ?",
+            (now - JOB_ORPHAN_SECONDS,),
+        ).fetchall()
+        claimed = []
+        for row in rows:
+            job = self._row_to_job(row)
+            with conn:
+                # Compare-and-set on the old heartbeat so two workers never both take the job.
+                cur = conn.execute(
+                    "UPDATE jobs SET owner = ?, state = 'queued', heartbeat_at = ?, updated_at = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ? AND heartbeat_at = ? AND state IN ('queued', 'running')",
+                    (owner, now, now, job["job_id"], job["heartbeat_at"]),
+                )
+            if cur.rowcount:
+                job.update(owner=owner, state="queued", heartbeat_at=now, attempts=job["attempts"] + 1)
+                claimed.append(job)
+        return claimed
+
+    def release(self, job_id: str, owner: str) -> bool:
+        """Give back a claimed job that could not be started, so the next orphan sweep retries it."""
+        conn = self._conn()
+        with conn:
+            # heartbeat_at = 0 makes it an orphan straight away; the attempt it was charged is refunded.
+            cur = conn.execute(
+                "UPDATE jobs SET owner = NULL, state = 'queued', heartbeat_at = 0, updated_at = ?, "
+                "attempts = MAX(attempts - 1, 0) "
+                "WHERE job_id = ? AND owner = ? AND state IN ('queued', 'running')",
+                (time.time(), job_id, owner),
+            )
+            return cur.rowcount > 0
+
+    def expire(self, ttl: float) -> int:
+        cutoff = time.time() - ttl
+        conn = self._conn()
+        with conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT job_id FROM jobs WHERE state IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+            ).fetchall()]
+            for job_id in ids:
+                conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return len(ids)
+
+    def counts(self) -> dict:
+        conn = self._conn()
+        counts = {state: 0 for state in ACTIVE_STATES + FINAL_STATES}
+        for state, n in conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall():
+            counts[state] = n
+        counts["events"] = conn.execute("SELECT COUNT(*) FROM job_events").fetchone()[0]
+        counts["results"] = conn.execute("SELECT COUNT(*) FROM job_results").fetchone()[0]
+        return counts
+
+
+def create_job_store(kind: str = None):
+    """Build the store selected by JOB_STORE ('sqlite' or 'memory')."""
+    kind = (kind or JOB_STORE)
+    if kind == "memory":
+        return MemoryJobStore()
+    return SqliteJobStore()
@@ -1,38 +1,41 @@
 import asyncio
 import json
+import logging
 import os
 import secrets
+import socket
 import tempfile
 import time
 import uuid
-from collections import defaultdict
+from collections import deque
 from datetime import datetime, timezone
 
 from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from sse_starlette.sse import EventSourceResponse
 
 # Import our modules
+import concurrency_config  # noqa: F401  (first: sets BLAS/OpenMP thread counts before numpy loads)
+# Only lightweight modules are imported here. text_pipeline (PyPDF2/pdfplumber/fitz/pptx/nltk),
+# pdf_highlight_pipeline, diff_checker, report_generator and pdf_utils (reportlab) are imported
+# inside the handlers that use them, and torch is only touched when a model is loaded, so the
+# server answers /api/health straight away while the warmup tasks run in the background.
 from database import DatabaseManager
-from text_pipeline import (
-    process_document,
-    chunk_by_paragraphs,
-    chunk_by_words,
-    DocumentMetadata,
-    light_clean_preserve_newlines,
-)
-from document_store import save_document, list_documents, delete_document, update_document_path, get_stats, get_chunks_for_scan, get_chunks_with_embeddings, DB_PATH, filename_exists
-from embedding_pipeline import encode_chunks, find_matches, extract_top_similar_sentences, AVAILABLE_MODELS, DEFAULT_MODEL_NAME, _get_model
+from document_store import save_document, find_document_by_hash, get_repo_generation, list_documents, delete_document, update_document_path, get_stats, get_chunks_for_scan, get_chunks_with_embeddings, DB_PATH, filename_exists
+from embedding_pipeline import encode_chunks, encode_prescreen_chunks, find_matches, extract_top_similar_sentences, AVAILABLE_MODELS, DEFAULT_MODEL_NAME, PRESCREEN_ENABLED, _get_model
 from faiss_index import invalidate_cached_index
-from diff_checker import compute_comparison
-from pdf_highlight_pipeline import highlight_pdf_matches
-from report_generator import generate_turnitin_report
 from text_highlight_builder import build_text_highlights
-from pdf_utils import create_pdf_from_text
+from job_scheduler import JobScheduler, SchedulerFull, UserLimitExceeded
+from job_store import create_job_store, JOB_HEARTBEAT_SECONDS, JOB_MAX_ATTEMPTS
+from housekeeping import ExpiryIndex, Housekeeper
+import blob_store
+import report_cache
+
+logger = logging.getLogger(__name__)
 
 
 def group_matches_by_source(raw_matches: list) -> list:
@@ -108,6 +111,27 @@ app = FastAPI(title="NSU PlagiChecker Auth")
 ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
 os.makedirs(ARTIFACTS_DIR, exist_ok=True)
 
+# ==================== UPLOAD LIMITS ====================
+# Uploads are streamed to disk in 1 MB pieces and hashed on the fly (see _save_upload);
+# any single file past MAX_UPLOAD_MB is refused with 413.
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "100"))
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+# A batch comparison takes one source plus up to COMPARE_BATCH_MAX_TARGETS targets.
+COMPARE_BATCH_MAX_TARGETS = int(os.getenv("COMPARE_BATCH_MAX_TARGETS", "100"))
+_UPLOAD_ROUTES = {"/analyze": 1, "/compare": 2, "/compare/batch": COMPARE_BATCH_MAX_TARGETS + 1}  # path -> number of files it accepts
+
+
+# Registered before CORSMiddleware so the 413 still carries CORS headers.
+@app.middleware("http")
+async def _reject_oversized_uploads(request: Request, call_next):
+    """Refuse before the multipart body is parsed when Content-Length already exceeds the limit."""
+    files = _UPLOAD_ROUTES.get(request.url.path) if request.method == "POST" else None
+    declared = request.headers.get("content-length", "")
+    if files and declared.isdigit() and int(declared) > files * MAX_UPLOAD_MB * 1024 * 1024 + _UPLOAD_CHUNK_BYTES:
+        return JSONResponse(status_code=413, content={"detail": f"File is larger than the {MAX_UPLOAD_MB} MB limit."})
+    return await call_next(request)
+
+
 # LAN-only deployment: allow all origins (safe — university WiFi is not public internet)
 # To restrict: set CORS_ORIGINS env var e.g. "http://192.168.1.0/24"
 _CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
@@ -122,29 +146,125 @@ app.add_middleware(
 # Initialize Components
 db = DatabaseManager()
 
-# ==================== SSE JOB STORES ====================
+# ==================== SSE JOB STORE ====================
+# Job state, progress events and results live in job_store (SQLite by default, shared by
+# every worker process); see job_store.py. Finished jobs are kept for JOB_TTL seconds.
 JOB_TTL = int(os.getenv("JOB_TTL", "600"))
-jobs: dict = {}              # job_id -> {"queue": asyncio.Queue, "created_at": float}
-analysis_results: dict = {}  # job_id -> {"data": dict, "created_at": float}
+# How often a stream re-reads the store for events written by another worker process.
+JOB_EVENT_POLL_SECONDS = float(os.getenv("JOB_EVENT_POLL_SECONDS", "0.5"))
+# A stream with no new events re-checks the job's state this often, and gives up after
+# JOB_STREAM_IDLE_SECONDS without any event.
+JOB_STREAM_CHECK_SECONDS = 15.0
+JOB_STREAM_IDLE_SECONDS = float(os.getenv("JOB_STREAM_IDLE_SECONDS", "300"))
+job_store = create_job_store()
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+_event_signals: dict = {}  # job_id -> asyncio.Event, wakes this process's streams
+
+
+def _wake_streams(job_id: str) -> None:
+    signal = _event_signals.get(job_id)
+    if signal is not None:
+        signal.set()
+
+
+async def _emit(job_id: str, event: dict) -> int:
+    """Append a progress event to the job's log and wake local streams. Returns its sequence id.
+    The store write runs in a thread: with the SQLite store it can wait on another worker's lock."""
+    seq = await asyncio.to_thread(job_store.append_event, job_id, event)
+    _wake_streams(job_id)
+    return seq
+
+
+async def _next_events(job_id: str, after: int, timeout: float) -> list:
+    """Events with seq > after, waiting up to timeout for the first one. Woken at once by
+    events from this process; events from other workers are picked up by polling."""
+    deadline = time.monotonic() + timeout
+    signal = _event_signals.setdefault(job_id, asyncio.Event())
+    while True:
+        signal.clear()
+        events = await asyncio.to_thread(job_store.events, job_id, after)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        try:
+            await asyncio.wait_for(signal.wait(), timeout=min(JOB_EVENT_POLL_SECONDS, remaining))
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _report_queue_position(job_id: str, position: int, queue_length: int, eta_seconds: int):
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        return
+    await _emit(job_id, {
+        "progress": 0,
+        "stage": f"Queued ({position} of {queue_length})\u2026",
+        "queue_position": position,
+        "eta_seconds": eta_seconds,
+    })
 
 
-def _cleanup_stale_entries():
-    """Remove job queues and results older than JOB_TTL to prevent memory leaks."""
-    now = time.time()
-    for k in [k for k, v in jobs.items() if now - v.get("created_at", 0) > JOB_TTL]:
-        jobs.pop(k, None)
-    for k in [k for k, v in analysis_results.items() if now - v.get("created_at", 0) > JOB_TTL]:
-        analysis_results.pop(k, None)
+# Analysis jobs run through a bounded scheduler (SCHEDULER_WORKERS at a time) instead of
+# unbounded BackgroundTasks; see job_scheduler.py for priority and admission rules.
+scheduler = JobScheduler(on_position=_report_queue_position)
+
+
+def _job_runner(job_id: str, kind: str, params: dict):
+    """Coroutine function that runs a stored job in this process, if this process can claim it."""
+    async def run():
+        if not await asyncio.to_thread(job_store.claim, job_id, WORKER_ID):
+            return  # finished, expired, or taken over by another worker
+        kwargs = params.get("kwargs", {})
+        try:
+            if kind == "compare":
+                await _run_comparison(job_id=job_id, **kwargs)
+            elif kind == "compare_batch":
+                await _run_batch_comparison(job_id=job_id, **kwargs)
+            else:
+                await _run_analysis(job_id=job_id, **kwargs)
+        finally:
+            ingest_key = params.get("ingest_key")
+            if ingest_key and _inflight_ingests.get(tuple(ingest_key)) == job_id:
+                _inflight_ingests.pop(tuple(ingest_key), None)
+    return run
+
+
+async def _job_maintenance_loop():
+    """Keep this worker's jobs alive in the store and pick up jobs orphaned by dead workers."""
+    while True:
+        try:
+            await asyncio.to_thread(job_store.heartbeat, WORKER_ID)
+            for job in await asyncio.to_thread(job_store.claim_orphans, WORKER_ID):
+                params = job.get("params") or {}
+                if job["attempts"] > JOB_MAX_ATTEMPTS:
+                    await _emit(job["job_id"], {"error": "Job was interrupted too many times. Please submit it again."})
+                    continue
+                await _emit(job["job_id"], {"progress": 0, "stage": "Resuming after a server restart\u2026"})
+                try:
+                    await scheduler.submit(
+                        job["job_id"], _job_runner(job["job_id"], job["kind"], params),
+                        role=params.get("role", "student"), size=params.get("size", 1),
+                        user_key=params.get("user_key"),
+                    )
+                except (SchedulerFull, UserLimitExceeded):
+                    # Drop the claim; otherwise our heartbeat keeps the job fresh and no sweep
+                    # (ours or another worker's) would ever pick it up again.
+                    await asyncio.to_thread(job_store.release, job["job_id"], WORKER_ID)
+        except Exception:
+            logger.warning("Job maintenance pass failed", exc_info=True)
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
 
 
 # ==================== SESSION / AUTH ====================
 SESSION_TTL = int(os.getenv("SESSION_TTL", "86400"))
 _sessions: dict = {}
+_session_expiry = ExpiryIndex()
 
 
 def _create_session(user: dict) -> str:
     token = secrets.token_urlsafe(32)
-    _sessions[token] = {"user": user, "created_at": time.time()}
+    now = time.time()
+    _sessions[token] = {"user": user, "created_at": now}
+    _session_expiry.schedule(token, now + SESSION_TTL)
     return token
 
 
@@ -158,6 +278,7 @@ def _get_session_user(request: Request):
         return None
     if time.time() - session["created_at"] > SESSION_TTL:
         _sessions.pop(token, None)
+        _session_expiry.discard(token)
         return None
     return session["user"]
 
@@ -177,7 +298,8 @@ def require_admin(request: Request) -> dict:
 
 
 # ==================== RATE LIMITING ====================
-_rate_limits: dict = defaultdict(list)
+_rate_limits: dict = {}  # client ip -> deque of request times within the window
+_rate_limit_expiry = ExpiryIndex()
 RATE_LIMIT_ANALYZE = int(os.getenv("RATE_LIMIT_ANALYZE", "500"))
 RATE_WINDOW = 60
 
@@ -187,10 +309,63 @@ def _check_rate_limit(request: Request, limit: int = None):
         limit = RATE_LIMIT_ANALYZE
     client_ip = request.client.host if request.client else "unknown"
     now = time.time()
-    _rate_limits[client_ip] = [t for t in _rate_limits[client_ip] if now - t < RATE_WINDOW]
-    if len(_rate_limits[client_ip]) >= limit:
+    window = _rate_limits.setdefault(client_ip, deque())
+    while window and now - window[0] >= RATE_WINDOW:
+        window.popleft()
+    if len(window) >= limit:
         raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
-    _rate_limits[client_ip].append(now)
+    window.append(now)
+    # The bucket is dropped by housekeeping once a full window passes with no requests.
+    _rate_limit_expiry.schedule(client_ip, now + RATE_WINDOW)
+
+
+# ==================== HOUSEKEEPING ====================
+# One background task expires sessions, rate-limit buckets and finished jobs on a timer
+# instead of on the request path; see housekeeping.py.
+housekeeper = Housekeeper()
+
+
+def _sweep_sessions() -> int:
+    expired = _session_expiry.pop_expired()
+    for token in expired:
+        _sessions.pop(token, None)
+    return len(expired)
+
+
+def _sweep_rate_limits() -> int:
+    now = time.time()
+    removed = 0
+    for client_ip in _rate_limit_expiry.pop_expired(now):
+        window = _rate_limits.get(client_ip)
+        if window is not None and (not window or now - window[-1] >= RATE_WINDOW):
+            _rate_limits.pop(client_ip, None)
+            removed += 1
+        elif window is not None:
+            _rate_limit_expiry.schedule(client_ip, window[-1] + RATE_WINDOW)
+    return removed
+
+
+housekeeper.add_sweep("sessions", _sweep_sessions)
+housekeeper.add_sweep("rate_limits", _sweep_rate_limits)
+housekeeper.add_sweep("jobs", lambda: job_store.expire(JOB_TTL))
+housekeeper.add_sweep("report_cache", report_cache.prune)
+
+
+def _sweep_blobs() -> int:
+    # Uploads and highlighted PDFs are written for every scan; keep each one as long as a job
+    # result or cached scan could still point at it, and for good while a saved result does.
+    max_age = max(JOB_TTL, SCAN_CACHE_TTL_DAYS * 86400)
+    keep = db.get_referenced_blob_digests() | job_store.blob_digests()
+    return blob_store.prune(max_age, keep)
+
+
+housekeeper.add_sweep("blobs", _sweep_blobs)
+housekeeper.add_gauge("sessions", lambda: len(_sessions))
+housekeeper.add_gauge("rate_limit_buckets", lambda: len(_rate_limits))
+housekeeper.add_gauge("jobs", lambda: job_store.counts())
+housekeeper.add_gauge("event_signals", lambda: len(_event_signals))
+housekeeper.add_gauge("cached_reports", report_cache.count)
+housekeeper.add_gauge("blobs", blob_store.count)
 
 
 # ==================== AUTH MODELS ====================
@@ -318,6 +493,15 @@ def change_own_password(req: ChangePasswordRequest, current_user: dict = Depends
     return {"success": True}
 
 
+@app.get("/auth/housekeeping")
+def get_housekeeping(current_user: dict = Depends(require_admin)):
+    """Sizes of the server's expiring state and what the last housekeeping sweeps removed."""
+    stats = housekeeper.counts()
+    stats["sizes"]["inflight_ingests"] = len(_inflight_ingests)
+    stats["scheduler"] = scheduler.stats()
+    return stats
+
+
 @app.get("/auth/activity")
 def get_activity(current_user: dict = Depends(require_admin)):
     """Dashboard data: user counts, registrations, recent logins, currently active sessions."""
@@ -370,16 +554,21 @@ def list_models():
 
 @app.get("/models/status")
 def models_status():
-    """Return which models are cached/available offline on this server."""
-    from embedding_pipeline import _is_model_cached
+    """Return which models are cached offline, which are resident in RAM, and their memory use."""
+    from embedding_pipeline import _is_model_cached, get_model_residency
+    residency = get_model_residency()
+    resident = {m["model_name"]: m for m in residency["loaded"]}
     result = {}
     for key, info in AVAILABLE_MODELS.items():
         result[key] = {
             "cached": _is_model_cached(info["model_id"]),
+            "loaded": key in resident,
+            "memory_mb": resident[key]["memory_mb"] if key in resident else None,
+            "last_used_at": resident[key]["last_used_at"] if key in resident else None,
             "label": info["label"],
             "model_id": info["model_id"],
         }
-    return {"models": result}
+    return {"models": result, "residency": residency}
 
 
 @app.post("/models/download/{model_name}")
@@ -387,7 +576,7 @@ def download_model(model_name: str, current_user: dict = Depends(require_admin))
     """Trigger download of a model from HuggingFace (admin only). Requires internet."""
     if model_name not in AVAILABLE_MODELS:
         raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
-    from embedding_pipeline import _is_model_cached, MODEL_CACHE_DIR, DEVICE, _MODEL_CACHE
+    from embedding_pipeline import _is_model_cached, MODEL_CACHE_DIR, DEVICE, _MODEL_LOCK, _register_model
     model_info = AVAILABLE_MODELS[model_name]
     model_id = model_info["model_id"]
     if _is_model_cached(model_id):
@@ -400,7 +589,8 @@ def download_model(model_name: str, current_user: dict = Depends(require_admin))
         from sentence_transformers import SentenceTransformer
         os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
         model = SentenceTransformer(model_id, cache_folder=MODEL_CACHE_DIR, device=DEVICE)
-        _MODEL_CACHE[model_name] = model
+        with _MODEL_LOCK:
+            _register_model(model_name, model)
         return {"success": True, "message": f"Model '{model_info['label']}' downloaded successfully."}
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Download failed — check internet connection. ({e})")
@@ -415,14 +605,49 @@ def download_model(model_name: str, current_user: dict = Depends(require_admin))
 
 # ==================== SAVED JOB RESULTS ====================
 
+SAVED_JOBS_PAGE_SIZE = 50
+
+
+def _encode_history_cursor(row: dict) -> str:
+    import base64
+    raw = f"{row['created_at']}|{row['job_id']}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_history_cursor(cursor: str) -> tuple:
+    import base64
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, job_id = raw.split("|", 1)
+        return created_at, job_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
 @app.get("/jobs/saved")
-def get_saved_jobs(user_id: int, request: Request):
-    """Fetch all saved analysis results for a user (persists across logout)."""
+def get_saved_jobs(user_id: int, request: Request, cursor: Optional[str] = None, limit: int = SAVED_JOBS_PAGE_SIZE):
+    """List a user's saved analysis results (summaries only, newest first, cursor-paginated)."""
     current_user = require_auth(request)
     if current_user["id"] != user_id and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied.")
-    results = db.get_user_job_results(user_id)
-    return {"results": results}
+    limit = max(1, min(limit, 200))
+    before = _decode_history_cursor(cursor) if cursor else None
+    # Fetch one extra row to know whether another page exists.
+    rows = db.get_user_job_summaries(user_id, limit=limit + 1, before=before)
+    next_cursor = _encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"results": rows[:limit], "next_cursor": next_cursor}
+
+
+@app.get("/jobs/saved/{job_id}")
+def get_saved_job(job_id: str, user_id: int, request: Request):
+    """Fetch the full saved result for one job."""
+    current_user = require_auth(request)
+    if current_user["id"] != user_id and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied.")
+    result = db.get_job_result_detail(user_id, job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Saved result not found.")
+    return result
 
 
 @app.delete("/jobs/saved/{job_id}")
@@ -448,6 +673,40 @@ def get_artifact(artifact_name: str):
     )
 
 
+@app.get("/blobs/{digest}")
+def get_blob(digest: str, request: Request):
+    """Stream a content-addressed artifact. Supports ETag/If-None-Match and single byte ranges."""
+    import blob_store
+    if not blob_store.is_digest(digest):
+        raise HTTPException(status_code=404, detail="Blob not found.")
+    if not blob_store.has_blob(digest):
+        raise HTTPException(status_code=404, detail="Blob not found.")
+    path = blob_store.blob_path(digest)
+    size = os.path.getsize(path)
+    etag = f'"{digest}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Content never changes for a given digest.
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    # Served as octet-stream so download managers do not hijack the PDF viewer's request.
+    media_type = "application/octet-stream"
+    try:
+        rng = blob_store.parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if rng is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(blob_store.iter_file(path), media_type=media_type, headers=headers)
+    start, end = rng
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(blob_store.iter_file(path, start, end), status_code=206, media_type=media_type, headers=headers)
+
+
 @app.get("/documents/stats")
 def documents_stats():
     """Check how many documents/chunks are saved in documents.db."""
@@ -511,15 +770,173 @@ def documents_scan(repo_type: str = "university", owner_id: int = None):
 # ==================== DOCUMENT ANALYSIS (SSE + Background Task) ====================
 
 ALLOWED_EXTENSIONS = {".pdf", ".pptx"}
+# Repository uploads currently queued or running: (sha256, repo_type, owner_id) -> job_id.
+_inflight_ingests: dict = {}
+# Finished scans are reused for identical content against an unchanged repository (0 = off).
+SCAN_CACHE_TTL_DAYS = float(os.getenv("SCAN_CACHE_TTL_DAYS", "7"))
+# "overlay": scans return only page/region coordinates, which the viewer paints over the original
+# PDF; the annotated copy is written on demand (report, download). "annotate": write it every scan.
+HIGHLIGHT_MODE = os.getenv("HIGHLIGHT_MODE", "overlay").strip().lower()
+
+
+# Bump when a code change alters scan results in a way the settings below do not capture
+# (a scoring fix, a new result field); entries written before it then stop matching.
+SCAN_RESULT_VERSION = 1
+_scan_config_fingerprints: dict = {}  # model_name -> fingerprint
+
+
+def _scan_config_fingerprint(model_name: str) -> str:
+    """Short hash of every setting that changes a scan's result for the same input and repository."""
+    fingerprint = _scan_config_fingerprints.get(model_name)
+    if fingerprint is None:
+        import hashlib
+        import embedding_compression as ec
+        import embedding_pipeline as ep
+        import pdf_highlight_pipeline as hp
+        settings = {
+            "version": SCAN_RESULT_VERSION,
+            "highlight_mode": HIGHLIGHT_MODE,
+            "locate": [hp.LOCATE_CANDIDATES, hp.LOCATE_SEQUENCE_TOP],
+            "prescreen": [ep.PRESCREEN_ENABLED, ep.PRESCREEN_THRESHOLD],
+            "compression": [ec.EMBEDDING_COMPRESSION, ec.PCA_DIM, ec.COMPRESSION_MARGIN, ec.COMPRESSION_TOP_K],
+            "weights": [ep.SEMANTIC_WEIGHT, ep.LEXICAL_WEIGHT],
+            "thresholds": [
+                ep.MIN_SEMANTIC_THRESHOLD, ep.REPORT_THRESHOLD,
+                ep.EXACT_MATCH_LEXICAL_THRESHOLD, ep.PARAPHRASE_SEMANTIC_THRESHOLD,
+                ep._get_thresholds(model_name),
+            ],
+        }
+        fingerprint = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        _scan_config_fingerprints[model_name] = fingerprint
+    return fingerprint
+
+
+def _scan_cache_key(content_sha256: str, repo_type: str, owner_id, model_name: str, generation: str) -> str:
+    return "|".join((
+        content_sha256, repo_type, str(owner_id or ""), model_name, generation,
+        _scan_config_fingerprint(model_name),
+    ))
+
+
+def _cached_scan_usable(result: dict) -> bool:
+    """A cached result is only reusable while the PDFs it points at still exist."""
+    import blob_store
+    for field in ("source_pdf_sha256", "highlighted_pdf_sha256"):
+        digest = result.get(field)
+        if digest and not blob_store.has_blob(digest):
+            return False
+    return True
+
+
+async def _save_upload(upload: UploadFile, suffix: str) -> tuple:
+    """Stream an upload to a temp file, hashing as it goes. Returns (path, sha256, size).
+    Raises 413, removing the partial file, as soon as the size limit is passed."""
+    import hashlib
+    limit = MAX_UPLOAD_MB * 1024 * 1024
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await upload.read(_UPLOAD_CHUNK_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > limit:
+                    raise HTTPException(status_code=413, detail=f"File is larger than the {MAX_UPLOAD_MB} MB limit.")
+                digest.update(block)
+                out.write(block)
+    except BaseException:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        raise
+    return path, digest.hexdigest(), size
+
+
+async def _finish_job_now(job_id: str, data: dict) -> None:
+    """Complete a job without scheduling it (e.g. a duplicate upload); the stream replays Done."""
+    await asyncio.to_thread(job_store.create, job_id, "analyze", {}, WORKER_ID)
+    await asyncio.to_thread(job_store.save_result, job_id, data)
+    event = {"progress": 100, "stage": "Done"}
+    if data.get("warning"):
+        event["warning"] = data["warning"]
+    await _emit(job_id, event)
+
+
+class _ProgressReporter:
+    """Progress events for one job, emitted at real pipeline stage boundaries.
+
+    Each stage owns a slice of the progress bar. Work running in a worker thread reports
+    sub-steps (pages extracted, batches encoded, chunks scanned) through callback(), which
+    is throttled, written to the store from that thread, and the event loop is told to wake
+    the job's streams with call_soon_threadsafe. Stage
+    durations are collected in `timings` and sent with the final event.
+    """
 
-
-async def _push(queue, progress: int, stage: str):
-    await queue.put({"progress": progress, "stage": stage})
-    await asyncio.sleep(0.3)
+    _MIN_INTERVAL = 0.2  # seconds between sub-progress events within one stage
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.loop = asyncio.get_running_loop()
+        self.timings: dict = {}
+        self._t0 = time.perf_counter()
+        self._stage = None
+        self._stage_t = self._t0
+        self._band = (0, 0)
+        self._label = ""
+        self._last = (-1, 0.0)
+
+    def _event(self, progress: int, stage: str) -> dict:
+        return {"progress": progress, "stage": stage, "elapsed": round(time.perf_counter() - self._t0, 2)}
+
+    def _switch(self, key, start: int, end: int, label: str) -> dict:
+        now = time.perf_counter()
+        if self._stage is not None:
+            self.timings[self._stage] = round(self.timings.get(self._stage, 0.0) + now - self._stage_t, 3)
+        self._stage, self._stage_t, self._band, self._label = key, now, (start, end), label
+        self._last = (start, now)
+        return self._event(start, label)
+
+    async def stage(self, key: str, start: int, end: int, label: str):
+        """Enter a stage that spans start..end percent."""
+        await _emit(self.job_id, self._switch(key, start, end, label))
+
+    def callback(self, phases: dict):
+        """Thread-safe fn(phase, done, total, detail="") for worker code.
+        phases maps a phase name to (start, end, label); unknown phases are ignored."""
+        def report(phase, done, total, detail=""):
+            band = phases.get(phase)
+            if band is None:
+                return
+            if phase != self._stage:
+                event = self._switch(phase, *band)
+            else:
+                start, end = self._band
+                pct = start + int((end - start) * min(done, total) / max(total, 1))
+                now = time.perf_counter()
+                last_pct, last_t = self._last
+                if pct <= last_pct or (now - last_t < self._MIN_INTERVAL and done < total):
+                    return
+                self._last = (pct, now)
+                suffix = f", {detail}" if detail else ""
+                event = self._event(pct, f"{self._label} ({done}/{total}{suffix})")
+            job_store.append_event(self.job_id, event)
+            self.loop.call_soon_threadsafe(_wake_streams, self.job_id)
+        return report
+
+    def finish(self) -> dict:
+        """Close the current stage and return {stage: seconds, ..., "total": seconds}."""
+        self._switch(None, 100, 100, "")
+        self.timings["total"] = round(time.perf_counter() - self._t0, 3)
+        return self.timings
 
 
 def _process_direct_text(raw_text: str, filename: str):
     """Prepare direct text: keep newlines for display; chunk same string so highlights align."""
+    from text_pipeline import chunk_by_paragraphs, chunk_by_words, DocumentMetadata, light_clean_preserve_newlines
     started = time.time()
     cleaned_text = light_clean_preserve_newlines(raw_text or "")
 
@@ -554,20 +971,25 @@ async def _run_analysis(
     direct_text: str | None = None,
     submitted_by: int | None = None,
     model_name: str = DEFAULT_MODEL_NAME,
+    content_sha256: str | None = None,
+    scan_cache_key: str | None = None,
 ):
     """
     Background task: runs the full analysis pipeline.
     Every blocking call is wrapped in asyncio.to_thread() so concurrent
     uploads never starve each other's SSE streams (no clashing).
     """
-    entry = jobs.get(job_id)
-    queue = entry.get("queue") if entry else None
-    if queue is None:
+    if await asyncio.to_thread(job_store.get, job_id) is None:
         return
 
+    progress = _ProgressReporter(job_id)
     try:
+        from text_pipeline import process_document
+        from pdf_highlight_pipeline import highlight_pdf_matches, locate_pdf_highlights
+
         if direct_text is not None:
-            await _push(queue, 10, "Converting text to PDF\u2026")
+            from pdf_utils import create_pdf_from_text
+            await progress.stage("text_to_pdf", 2, 5, "Converting text to PDF\u2026")
             synthetic_pdf_path = os.path.join(tempfile.gettempdir(), f"direct_{job_id[:8]}.pdf")
             await asyncio.to_thread(
                 create_pdf_from_text,
@@ -580,7 +1002,8 @@ async def _run_analysis(
             ext = ".pdf"
             original_filename = original_filename.replace(".txt", ".pdf") if original_filename.endswith(".txt") else f"{original_filename}.pdf"
 
-        await _push(queue, 15, "Extracting text\u2026")
+        await progress.stage("extract", 5, 25, "Extracting text\u2026")
+        report_pages = progress.callback({"extract": (5, 25, "Extracting text\u2026")})
         pdf_method = "pymupdf" if ext == ".pdf" else "pdfplumber"
         chunks, meta, cleaned_text = await asyncio.to_thread(
             process_document,
@@ -589,6 +1012,7 @@ async def _run_analysis(
             chunk_strategy="words",
             max_chunk_size=150,
             overlap=20,
+            progress_callback=lambda done, total: report_pages("extract", done, total),
         )
 
         if meta.num_pages_or_slides > 250:
@@ -597,34 +1021,32 @@ async def _run_analysis(
                 f"the 250-page limit. It cannot be added to the repository or scanned. "
                 f"Please upload a document with 250 pages or fewer."
             )
-            await queue.put({"progress": 100, "stage": "Done", "warning": warning_msg})
-            analysis_results[job_id] = {"data": {
+            await asyncio.to_thread(job_store.save_result, job_id, {
                 "warning": warning_msg,
                 "page_or_slide_count": meta.num_pages_or_slides,
                 "filename": original_filename,
                 "overall_similarity": 0.0,
                 "matches": [],
                 "top_similar_sentences": [],
-            }, "created_at": time.time()}
+            })
+            await _emit(job_id, {"progress": 100, "stage": "Done", "warning": warning_msg, "timings": progress.finish()})
             return
 
-        await _push(queue, 25, "Chunking complete\u2026")
-
         # Duplicate filename check before saving to repo
         if will_save and filename_exists(original_filename, repo_type=repo_type, owner_id=owner_id_val):
             warning_msg = (
                 f"'{original_filename}' already exists in this repository. "
                 f"Upload skipped to prevent duplicates."
             )
-            await queue.put({"progress": 100, "stage": "Done", "warning": warning_msg})
-            analysis_results[job_id] = {"data": {
+            await asyncio.to_thread(job_store.save_result, job_id, {
                 "warning": warning_msg,
                 "filename": original_filename,
                 "duplicate": True,
                 "overall_similarity": 0.0,
                 "matches": [],
                 "top_similar_sentences": [],
-            }, "created_at": time.time()}
+            })
+            await _emit(job_id, {"progress": 100, "stage": "Done", "warning": warning_msg, "timings": progress.finish()})
             return
 
         meta_dict = meta.to_dict()
@@ -646,19 +1068,21 @@ async def _run_analysis(
             # Stage 2 — Encode embeddings + save to repo
             from embedding_pipeline import _is_model_cached
             if not _is_model_cached(AVAILABLE_MODELS[model_name]["model_id"]):
-                await _push(queue, 40, "Downloading AI model\u2026 (first-time only)")
-            await _push(queue, 45, "Computing embeddings\u2026")
-            BATCH_SIZE = 64
-            embeddings_arr = []
-            for i in range(0, len(chunks), BATCH_SIZE):
-                batch = chunks[i:i + BATCH_SIZE]
-                batch_emb = await asyncio.to_thread(encode_chunks, batch, model_name)
-                embeddings_arr.extend(batch_emb)
-            import numpy as np
-            embeddings_arr = np.array(embeddings_arr)
+                await progress.stage("model_download", 25, 30, "Downloading AI model\u2026 (first-time only)")
+            encode_phases = {"encode": (30, 70, "Computing embeddings\u2026")}
+            report_encode = progress.callback(encode_phases)
+            await progress.stage("encode", *encode_phases["encode"])
+            embeddings_arr = await asyncio.to_thread(
+                encode_chunks, chunks, model_name,
+                lambda done, total: report_encode("encode", done, total),
+            )
             embeddings_blobs = [arr.tobytes() for arr in embeddings_arr]
+            # Keep the prescreen index in step with the main one (no-op unless PRESCREEN_ENABLED).
+            if PRESCREEN_ENABLED:
+                await progress.stage("prescreen_encode", 70, 75, "Computing prescreen embeddings\u2026")
+            prescreen_blobs = await asyncio.to_thread(encode_prescreen_chunks, chunks)
 
-            await _push(queue, 70, "Saving to repository\u2026")
+            await progress.stage("save", 75, 90, "Saving to repository\u2026")
             await asyncio.to_thread(
                 save_document,
                 document_id=meta.document_id,
@@ -674,6 +1098,8 @@ async def _run_analysis(
                 owner_id=owner_id_val,
                 embeddings=embeddings_blobs,
                 model_name=model_name,
+                prescreen_embeddings=prescreen_blobs,
+                content_sha256=content_sha256,
             )
             meta_dict["indexed_at"] = datetime.now(timezone.utc).isoformat()
             await asyncio.to_thread(invalidate_cached_index, repo_type, owner_id_val, model_name)
@@ -681,14 +1107,22 @@ async def _run_analysis(
         elif chunks:
             # Stage 2 — Similarity scan
             from embedding_pipeline import _is_model_cached
-            if not _is_model_cached(AVAILABLE_MODELS[model_name]["model_id"]):
-                await _push(queue, 40, "Downloading AI model\u2026 (first-time only)")
-            await _push(queue, 45, "Computing embeddings\u2026")
+            await progress.stage("load_repository", 25, 30, "Loading repository\u2026")
             repo_chunks = await asyncio.to_thread(
-                get_chunks_with_embeddings, repo_type=repo_type, owner_id=owner_id_val, model_name=model_name
+                get_chunks_with_embeddings, repo_type=repo_type, owner_id=owner_id_val, model_name=model_name,
+                include_prescreen=PRESCREEN_ENABLED,
             )
-
-            await _push(queue, 60, "Scanning repository\u2026")
+            if not _is_model_cached(AVAILABLE_MODELS[model_name]["model_id"]):
+                await progress.stage("model_download", 30, 32, "Downloading AI model\u2026 (first-time only)")
+
+            # find_matches reports its own phases from the worker thread.
+            report_scan = progress.callback({
+                "prescreen": (32, 35, "Prescreening chunks\u2026"),
+                "encode": (35, 55, "Computing embeddings\u2026"),
+                "search": (55, 60, "Searching repository\u2026"),
+                "candidates": (60, 75, "Scanning repository\u2026"),
+                "sentences": (75, 80, "Matching sentences\u2026"),
+            })
             (
                 semantic_similarity,
                 lexical_similarity,
@@ -702,17 +1136,23 @@ async def _run_analysis(
                 repo_type=repo_type,
                 owner_id=owner_id_val,
                 model_name=model_name,
+                progress_callback=report_scan,
             )
 
-            await _push(queue, 75, "Ranking matches\u2026")
+            await progress.stage("rank", 80, 85, "Ranking matches\u2026")
             # Group chunk-level matches by source document (Turnitin style: one card per source)
             matches = group_matches_by_source(matches)
             top_similar_sentences = await asyncio.to_thread(
                 extract_top_similar_sentences, matches
             )
 
-            if ext == ".pdf" and tmp_path:
-                await _push(queue, 85, "Generating highlights\u2026")
+            if ext == ".pdf" and tmp_path and HIGHLIGHT_MODE == "overlay":
+                await progress.stage("highlight", 85, 95, "Locating highlights\u2026")
+                highlight_summary = await asyncio.to_thread(
+                    locate_pdf_highlights, tmp_path, matches, meta.extraction
+                )
+            elif ext == ".pdf" and tmp_path:
+                await progress.stage("highlight", 85, 95, "Generating highlights\u2026")
                 safe_base_name = "".join(
                     ch if ch.isalnum() or ch in ("-", "_", ".") else "_"
                     for ch in original_filename
@@ -720,37 +1160,38 @@ async def _run_analysis(
                 artifact_name = f"{meta.document_id}_{uuid.uuid4().hex[:8]}_{safe_base_name}"
                 artifact_path = os.path.join(ARTIFACTS_DIR, artifact_name)
                 highlight_summary = await asyncio.to_thread(
-                    highlight_pdf_matches, tmp_path, matches, artifact_path
+                    highlight_pdf_matches, tmp_path, matches, artifact_path, meta.extraction
                 )
                 highlighted_pdf_url = f"/artifacts/{artifact_name}"
             elif matches:
-                await _push(queue, 85, "Mapping text highlights\u2026")
+                await progress.stage("highlight", 85, 95, "Mapping text highlights\u2026")
                 text_highlights = await asyncio.to_thread(
                     build_text_highlights, cleaned_text, matches
                 )
 
         # Stage final — Finalise
-        await _push(queue, 95, "Finalising report\u2026")
+        await progress.stage("finalise", 95, 99, "Finalising report\u2026")
 
-        # Capture original/source PDF as base64 for the interactive viewer
-        # This allows the frontend to show a "clean" document and draw highlights on top
-        source_pdf_base64 = None
+        # Store the original PDF and the highlighted copy as content-addressed blobs and
+        # reference them by URL; the viewer streams them from /blobs/<sha256>.
+        import blob_store
+        source_pdf_sha256 = None
         if tmp_path and os.path.exists(tmp_path):
-            import base64
             try:
-                with open(tmp_path, "rb") as f:
-                    source_pdf_base64 = base64.b64encode(f.read()).decode("ascii")
+                # The upload was hashed while streaming; direct text produces a new PDF to hash.
+                source_pdf_sha256 = await asyncio.to_thread(
+                    blob_store.put_file, tmp_path, None if direct_text is not None else content_sha256
+                )
             except Exception:
                 pass
-
-        # Also keep highlighted version for other uses (like downloads or non-interactive previews)
-        highlighted_pdf_base64 = None
+        highlighted_pdf_sha256 = None
         if highlighted_pdf_url:
-            import base64
-            artifact_full_path = os.path.join(ARTIFACTS_DIR, os.path.basename(highlighted_pdf_url))
             try:
-                with open(artifact_full_path, "rb") as f:
-                    highlighted_pdf_base64 = base64.b64encode(f.read()).decode("ascii")
+                highlighted_pdf_sha256 = await asyncio.to_thread(
+                    blob_store.put_file, os.path.join(ARTIFACTS_DIR, os.path.basename(highlighted_pdf_url))
+                )
+                os.unlink(os.path.join(ARTIFACTS_DIR, os.path.basename(highlighted_pdf_url)))
+                highlighted_pdf_url = blob_store.blob_url(highlighted_pdf_sha256)
             except Exception:
                 pass
 
@@ -763,27 +1204,27 @@ async def _run_analysis(
             "matches": matches,
             "top_similar_sentences": top_similar_sentences,
             "highlighted_pdf_url": highlighted_pdf_url,
-            "highlighted_pdf_base64": highlighted_pdf_base64,
-            "source_pdf_base64": source_pdf_base64,
+            "highlighted_pdf_sha256": highlighted_pdf_sha256,
+            "source_pdf_url": blob_store.blob_url(source_pdf_sha256),
+            "source_pdf_sha256": source_pdf_sha256,
             "highlight_summary": highlight_summary,
+            "highlight_mode": HIGHLIGHT_MODE if highlight_summary else None,
             "text_highlights": text_highlights,
             "filename": original_filename,
             "page_or_slide_count": meta.num_pages_or_slides,
             "chunk_count": meta.num_chunks,
             "metadata": {**meta_dict, "file_name": original_filename},
         }
-        analysis_results[job_id] = {"data": result, "created_at": time.time()}
+        await asyncio.to_thread(job_store.save_result, job_id, result)
 
-        # Persist result to DB (survives logout). Keep source_pdf_base64 and
-        # source_text so the PDF viewer + text panel still render after refresh.
-        # Drop highlighted_pdf_base64 — it's redundant with source_pdf_base64
-        # (frontend repaints highlights from highlight_summary / text_highlights).
+        # Persist result to DB (survives logout). The PDFs are referenced by blob URL,
+        # so the viewer + text panel still render after refresh.
         if submitted_by and not will_save:
-            persistent = {k: v for k, v in result.items()
-                          if k not in ("highlighted_pdf_base64",)}
-            db.save_job_result(submitted_by, job_id, original_filename, persistent)
+            await asyncio.to_thread(db.save_job_result, submitted_by, job_id, original_filename, result)
+        if scan_cache_key and not will_save and chunks:
+            await asyncio.to_thread(db.save_cached_scan, scan_cache_key, result, SCAN_CACHE_TTL_DAYS)
 
-        await queue.put({"progress": 100, "stage": "Done"})
+        await _emit(job_id, {"progress": 100, "stage": "Done", "timings": progress.finish()})
 
     except Exception as e:
         err_str = str(e)
@@ -792,7 +1233,7 @@ async def _run_analysis(
             model_key = parts[1] if len(parts) > 1 else model_name
             label = AVAILABLE_MODELS.get(model_key, {}).get("label", model_key)
             err_str = f'MODEL_NOT_AVAILABLE: "{label}" model needs to be downloaded first. Connect to internet and try again — it will download and cache automatically.'
-        await queue.put({"error": err_str})
+        await _emit(job_id, {"error": err_str})
     finally:
         if tmp_path:
             try:
@@ -804,22 +1245,29 @@ async def _run_analysis(
 @app.post("/analyze")
 async def analyze_document(
     request: Request,
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(None),
     direct_text: str = Form(""),
     repo_type: str = Form("university"),
     user_id: str = Form(""),
-    role: str = Form("teacher"),
+    role: str = Form(""),
     add_to_repo: str = Form("true"),
     filename_override: str = Form(""),
     model_name: str = Form(DEFAULT_MODEL_NAME),
+    force_rescan: str = Form("false"),
 ):
     """
     Kick off an analysis job and return {job_id} immediately.
+    A scan of content already scanned against the same, unchanged repository returns the
+    earlier result at once (cached=True) unless force_rescan is set.
     The client opens GET /analyze/stream/{job_id} for real-time progress,
     then GET /analyze/result/{job_id} to retrieve the final report.
     """
     _check_rate_limit(request)
+    # A logged-in client's session says who is submitting; the form fields are only a
+    # fallback for clients that send no token.
+    session_user = _get_session_user(request)
+    if session_user:
+        role = session_user.get("role") or role
     direct_text = (direct_text or "").strip()
     has_file = file is not None and bool(file.filename)
     has_text = bool(direct_text)
@@ -861,80 +1309,217 @@ async def analyze_document(
             raise HTTPException(status_code=400, detail="user_id must be a number.")
         owner_id_val = None
 
+    # Queue priority and the per-user cap come from the session only: a job without one runs
+    # at student priority under the student cap, counted per client address.
+    if session_user:
+        queue_role = session_user.get("role") or "student"
+        user_key = f"user:{session_user['id']}"
+    else:
+        queue_role = "student"
+        user_key = f"ip:{request.client.host}" if request.client else None
+
+    # Refuse early, before the upload is read, when the server cannot take the job.
+    try:
+        scheduler.check_admission(user_key, queue_role)
+    except (SchedulerFull, UserLimitExceeded) as e:
+        raise HTTPException(
+            status_code=503 if isinstance(e, SchedulerFull) else 429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
     tmp_path = None
+    content_sha256 = None
     if has_file:
-        # Read the upload into a temp file NOW so the file handle stays valid in the background task
-        content = await file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
+        # Stream the upload to a temp file NOW so it stays valid in the background task
+        tmp_path, content_sha256, _ = await _save_upload(file, ext)
 
     original_filename = (filename_override and filename_override.strip()) or (
         file.filename if has_file else "direct_text_input.txt"
     )
     file_path_stored = f"uploaded/{original_filename}"
 
-    _cleanup_stale_entries()
     job_id = str(uuid.uuid4())
-    jobs[job_id] = {"queue": asyncio.Queue(), "created_at": time.time()}
 
     try:
         submitted_by_int = int(user_id.strip()) if user_id and user_id.strip() else None
     except ValueError:
         submitted_by_int = None
 
-    background_tasks.add_task(
-        _run_analysis,
-        job_id=job_id,
-        tmp_path=tmp_path,
-        ext=ext,
-        will_save=will_save,
-        repo_type=repo_type,
-        owner_id_val=owner_id_val,
-        original_filename=original_filename,
-        file_path_stored=file_path_stored,
-        role=role,
-        direct_text=direct_text if has_text else None,
-        submitted_by=submitted_by_int,
-        model_name=model_name,
-    )
+    # Same content, same repository generation, same model: reuse the earlier scan.
+    scan_cache_key = None
+    if not will_save and SCAN_CACHE_TTL_DAYS > 0:
+        import hashlib
+        scan_hash = content_sha256 or hashlib.sha256(
+            f"{original_filename}\0{direct_text}".encode("utf-8")
+        ).hexdigest()
+        generation = await asyncio.to_thread(get_repo_generation, repo_type, owner_id_val)
+        scan_cache_key = _scan_cache_key(scan_hash, repo_type, owner_id_val, model_name, generation)
+        if force_rescan.lower() not in ("true", "1", "yes"):
+            cached = await asyncio.to_thread(db.get_cached_scan, scan_cache_key, SCAN_CACHE_TTL_DAYS)
+            if cached is not None and await asyncio.to_thread(_cached_scan_usable, cached):
+                if tmp_path:
+                    os.unlink(tmp_path)
+                if has_file:
+                    # Same bytes may arrive under another name; direct text keys on its name already.
+                    cached["filename"] = original_filename
+                    cached["metadata"] = {**(cached.get("metadata") or {}), "file_name": original_filename}
+                cached["cached"] = True
+                if submitted_by_int:
+                    await asyncio.to_thread(db.save_job_result, submitted_by_int, job_id, original_filename, cached)
+                await _finish_job_now(job_id, cached)
+                return {"job_id": job_id, "queue_position": 0, "cached": True}
+
+    # Identical file already in (or on its way into) the target repository: answer without processing.
+    ingest_key = (content_sha256, repo_type, owner_id_val) if will_save and content_sha256 else None
+    if ingest_key:
+        existing = await asyncio.to_thread(find_document_by_hash, content_sha256, repo_type, owner_id_val)
+        pending_job = _inflight_ingests.get(ingest_key)
+        if existing or (pending_job and scheduler.is_active(pending_job)):
+            os.unlink(tmp_path)
+            same_as = f"'{existing['file_name']}'" if existing else "a file that is still being added"
+            await _finish_job_now(job_id, {
+                "warning": f"This file is identical to {same_as} in this repository. Upload skipped to prevent duplicates.",
+                "filename": original_filename,
+                "duplicate": True,
+                "overall_similarity": 0.0,
+                "matches": [],
+                "top_similar_sentences": [],
+            })
+            return {"job_id": job_id, "queue_position": 0, "duplicate": True}
+        _inflight_ingests[ingest_key] = job_id
+
+    # Everything needed to (re)run the job is stored with it, so another worker can pick it
+    # up if this process dies before finishing.
+    size = os.path.getsize(tmp_path) if tmp_path else len(direct_text.encode("utf-8"))
+    params = {
+        "kwargs": {
+            "tmp_path": tmp_path,
+            "ext": ext,
+            "will_save": will_save,
+            "repo_type": repo_type,
+            "owner_id_val": owner_id_val,
+            "original_filename": original_filename,
+            "file_path_stored": file_path_stored,
+            "role": role,
+            "direct_text": direct_text if has_text else None,
+            "submitted_by": submitted_by_int,
+            "model_name": model_name,
+            "content_sha256": content_sha256,
+            "scan_cache_key": scan_cache_key,
+        },
+        "ingest_key": list(ingest_key) if ingest_key else None,
+        "role": queue_role,
+        "size": size,
+        "user_key": user_key,
+    }
+    await asyncio.to_thread(job_store.create, job_id, "analyze", params, WORKER_ID)
+    try:
+        position = await scheduler.submit(job_id, _job_runner(job_id, "analyze", params), role=queue_role, size=size, user_key=user_key)
+    except (SchedulerFull, UserLimitExceeded) as e:
+        await asyncio.to_thread(job_store.set_state, job_id, "failed", str(e))
+        if ingest_key:
+            _inflight_ingests.pop(ingest_key, None)
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        raise HTTPException(
+            status_code=503 if isinstance(e, SchedulerFull) else 429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
-    return {"job_id": job_id}
+    return {"job_id": job_id, "queue_position": position}
+
+
+@app.get("/analyze/queue")
+def analyze_queue():
+    """Scheduler load: running/queued jobs, capacity and average job time."""
+    return scheduler.stats()
+
+
+def _is_final_event(event: dict) -> bool:
+    return "error" in event or (event.get("progress") == 100 and event.get("stage") == "Done")
+
+
+def _parse_event_id(value: Optional[str]) -> int:
+    try:
+        return max(0, int(value or 0))
+    except ValueError:
+        return 0
 
 
 @app.get("/analyze/stream/{job_id}")
-async def analyze_stream(job_id: str):
+async def analyze_stream(job_id: str, request: Request, last_event_id: Optional[str] = None):
     """
     SSE stream for a running analysis job.
-    Yields {progress, stage} JSON objects until done or error.
-    Each job has its OWN queue — concurrent uploads never interfere.
+    Yields {progress, stage} JSON objects until done or error, each with its sequence number as
+    the SSE id. A reconnecting client sends Last-Event-ID (or ?last_event_id=, for a manually
+    reopened EventSource) and gets only the events after it, so nothing is lost or repeated.
+    Events are read from the job store, so the stream works from any worker process.
     """
-    entry = jobs.get(job_id)
-    queue = entry.get("queue") if entry else None
-    if queue is None:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found.")
+    after = _parse_event_id(request.headers.get("last-event-id") or last_event_id)
 
     async def event_generator():
-        while True:
-            try:
-                event = await asyncio.wait_for(queue.get(), timeout=300.0)
-            except asyncio.TimeoutError:
-                yield {"event": "error", "data": json.dumps({"error": "Job timed out."})}
-                break
-
-            if "error" in event:
-                yield {"event": "error", "data": json.dumps(event)}
-                break
-
-            yield {"data": json.dumps(event)}
+        nonlocal after
+        idle_since = time.monotonic()
+        if job["state"] in ("done", "failed") and after >= job["last_seq"]:
+            return
+        try:
+            while True:
+                events = await _next_events(job_id, after, timeout=JOB_STREAM_CHECK_SECONDS)
+                if not events:
+                    current = await asyncio.to_thread(job_store.get, job_id)
+                    if current is None:
+                        yield {"event": "error", "data": json.dumps({"error": "Job expired."})}
+                        return
+                    if current["state"] in ("done", "failed"):
+                        return  # resumed after the final event: nothing left to send
+                    if time.monotonic() - idle_since > JOB_STREAM_IDLE_SECONDS:
+                        yield {"event": "error", "data": json.dumps({"error": "Job timed out."})}
+                        return
+                    continue
+                idle_since = time.monotonic()
+                for seq, event in events:
+                    after = seq
+                    if "error" in event:
+                        yield {"event": "error", "id": str(seq), "data": json.dumps(event)}
+                        return
+                    yield {"id": str(seq), "data": json.dumps(event)}
+                    if _is_final_event(event):
+                        return
+        finally:
+            current = await asyncio.to_thread(job_store.get, job_id)
+            if current is None or current["state"] in ("done", "failed"):
+                _event_signals.pop(job_id, None)
 
-            if event.get("progress") == 100 and event.get("stage") == "Done":
-                break
+    return EventSourceResponse(event_generator())
 
-        # Cleanup job queue after streaming ends
-        jobs.pop(job_id, None)
 
-    return EventSourceResponse(event_generator())
+@app.get("/analyze/status/{job_id}")
+def analyze_status(job_id: str):
+    """
+    Poll a job without holding a stream open: state, the latest event and its id, and whether
+    the result is ready to fetch from /analyze/result.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    last = job_store.events(job_id, max(0, job["last_seq"] - 1))
+    return {
+        "job_id": job_id,
+        "kind": job["kind"],
+        "state": job["state"],
+        "error": job["error"],
+        "last_event_id": job["last_seq"],
+        "last_event": last[-1][1] if last else None,
+        "result_ready": job["state"] == "done" and job_store.get_result(job_id) is not None,
+    }
 
 
 @app.get("/analyze/result/{job_id}")
@@ -943,32 +1528,105 @@ async def analyze_result(job_id: str):
     Fetch the stored result for a completed job.
     Results are kept for JOB_TTL seconds and cleaned up automatically.
     """
-    entry = analysis_results.get(job_id)
-    if entry is None or "data" not in entry:
+    data = await asyncio.to_thread(job_store.get_result, job_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Result not found. Job may not be complete yet.")
-    return entry["data"]
+    return data
+
+
+def _ensure_highlighted_pdf(data: dict) -> Optional[str]:
+    """Local path of the result's annotated PDF, or None when there is nothing to annotate.
+    Overlay-mode scans have no stored copy; one is written from the source PDF and
+    highlight_summary into report_cache, keyed on both, so repeat downloads reuse it and
+    unused copies expire with the cached reports."""
+    import blob_store
+    path = blob_store.resolve_artifact_url(data.get("highlighted_pdf_url"))
+    if path:
+        return path
+    located = (data.get("highlight_summary") or {}).get("located_sentences") or []
+    source_sha256 = data.get("source_pdf_sha256")
+    if not located or not blob_store.is_digest(source_sha256 or ""):
+        return None
+    key = report_cache.cache_key("highlighted", {"source_pdf_sha256": source_sha256, "located_sentences": located})
+    path = report_cache.get(key)
+    if path:
+        return path
+    if not blob_store.has_blob(source_sha256):
+        return None
+
+    from pdf_highlight_pipeline import write_highlight_annotations
+    return report_cache.put(
+        key, lambda tmp_path: write_highlight_annotations(blob_store.blob_path(source_sha256), located, tmp_path)
+    )
+
+
+@app.get("/analyze/highlighted/{job_id}")
+async def download_highlighted_pdf(job_id: str, request: Request, user_id: Optional[int] = None):
+    """
+    Download the annotated PDF for a scan. Overlay-mode scans write it on request into the
+    report cache; finished jobs come from the job store, saved ones need user_id.
+    """
+    data = await asyncio.to_thread(job_store.get_result, job_id)
+    if data is None and user_id is not None:
+        current_user = require_auth(request)
+        if current_user["id"] != user_id and current_user["role"] != "admin":
+            raise HTTPException(status_code=403, detail="Access denied.")
+        data = await asyncio.to_thread(db.get_job_result_detail, user_id, job_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Result not found.")
+    try:
+        path = await asyncio.to_thread(_ensure_highlighted_pdf, data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not generate the highlighted PDF: {e}")
+    if not path:
+        raise HTTPException(status_code=404, detail="This result has no highlighted PDF.")
+    base = os.path.splitext(data.get("filename") or "document")[0]
+    return FileResponse(path, media_type="application/pdf", filename=f"Highlighted_{base}.pdf")
+
+
+async def _render_report(kind: str, data: dict, key: str, highlighted_path: Optional[str] = None) -> str:
+    """Render a report into report_cache in the report process pool and return its path.
+    Falls back to a server thread when the pool is disabled or has broken."""
+    from concurrent.futures.process import BrokenProcessPool
+    import report_generator
+    # highlighted_pdf_path names a local file to embed, so only the server may set it.
+    data = {k: v for k, v in data.items() if k != "highlighted_pdf_path"}
+    if highlighted_path:
+        data["highlighted_pdf_path"] = highlighted_path
+    pool = report_generator.get_report_pool()
+    if pool is not None:
+        try:
+            return await asyncio.wrap_future(pool.submit(report_generator.render_report_cached, kind, data, key))
+        except BrokenProcessPool:
+            report_generator.reset_report_pool()
+    return await asyncio.to_thread(report_generator.render_report_cached, kind, data, key)
 
 
 @app.post("/analyze/report")
-async def generate_report(request: Request):
+async def generate_report(request: Request, job_id: Optional[str] = None):
     """
     Generate a Turnitin-style similarity report PDF and return it as a download.
-    Body: same JSON payload as the analysis result.
+    Body: same JSON payload as the analysis result. Identical requests are served from
+    report_cache without rendering again.
     """
     try:
         data = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
 
-    report_filename = f"similarity_report_{uuid.uuid4().hex[:8]}.pdf"
-    artifacts_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
-    os.makedirs(artifacts_dir, exist_ok=True)
-    output_path = os.path.join(artifacts_dir, report_filename)
+    key = report_cache.cache_key("similarity", data, job_id)
+    output_path = report_cache.get(key)
+    if output_path is None:
+        # Overlay-mode results carry only highlight coordinates; the report embeds the annotated pages.
+        try:
+            highlighted_path = await asyncio.to_thread(_ensure_highlighted_pdf, data)
+        except Exception:
+            highlighted_path = None  # the report falls back to its text-only layout
 
-    try:
-        await asyncio.to_thread(generate_turnitin_report, data, output_path)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Report generation failed: {e}")
+        try:
+            output_path = await _render_report("similarity", data, key, highlighted_path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Report generation failed: {e}")
 
     return FileResponse(
         output_path,
@@ -980,6 +1638,10 @@ async def generate_report(request: Request):
 
 # ==================== DOCUMENT COMPARISON (SSE + Background Task) ====================
 
+def _safe_artifact_name(filename: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in ("-", "_", ".") else "_" for ch in filename)
+
+
 async def _run_comparison(
     job_id: str,
     source_path: str,
@@ -988,33 +1650,31 @@ async def _run_comparison(
     target_filename: str,
 ):
     """Background task: compare two PDFs, highlight extra text in yellow."""
-    entry = jobs.get(job_id)
-    queue = entry.get("queue") if entry else None
-    if queue is None:
+    if await asyncio.to_thread(job_store.get, job_id) is None:
         return
 
+    progress = _ProgressReporter(job_id)
     try:
-        await _push(queue, 10, "Reading documents\u2026")
-        await _push(queue, 30, "Extracting text\u2026")
-        await _push(queue, 50, "Comparing documents\u2026")
+        from diff_checker import compute_comparison
 
-        safe_name = "".join(
-            ch if ch.isalnum() or ch in ("-", "_", ".") else "_"
-            for ch in target_filename
-        )
-        artifact_name = f"cmp_{job_id[:8]}_{safe_name}"
+        compare_phases = {
+            "extract": (5, 40, "Extracting text\u2026"),
+            "diff": (40, 70, "Comparing documents\u2026"),
+            "highlight": (70, 95, "Generating highlights\u2026"),
+        }
+        report_compare = progress.callback(compare_phases)
+        await progress.stage("extract", *compare_phases["extract"])
+
+        artifact_name = f"cmp_{job_id[:8]}_{_safe_artifact_name(target_filename)}"
         artifact_path = os.path.join(ARTIFACTS_DIR, artifact_name)
 
         result = await asyncio.to_thread(
-            compute_comparison, source_path, target_path, artifact_path
+            compute_comparison, source_path, target_path, artifact_path, report_compare
         )
 
-        await _push(queue, 80, "Generating highlights\u2026")
-
+        await progress.stage("finalise", 95, 99, "Finalising\u2026")
         highlighted_pdf_url = f"/artifacts/{artifact_name}"
 
-        await _push(queue, 95, "Finalising\u2026")
-
         # Build highlight_summary.located_sentences in the same format
         # as the plagiarism check pipeline so PdfViewer renders identically.
         raw_highlights = result.get("frontend_highlights") or []
@@ -1062,11 +1722,11 @@ async def _run_comparison(
             },
             "is_comparison": True,
         }
-        analysis_results[job_id] = {"data": final, "created_at": time.time()}
-        await queue.put({"progress": 100, "stage": "Done"})
+        await asyncio.to_thread(job_store.save_result, job_id, final)
+        await _emit(job_id, {"progress": 100, "stage": "Done", "timings": progress.finish()})
 
     except Exception as e:
-        await queue.put({"error": str(e)})
+        await _emit(job_id, {"error": str(e)})
     finally:
         for p in (source_path, target_path):
             try:
@@ -1075,6 +1735,102 @@ async def _run_comparison(
                 pass
 
 
+async def _run_batch_comparison(
+    job_id: str,
+    source_path: str,
+    source_filename: str,
+    targets: list,
+    all_pairs: bool = False,
+):
+    """Background task: compare many PDFs against one source (and optionally each other)."""
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        return
+
+    progress = _ProgressReporter(job_id)
+    try:
+        from diff_checker import compare_batch
+
+        batch_phases = {
+            "source": (2, 8, "Extracting source\u2026"),
+            "targets": (8, 85 if all_pairs else 97, "Comparing documents\u2026"),
+            "pairs": (85, 97, "Comparing documents with each other\u2026"),
+        }
+        report_batch = progress.callback(batch_phases)
+        await progress.stage("source", *batch_phases["source"])
+
+        jobs = []
+        for index, target in enumerate(targets):
+            artifact_name = f"cmp_{job_id[:8]}_{index}_{_safe_artifact_name(target['filename'])}"
+            jobs.append((target["path"], os.path.join(ARTIFACTS_DIR, artifact_name), f"/artifacts/{artifact_name}"))
+
+        def summary_row(index: int, result: dict) -> dict:
+            row = {"index": index, "filename": targets[index]["filename"]}
+            if result.get("error"):
+                row["error"] = result["error"]
+                return row
+            row.update({
+                "similarity_score": result["similarity_score"],
+                "extra_percentage": result["extra_percentage"],
+                "total_words": result["total_words"],
+                "extra_word_count": result["extra_word_count"],
+                "common_word_count": result["common_word_count"],
+                "highlight_count": result["highlight_count"],
+                "pages": result.get("suspect_pages", 0),
+                "highlighted_pdf_url": jobs[index][2],
+                "extra_snippets": result.get("extra_snippets", [])[:10],
+            })
+            return row
+
+        loop = asyncio.get_running_loop()
+
+        def on_result(index: int, result: dict):
+            # One event per finished target, so the stream doubles as a live summary table.
+            loop.call_soon_threadsafe(_emit, job_id, {"batch_item": summary_row(index, result)})
+
+        result = await asyncio.to_thread(
+            compare_batch, source_path, [(path, out) for path, out, _ in jobs], report_batch, all_pairs, on_result
+        )
+
+        await progress.stage("finalise", 97, 99, "Finalising\u2026")
+        rows = [summary_row(i, r) for i, r in enumerate(result["results"])]
+        pairs = [
+            {
+                "a": targets[p["a"]]["filename"],
+                "b": targets[p["b"]]["filename"],
+                "common_word_count": p["common_word_count"],
+                "a_in_b": p["a_in_b"],
+                "b_in_a": p["b_in_a"],
+            }
+            for p in result["pairs"]
+        ]
+        compared = [r for r in rows if "error" not in r]
+        final = {
+            "is_comparison": True,
+            "is_batch_comparison": True,
+            "source_filename": source_filename,
+            "source_pages": result["source_pages"],
+            "source_word_count": result["source_word_count"],
+            "target_count": len(rows),
+            "failed_count": len(rows) - len(compared),
+            "max_similarity": max((r["similarity_score"] for r in compared), default=0.0),
+            # Most similar first; the table is what a marker scans for copied reports.
+            "summary": sorted(rows, key=lambda r: r.get("similarity_score", -1.0), reverse=True),
+            "all_pairs": all_pairs,
+            "pairs": pairs,
+        }
+        await asyncio.to_thread(job_store.save_result, job_id, final)
+        await _emit(job_id, {"progress": 100, "stage": "Done", "timings": progress.finish()})
+
+    except Exception as e:
+        await _emit(job_id, {"error": str(e)})
+    finally:
+        for p in [source_path] + [t["path"] for t in targets]:
+            try:
+                os.unlink(p)
+            except OSError:
+                pass
+
+
 @app.post("/compare")
 async def compare_documents(
     request: Request,
@@ -1090,49 +1846,92 @@ async def compare_documents(
     if source_ext != ".pdf" or target_ext != ".pdf":
         raise HTTPException(status_code=400, detail="Both files must be PDF.")
 
-    source_content = await source_file.read()
-    target_content = await target_file.read()
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_s:
-        tmp_s.write(source_content)
-        source_path = tmp_s.name
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_t:
-        tmp_t.write(target_content)
-        target_path = tmp_t.name
+    source_path, _, _ = await _save_upload(source_file, ".pdf")
+    try:
+        target_path, _, _ = await _save_upload(target_file, ".pdf")
+    except HTTPException:
+        os.unlink(source_path)
+        raise
 
-    _cleanup_stale_entries()
     job_id = str(uuid.uuid4())
-    jobs[job_id] = {"queue": asyncio.Queue(), "created_at": time.time()}
-
-    background_tasks.add_task(
-        _run_comparison,
-        job_id=job_id,
-        source_path=source_path,
-        target_path=target_path,
-        source_filename=source_file.filename or "source.pdf",
-        target_filename=target_file.filename or "suspect.pdf",
-    )
+    params = {
+        "kwargs": {
+            "source_path": source_path,
+            "target_path": target_path,
+            "source_filename": source_file.filename or "source.pdf",
+            "target_filename": target_file.filename or "suspect.pdf",
+        },
+    }
+    await asyncio.to_thread(job_store.create, job_id, "compare", params, WORKER_ID)
+    background_tasks.add_task(_job_runner(job_id, "compare", params))
 
     return {"job_id": job_id}
 
 
+@app.post("/compare/batch")
+async def compare_documents_batch(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    source_file: UploadFile = File(...),
+    target_files: List[UploadFile] = File(...),
+    all_pairs: bool = Form(False),
+):
+    """Compare many PDFs against one source PDF (and, with all_pairs, against each other).
+    Returns job_id; /analyze/stream/{job_id} sends a batch_item event per finished target."""
+    _check_rate_limit(request)
+
+    if not target_files:
+        raise HTTPException(status_code=400, detail="At least one target file is required.")
+    if len(target_files) > COMPARE_BATCH_MAX_TARGETS:
+        raise HTTPException(status_code=400, detail=f"At most {COMPARE_BATCH_MAX_TARGETS} target files per batch.")
+    for upload in [source_file] + list(target_files):
+        if os.path.splitext(upload.filename or "")[1].lower() != ".pdf":
+            raise HTTPException(status_code=400, detail="All files must be PDF.")
+
+    saved = []
+    try:
+        source_path, _, _ = await _save_upload(source_file, ".pdf")
+        saved.append(source_path)
+        targets = []
+        for index, upload in enumerate(target_files):
+            path, _, _ = await _save_upload(upload, ".pdf")
+            saved.append(path)
+            targets.append({"path": path, "filename": upload.filename or f"target_{index + 1}.pdf"})
+    except HTTPException:
+        for path in saved:
+            os.unlink(path)
+        raise
+
+    job_id = str(uuid.uuid4())
+    params = {
+        "kwargs": {
+            "source_path": source_path,
+            "source_filename": source_file.filename or "source.pdf",
+            "targets": targets,
+            "all_pairs": bool(all_pairs),
+        },
+    }
+    await asyncio.to_thread(job_store.create, job_id, "compare_batch", params, WORKER_ID)
+    background_tasks.add_task(_job_runner(job_id, "compare_batch", params))
+
+    return {"job_id": job_id, "target_count": len(targets)}
+
+
 @app.post("/compare/report")
-async def generate_comparison_report_endpoint(request: Request):
+async def generate_comparison_report_endpoint(request: Request, job_id: Optional[str] = None):
     """Generate a comparison report PDF and return it as a download."""
     try:
         data = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
 
-    from report_generator import generate_comparison_report
-
-    report_filename = f"comparison_report_{uuid.uuid4().hex[:8]}.pdf"
-    output_path = os.path.join(ARTIFACTS_DIR, report_filename)
-
-    try:
-        await asyncio.to_thread(generate_comparison_report, data, output_path)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Report generation failed: {e}")
+    key = report_cache.cache_key("comparison", data, job_id)
+    output_path = report_cache.get(key)
+    if output_path is None:
+        try:
+            output_path = await _render_report("comparison", data, key)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Report generation failed: {e}")
 
     return FileResponse(
         output_path,
@@ -1142,9 +1941,98 @@ async def generate_comparison_report_endpoint(request: Request):
     )
 
 
+# ==================== STARTUP WARMUP ====================
+# Model load, FAISS index preload, prescreen backfill and NLTK data checks run as parallel background tasks
+# after the server starts listening. /api/ready reports how far each one has got.
+
+_warmup_status: dict = {
+    name: {"status": "pending", "started_at": None, "finished_at": None, "error": None}
+    for name in ("model", "faiss_index", "prescreen", "nltk")
+}
+_warmup_task = None
+_job_maintenance_task = None
+
+
+def _warmup_model():
+    _get_model(DEFAULT_MODEL_NAME)
+
+
+def _warmup_faiss_index():
+    """Load the university index for the default model into memory, building it if missing."""
+    from faiss_index import faiss_available, load_index_from_disk, build_index_from_chunks, save_index_to_disk
+    from embedding_pipeline import FAISS_MIN_CHUNKS
+    if not faiss_available():
+        return "faiss not installed"
+    index, chunk_infos = load_index_from_disk("university", None, DEFAULT_MODEL_NAME)
+    if index is not None and chunk_infos:
+        return f"loaded {len(chunk_infos)} vectors"
+    repo_chunks = get_chunks_with_embeddings(repo_type="university", owner_id=None, model_name=DEFAULT_MODEL_NAME)
+    if len(repo_chunks) < FAISS_MIN_CHUNKS:
+        return f"skipped ({len(repo_chunks)} chunks, brute-force path)"
+    index, chunk_infos = build_index_from_chunks(repo_chunks)
+    if index is None or not chunk_infos:
+        return "no embeddings to index"
+    save_index_to_disk("university", None, index, chunk_infos, DEFAULT_MODEL_NAME)
+    return f"built {len(chunk_infos)} vectors"
+
+
+def _warmup_prescreen():
+    """Give chunks indexed before prescreening was enabled their prescreen embeddings."""
+    from document_store import get_chunks_missing_prescreen, save_prescreen_embeddings
+    if not PRESCREEN_ENABLED:
+        return "disabled"
+    done = 0
+    while True:
+        batch = get_chunks_missing_prescreen(limit=512)
+        if not batch:
+            return f"backfilled {done} chunks"
+        blobs = encode_prescreen_chunks([c["chunk_text"] for c in batch])
+        save_prescreen_embeddings([(c["document_id"], c["chunk_index"], b) for c, b in zip(batch, blobs)])
+        done += len(batch)
+
+
+def _warmup_nltk():
+    from text_pipeline import _get_sent_tokenizer
+    _get_sent_tokenizer()
+
+
+async def _run_warmup_step(name: str, fn):
+    state = _warmup_status[name]
+    state["status"] = "running"
+    state["started_at"] = time.time()
+    try:
+        detail = await asyncio.to_thread(fn)
+        state["status"] = "ready"
+        if detail:
+            state["detail"] = detail
+    except Exception as e:
+        # A failed warmup step is not fatal: the same work happens lazily on the first request.
+        state["status"] = "failed"
+        state["error"] = str(e)
+    finally:
+        state["finished_at"] = time.time()
+
+
+async def _run_warmup():
+    await asyncio.gather(
+        _run_warmup_step("model", _warmup_model),
+        _run_warmup_step("faiss_index", _warmup_faiss_index),
+        _run_warmup_step("prescreen", _warmup_prescreen),
+        _run_warmup_step("nltk", _warmup_nltk),
+    )
+
+
+@app.get("/api/ready")
+def readiness_check():
+    """Report warmup progress. Returns 503 until every warmup task has finished."""
+    ready = all(s["status"] in ("ready", "failed") for s in _warmup_status.values())
+    body = {"ready": ready, "tasks": _warmup_status}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 @app.on_event("startup")
 async def _startup_cleanup():
-    """Remove artifacts older than 1 hour on startup, then preload embedding models."""
+    """Remove artifacts older than 1 hour on startup, then start the warmup tasks in the background."""
     cutoff = time.time() - 3600
     if os.path.isdir(ARTIFACTS_DIR):
         for name in os.listdir(ARTIFACTS_DIR):
@@ -1154,7 +2042,18 @@ async def _startup_cleanup():
                     os.unlink(path)
             except OSError:
                 pass
-    await asyncio.to_thread(_get_model, DEFAULT_MODEL_NAME)
+    global _warmup_task, _job_maintenance_task
+    _warmup_task = asyncio.create_task(_run_warmup())
+    scheduler.start()
+    _job_maintenance_task = asyncio.create_task(_job_maintenance_loop())
+    housekeeper.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown_process_pools():
+    """Stop the report, comparison and highlight worker processes with the server."""
+    import process_pools
+    await asyncio.to_thread(process_pools.shutdown_all)
 
 
 # ==================== SERVE REACT FRONTEND ====================
@@ -0,0 +1,63 @@
+"""
+Single-pass PyMuPDF extraction shared by the text and highlight pipelines.
+
+process_document used to open the upload to read page text, and highlight_pdf_matches then
+reopened it for the blocks pass and parsed each page again for every sentence it looked up.
+extract_pdf() reads each page once into a PdfExtraction (page text, text blocks and words
+with bboxes) that both pipelines consume. It holds only plain tuples, so it can be pickled
+to a worker process.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+
+@dataclass
+class PdfPage:
+    number: int  # 1-based
+    text: str
+    blocks: List[tuple] = field(default_factory=list)  # (x0, y0, x1, y1, text, block_no, block_type)
+    words: List[tuple] = field(default_factory=list)  # (x0, y0, x1, y1, word, block_no, line_no, word_no)
+
+
+@dataclass
+class PdfExtraction:
+    path: str
+    pages: List[PdfPage] = field(default_factory=list)
+
+    def page_texts(self) -> List[Tuple[int, str]]:
+        """Same shape as extract_text_from_pdf(): [(page_number_1based, page_text), ...]."""
+        return [(page.number, page.text) for page in self.pages]
+
+    def page(self, number: int) -> Optional[PdfPage]:
+        if 1 <= number <= len(self.pages):
+            return self.pages[number - 1]
+        return None
+
+
+def extract_pdf(pdf_path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> PdfExtraction:
+    """Read text, blocks and words of every page from one text page per page."""
+    if fitz is None:
+        raise ImportError("PyMuPDF is required. Install with: pip install pymupdf")
+    extraction = PdfExtraction(path=pdf_path)
+    with fitz.open(pdf_path) as pdf:
+        total = len(pdf)
+        for i, page in enumerate(pdf):
+            try:
+                # Text, blocks and words use the same text flags, so one text page serves all three.
+                textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+                extraction.pages.append(PdfPage(
+                    number=i + 1,
+                    text=page.get_text("text", sort=True, textpage=textpage) or "",
+                    blocks=[tuple(b) for b in page.get_text("blocks", sort=True, textpage=textpage) or []],
+                    words=[tuple(w) for w in page.get_text("words", sort=True, textpage=textpage) or []],
+                ))
+            except Exception as e:
+                extraction.pages.append(PdfPage(number=i + 1, text=f"[Error extracting page: {e}]"))
+            if progress_callback:
+                progress_callback(i + 1, total)
+    return extraction
@@ -1,16 +1,23 @@
+import logging
 import os
 import re
+import shutil
+from collections import Counter, defaultdict
 from difflib import SequenceMatcher
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     import fitz
 except ImportError:
     fitz = None
 
-from embedding_pipeline import fingerprint_similarity, lexical_similarity
+import process_pools
+from embedding_pipeline import _char_ngrams
+from pdf_extraction import PdfExtraction
 from text_pipeline import clean_text
 
+logger = logging.getLogger(__name__)
+
 
 def _require_pymupdf() -> Any:
     if fitz is None:
@@ -41,42 +48,121 @@ def _split_sentences(text: str) -> List[str]:
     return [part.strip() for part in parts if len(_normalize_sentence(part).split()) >= 4]
 
 
-def extract_pdf_sentences_with_bboxes(pdf_path: str) -> List[Dict]:
-    """Extract sentence candidates with their source page/block boxes."""
+def _sentences_from_blocks(page_number: int, blocks: List[tuple]) -> List[Dict]:
     rows: List[Dict] = []
+    for block in blocks:
+        if len(block) < 5:
+            continue
+        x0, y0, x1, y1, text = block[:5]
+        if not text or not text.strip():
+            continue
+        for sentence in _split_sentences(text):
+            normalized = _normalize_sentence(sentence)
+            if not normalized:
+                continue
+            rows.append(
+                {
+                    "page_number": page_number,
+                    "bbox": (float(x0), float(y0), float(x1), float(y1)),
+                    "text": sentence.strip(),
+                    "normalized_text": normalized,
+                }
+            )
+    return rows
+
+
+def extract_pdf_sentences_with_bboxes(pdf_path: str, extraction: Optional[PdfExtraction] = None) -> List[Dict]:
+    """Extract sentence candidates with their source page/block boxes.
+    Uses the blocks of an existing PdfExtraction instead of reopening the file when given."""
+    rows: List[Dict] = []
+    if extraction is not None:
+        for page in extraction.pages:
+            rows.extend(_sentences_from_blocks(page.number, page.blocks))
+        return rows
     pymupdf = _require_pymupdf()
     with pymupdf.open(pdf_path) as doc:
         for page_index, page in enumerate(doc):
-            blocks = page.get_text("blocks", sort=True) or []
-            for block in blocks:
-                if len(block) < 5:
-                    continue
-                x0, y0, x1, y1, text = block[:5]
-                if not text or not text.strip():
-                    continue
-                for sentence in _split_sentences(text):
-                    normalized = _normalize_sentence(sentence)
-                    if not normalized:
-                        continue
-                    rows.append(
-                        {
-                            "page_number": page_index + 1,
-                            "bbox": (float(x0), float(y0), float(x1), float(y1)),
-                            "text": sentence.strip(),
-                            "normalized_text": normalized,
-                        }
-                    )
+            rows.extend(_sentences_from_blocks(page_index + 1, page.get_text("blocks", sort=True) or []))
     return rows
 
 
-def _rank_sentence_candidate(query_sentence: str, candidate: Dict) -> Tuple[float, float, float, float]:
-    candidate_text = candidate["normalized_text"]
-    query_norm = _normalize_sentence(query_sentence)
-    lexical = lexical_similarity(query_norm, candidate_text)
-    ngram = fingerprint_similarity(query_norm, candidate_text)
-    sequence = SequenceMatcher(a=query_norm, b=candidate_text, autojunk=False).ratio()
-    score = (0.5 * ngram) + (0.3 * lexical) + (0.2 * sequence)
-    return score, lexical, ngram, sequence
+def _sentence_features(normalized: str) -> Tuple[set, set]:
+    """Word set and character 5-gram set, as compared by lexical_similarity / fingerprint_similarity."""
+    return set(normalized.split()), _char_ngrams(normalized, n=5)
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+# Candidates fetched from the shingle index per target, and how many of them may get the
+# (expensive) SequenceMatcher pass.
+LOCATE_CANDIDATES = int(os.getenv("LOCATE_CANDIDATES", "24"))
+LOCATE_SEQUENCE_TOP = int(os.getenv("LOCATE_SEQUENCE_TOP", "4"))
+
+
+class _SentenceIndex:
+    """Inverted index from word bigrams (falling back to single words) to PDF sentences.
+
+    Each highlight target is ranked only against the sentences that share shingles with it
+    instead of against every sentence in the PDF. Word and character-gram sets are computed
+    once per sentence rather than once per (target, sentence) pair.
+    """
+
+    def __init__(self, pdf_sentences: List[Dict]):
+        self.rows = pdf_sentences
+        self.features = [_sentence_features(row["normalized_text"]) for row in pdf_sentences]
+        self.shingles: Dict[tuple, List[int]] = defaultdict(list)
+        self.words: Dict[str, List[int]] = defaultdict(list)
+        for idx, row in enumerate(pdf_sentences):
+            tokens = row["normalized_text"].split()
+            for shingle in set(zip(tokens, tokens[1:])):
+                self.shingles[shingle].append(idx)
+            for word in self.features[idx][0]:
+                self.words[word].append(idx)
+        # Words in more than this many sentences say little about which sentence matched.
+        self.common_word_df = max(50, len(pdf_sentences) // 5)
+
+    def candidates(self, tokens: List[str]) -> List[int]:
+        hits: Counter = Counter()
+        for shingle in set(zip(tokens, tokens[1:])):
+            hits.update(self.shingles.get(shingle, ()))
+        if not hits:
+            # No shared word pair (very short or heavily reflowed text): fall back to rarer words.
+            for word in set(tokens):
+                postings = self.words.get(word, ())
+                if len(postings) <= self.common_word_df:
+                    hits.update(postings)
+        return [idx for idx, _ in hits.most_common(LOCATE_CANDIDATES)]
+
+    def best_match(self, target: str) -> Tuple[Optional[Dict], float, float, float, float]:
+        """Best-scoring sentence for target, as (row, score, lexical, ngram, sequence)."""
+        query_norm = _normalize_sentence(target)
+        query_words, query_grams = _sentence_features(query_norm)
+        scored = []
+        for idx in self.candidates(query_norm.split()):
+            words, grams = self.features[idx]
+            lexical = _jaccard(query_words, words)
+            ngram = _jaccard(query_grams, grams)
+            scored.append(((0.5 * ngram) + (0.3 * lexical), lexical, ngram, idx))
+        scored.sort(reverse=True)
+
+        best = (None, 0.0, 0.0, 0.0, 0.0)
+        for partial, lexical, ngram, idx in scored[:LOCATE_SEQUENCE_TOP]:
+            # The sequence ratio adds at most 0.2; skip candidates that cannot win.
+            if partial + 0.2 <= best[1]:
+                break
+            matcher = SequenceMatcher(a=query_norm, b=self.rows[idx]["normalized_text"], autojunk=False)
+            if partial + 0.2 * matcher.quick_ratio() <= best[1]:
+                continue
+            sequence = matcher.ratio()
+            score = partial + 0.2 * sequence
+            if score > best[1]:
+                best = (self.rows[idx], score, lexical, ngram, sequence)
+        return best
 
 
 def _expand_clip(page: Any, bbox: Tuple[float, float, float, float], padding: float = 10.0) -> Any:
@@ -106,6 +192,7 @@ def locate_matched_sentences(pdf_sentences: List[Dict], matches: List[Dict]) ->
     When the same sentence matches multiple sources, all source indices are tracked."""
     located: List[Dict] = []
     key_to_entry: Dict[tuple, Dict] = {}
+    index = _SentenceIndex(pdf_sentences)
 
     for match_index, match in enumerate(matches or []):
         for sentence_index, sentence_match in enumerate(match.get("similar_sentences") or []):
@@ -115,20 +202,7 @@ def locate_matched_sentences(pdf_sentences: List[Dict], matches: List[Dict]) ->
                 continue
 
             for target in _split_highlight_targets(query_sentence):
-                best = None
-                best_score = 0.0
-                best_lexical = 0.0
-                best_ngram = 0.0
-                best_sequence = 0.0
-                for candidate in pdf_sentences:
-                    score, lexical, ngram, sequence = _rank_sentence_candidate(target, candidate)
-                    if score > best_score:
-                        best = candidate
-                        best_score = score
-                        best_lexical = lexical
-                        best_ngram = ngram
-                        best_sequence = sequence
-
+                best, _, best_lexical, best_ngram, best_sequence = index.best_match(target)
                 if best is None:
                     continue
                 if best_lexical < 0.45 and best_ngram < 0.18 and best_sequence < 0.72:
@@ -214,27 +288,47 @@ def _region_to_bbox(region: Any) -> Tuple[float, float, float, float]:
     return (float(rect.x0), float(rect.y0), float(rect.x1), float(rect.y1))
 
 
-def _search_sentence_quads(page: Any, sentence: str, clip: Any = None) -> List[Any]:
+def _mostly_inside(clip: Any, bbox: Any) -> bool:
+    # The rule PyMuPDF applies to words when a prebuilt text page is combined with a clip.
+    pymupdf = _require_pymupdf()
+    rect = pymupdf.Rect(bbox)
+    return abs(clip & rect) >= 0.5 * abs(rect)
+
+
+def _search_page(page: Any, query: str, clip: Any, textpage: Any = None) -> List[Any]:
+    if textpage is None:
+        return page.search_for(query, quads=True, clip=clip)
+    # A prebuilt text page ignores clip, so filter the hits here.
+    hits = page.search_for(query, quads=True, textpage=textpage)
+    if clip is None:
+        return hits
+    return [quad for quad in hits if _mostly_inside(clip, quad.rect)]
+
+
+def _search_sentence_quads(page: Any, sentence: str, clip: Any = None, textpage: Any = None) -> List[Any]:
     queries = _sentence_search_queries(sentence)
     if not queries:
         return []
 
     # Try exact / full-sentence queries first.
     for query in queries[:2]:
-        hits = page.search_for(query, quads=True, clip=clip)
+        hits = _search_page(page, query, clip, textpage)
         if hits:
             return _dedupe_regions(hits)
 
     quads: List[Any] = []
     for query in queries[2:]:
-        hits = page.search_for(query, quads=True, clip=clip)
+        hits = _search_page(page, query, clip, textpage)
         if hits:
             quads.extend(hits)
     return _dedupe_regions(quads)
 
 
-def _extract_words(page: Any, clip: Any) -> List[Dict]:
-    words = page.get_text("words", clip=clip, sort=True) or []
+def _extract_words(page: Any, clip: Any, page_words: Optional[List[tuple]] = None) -> List[Dict]:
+    if page_words is not None:
+        words = [word for word in page_words if _mostly_inside(clip, word[:4])]
+    else:
+        words = page.get_text("words", clip=clip, sort=True) or []
     rows: List[Dict] = []
     for word in words:
         if len(word) < 8:
@@ -285,8 +379,62 @@ def _merge_word_rects(words: List[Dict]) -> List[Any]:
     return _dedupe_regions(rects)
 
 
-def _find_best_word_window_rects(page: Any, sentence: str, clip: Any) -> List[Any]:
-    words = _extract_words(page, clip)
+def _window_candidates(tokens: List[str], target_tokens: List[str], min_window: int, max_window: int) -> List[tuple]:
+    """Every window the exhaustive search scores, with its exact word-set and character 5-gram
+    Jaccard (kept incrementally while the window grows one word at a time) and an upper bound
+    on its SequenceMatcher ratio from shared character counts, as (bound, start, end, lexical, ngram)."""
+    target_text = " ".join(target_tokens)
+    target_set = set(target_tokens)
+    target_grams = _char_ngrams(target_text, n=5)
+    target_chars = Counter(target_text)
+    candidates = []
+    for start in range(len(tokens)):
+        upper = min(len(tokens), start + max_window)
+        if start + min_window > upper:
+            continue
+        seen: set = set()
+        shared = 0
+        grams: set = set()
+        gram_shared = 0
+        chars: Counter = Counter()
+        char_shared = 0
+        text = ""
+        for end in range(start + 1, upper + 1):
+            token = tokens[end - 1]
+            if token not in seen:
+                seen.add(token)
+                if token in target_set:
+                    shared += 1
+            added = token if not text else " " + token
+            for ch in added:
+                chars[ch] += 1
+                if chars[ch] <= target_chars.get(ch, 0):
+                    char_shared += 1
+            # Every new 5-gram ends in the added text, so it lies in the last 4 old chars + added.
+            tail = text[-4:] + added
+            for i in range(len(tail) - 4):
+                gram = tail[i:i + 5]
+                if gram not in grams:
+                    grams.add(gram)
+                    if gram in target_grams:
+                        gram_shared += 1
+            text += added
+            if end - start < min_window:
+                continue
+            lexical = shared / (len(target_set) + len(seen) - shared)
+            if len(text) < 5:
+                ngram = _jaccard(target_grams, _char_ngrams(text, n=5))
+            else:
+                ngram = gram_shared / (len(target_grams) + len(grams) - gram_shared)
+            sequence_bound = 2.0 * char_shared / (len(target_text) + len(text))
+            length_penalty = abs(end - start - len(target_tokens)) * 0.01
+            bound = (0.5 * ngram) + (0.25 * lexical) + (0.25 * sequence_bound) - length_penalty
+            candidates.append((bound, start, end, lexical, ngram))
+    return candidates
+
+
+def _find_best_word_window_rects(page: Any, sentence: str, clip: Any, page_words: Optional[List[tuple]] = None) -> List[Any]:
+    words = _extract_words(page, clip, page_words)
     if not words:
         return []
     target_tokens = [token for token in _normalize_sentence(sentence).split() if token]
@@ -296,56 +444,165 @@ def _find_best_word_window_rects(page: Any, sentence: str, clip: Any) -> List[An
     target_len = len(target_tokens)
     min_window = max(2, target_len - 4)
     max_window = min(len(words), target_len + 6)
-    best_score = 0.0
-    best_words: List[Dict] = []
     target_text = " ".join(target_tokens)
+    tokens = [word["norm"] for word in words]
 
-    for start in range(len(words)):
-        upper = min(len(words), start + max_window)
-        lower = start + min_window
-        if lower > upper:
-            continue
-        for end in range(lower, upper + 1):
-            window_words = words[start:end]
-            window_text = " ".join(word["norm"] for word in window_words)
-            if not window_text:
-                continue
-            lexical = lexical_similarity(target_text, window_text)
-            ngram = fingerprint_similarity(target_text, window_text)
-            sequence = SequenceMatcher(a=target_text, b=window_text, autojunk=False).ratio()
-            length_penalty = abs(len(window_words) - target_len) * 0.01
-            score = (0.5 * ngram) + (0.25 * lexical) + (0.25 * sequence) - length_penalty
-            if score > best_score:
-                best_score = score
-                best_words = window_words
-
-    if best_score < 0.6:
+    # Same windows and score as scoring every window in full, but SequenceMatcher (the costly
+    # term) only runs where the bound says the window could still reach 0.6 and beat the best
+    # so far. Ties go to the earliest window, as in a left-to-right scan.
+    candidates = _window_candidates(tokens, target_tokens, min_window, max_window)
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+    best_score = 0.0
+    best_span = None
+    for bound, start, end, lexical, ngram in candidates:
+        if bound < 0.6 - 1e-9 or bound < best_score - 1e-9:
+            break
+        window_text = " ".join(tokens[start:end])
+        sequence = SequenceMatcher(a=target_text, b=window_text, autojunk=False).ratio()
+        length_penalty = abs(end - start - target_len) * 0.01
+        score = (0.5 * ngram) + (0.25 * lexical) + (0.25 * sequence) - length_penalty
+        if score > best_score or (score == best_score and best_span and (start, end) < best_span):
+            best_score = score
+            best_span = (start, end)
+
+    if best_score < 0.6 or best_span is None:
         return []
-    return _merge_word_rects(best_words)
+    return _merge_word_rects(words[best_span[0]:best_span[1]])
 
 
-def _locate_sentence_regions(page: Any, row: Dict) -> List[Any]:
+def _locate_sentence_regions(page: Any, row: Dict, textpage: Any = None, page_words: Optional[List[tuple]] = None) -> List[Any]:
     clip = _expand_clip(page, row["bbox"])
 
-    quads = _search_sentence_quads(page, row["pdf_sentence"], clip=clip)
+    quads = _search_sentence_quads(page, row["pdf_sentence"], clip=clip, textpage=textpage)
     if quads:
         return quads
 
-    quads = _search_sentence_quads(page, row["query_sentence"], clip=clip)
+    quads = _search_sentence_quads(page, row["query_sentence"], clip=clip, textpage=textpage)
     if quads:
         return quads
 
-    rects = _find_best_word_window_rects(page, row["pdf_sentence"], clip)
+    rects = _find_best_word_window_rects(page, row["pdf_sentence"], clip, page_words)
     if rects:
         return rects
 
-    rects = _find_best_word_window_rects(page, row["query_sentence"], clip)
+    rects = _find_best_word_window_rects(page, row["query_sentence"], clip, page_words)
     if rects:
         return rects
 
     return []
 
 
+# Region location for PDFs with matches on at least HIGHLIGHT_PARALLEL_MIN_PAGES pages is
+# spread over HIGHLIGHT_WORKERS processes (1 = always in-process).
+HIGHLIGHT_WORKERS = int(os.getenv("HIGHLIGHT_WORKERS", str(min(4, os.cpu_count() or 1))))
+HIGHLIGHT_PARALLEL_MIN_PAGES = int(os.getenv("HIGHLIGHT_PARALLEL_MIN_PAGES", "8"))
+# "incremental": append the annotations to a copy of the original (fast, small; default)
+# "fast": full rewrite without garbage collection or compression
+# "compact": full rewrite with garbage=4 and deflate (slowest, smallest for edited files)
+HIGHLIGHT_SAVE_MODE = os.getenv("HIGHLIGHT_SAVE_MODE", "incremental").strip().lower()
+
+def _get_locate_pool():
+    return process_pools.get_pool("highlight", HIGHLIGHT_WORKERS)
+
+
+def _serialize_region(region: Any) -> tuple:
+    if hasattr(region, "ul"):  # Quad
+        return ("quad", tuple(float(v) for point in (region.ul, region.ur, region.ll, region.lr) for v in point))
+    rect = fitz.Rect(region)
+    return ("rect", (float(rect.x0), float(rect.y0), float(rect.x1), float(rect.y1)))
+
+
+def _deserialize_region(data: tuple) -> Any:
+    kind, values = data
+    if kind == "quad":
+        return fitz.Quad(values[0:2], values[2:4], values[4:6], values[6:8])
+    return fitz.Rect(values)
+
+
+def _locate_rows(doc: Any, rows: List[Tuple[int, Dict]], words_by_page: Dict[int, List[tuple]]) -> Dict[int, List[Any]]:
+    """Regions for each (row_id, row), using one search text page per page."""
+    pymupdf = _require_pymupdf()
+    textpages: Dict[int, Tuple[Any, Any]] = {}
+    located: Dict[int, List[Any]] = {}
+    for row_id, row in rows:
+        page_number = row["page_number"]
+        if page_number not in textpages:
+            page = doc[page_number - 1]
+            textpages[page_number] = (page, page.get_textpage(flags=pymupdf.TEXTFLAGS_SEARCH))
+        page, textpage = textpages[page_number]
+        regions = _locate_sentence_regions(page, row, textpage, words_by_page.get(page_number))
+        if regions:
+            located[row_id] = regions
+    return located
+
+
+def _locate_rows_in_worker(pdf_path: str, rows: List[Tuple[int, Dict]], words_by_page: Dict[int, List[tuple]]) -> Dict[int, List[tuple]]:
+    pymupdf = _require_pymupdf()
+    with pymupdf.open(pdf_path) as doc:
+        located = _locate_rows(doc, rows, words_by_page)
+    return {row_id: [_serialize_region(r) for r in regions] for row_id, regions in located.items()}
+
+
+def _page_groups(rows: List[Tuple[int, Dict]], groups: int) -> List[List[Tuple[int, Dict]]]:
+    """Split rows into up to `groups` runs of whole, consecutive pages with similar row counts."""
+    by_page: Dict[int, List[Tuple[int, Dict]]] = defaultdict(list)
+    for item in rows:
+        by_page[item[1]["page_number"]].append(item)
+    target = max(1, -(-len(rows) // groups))
+    result: List[List[Tuple[int, Dict]]] = [[]]
+    for page_number in sorted(by_page):
+        if len(result[-1]) >= target and len(result) < groups:
+            result.append([])
+        result[-1].extend(by_page[page_number])
+    return [group for group in result if group]
+
+
+def locate_regions(pdf_path: str, doc: Any, rows: List[Dict], extraction: Optional[PdfExtraction] = None) -> Dict[int, List[Any]]:
+    """Regions per index into rows. Large jobs run in worker processes by page group; the
+    caller's open document is used for small ones and as the fallback."""
+    words_by_page: Dict[int, List[tuple]] = {}
+    if extraction is not None:
+        for page in extraction.pages:
+            if page.words:
+                words_by_page[page.number] = page.words
+    items = list(enumerate(rows))
+    pages = {row["page_number"] for row in rows}
+    if HIGHLIGHT_WORKERS > 1 and len(pages) >= HIGHLIGHT_PARALLEL_MIN_PAGES:
+        try:
+            pool = _get_locate_pool()
+            futures = []
+            for group in _page_groups(items, HIGHLIGHT_WORKERS):
+                group_pages = {row["page_number"] for _, row in group}
+                group_words = {n: w for n, w in words_by_page.items() if n in group_pages}
+                futures.append(pool.submit(_locate_rows_in_worker, pdf_path, group, group_words))
+            located: Dict[int, List[Any]] = {}
+            for future in futures:
+                for row_id, regions in future.result().items():
+                    located[row_id] = [_deserialize_region(r) for r in regions]
+            return located
+        except Exception as e:
+            process_pools.reset_if_broken("highlight", e)
+            logger.warning("Parallel region location failed; falling back to in-process", exc_info=True)
+    return _locate_rows(doc, items, words_by_page)
+
+
+def _save_annotated(doc: Any, output_pdf_path: str, save_mode: str) -> Optional[str]:
+    """Save doc for write_highlight_annotations. Returns a temp file the caller must move onto
+    output_pdf_path once doc is closed, or None when the output is already in place."""
+    if save_mode == "incremental" and doc.can_save_incrementally():
+        doc.saveIncr()
+        return None
+    if save_mode == "compact":
+        doc.save(output_pdf_path, garbage=4, deflate=True)
+        return None
+    # "fast", or an incremental save the file does not allow (e.g. it needed repair).
+    # Write beside the target: doc may be reading from output_pdf_path itself, and Windows
+    # will not replace a file that is still open.
+    tmp_path = output_pdf_path + ".tmp"
+    doc.save(tmp_path, garbage=0, deflate=False)
+    return tmp_path
+
+
 HIGHLIGHT_COLORS = [
     (1.0, 0.70, 0.70),
     (0.70, 0.82, 1.0),
@@ -369,29 +626,70 @@ BADGE_COLORS = [
 ]
 
 
-def highlight_pdf_matches(input_pdf_path: str, matches: List[Dict], output_pdf_path: str) -> Dict:
+def locate_pdf_highlights(
+    input_pdf_path: str,
+    matches: List[Dict],
+    extraction: Optional[PdfExtraction] = None,
+) -> Dict:
     """
-    Annotate the uploaded PDF with per-source colored highlights and numbered badges.
-    Each source document gets a unique color; sentences matching multiple sources show
-    all source numbers in their badge row (Turnitin-style).
+    Find the page regions of every matched sentence without writing a PDF (overlay mode).
+    The viewer paints located_sentences over the original document; write_highlight_annotations
+    turns the same rows into an annotated copy when one is actually needed.
+    """
+    pymupdf = _require_pymupdf()
+    extracted_sentences = extract_pdf_sentences_with_bboxes(input_pdf_path, extraction)
+    located_sentences = locate_matched_sentences(extracted_sentences, matches)
+    with pymupdf.open(input_pdf_path) as doc:
+        regions_by_row = locate_regions(input_pdf_path, doc, located_sentences, extraction)
+    highlight_count = 0
+    region_count = 0
+    for row_id, row in enumerate(located_sentences):
+        regions = regions_by_row.get(row_id)
+        if not regions:
+            continue
+        row["regions"] = [_region_to_bbox(region) for region in regions]
+        highlight_count += 1
+        region_count += len(regions)
+    return {
+        "located_sentence_count": len(located_sentences),
+        "highlight_count": highlight_count,
+        "annotation_count": region_count,
+        "located_sentences": located_sentences,
+    }
+
+
+def write_highlight_annotations(
+    input_pdf_path: str,
+    located_sentences: List[Dict],
+    output_pdf_path: str,
+    save_mode: Optional[str] = None,
+) -> Dict:
+    """
+    Annotate a copy of the PDF with per-source colored highlights and numbered badges for
+    rows that carry "regions" (from locate_pdf_highlights). Each source document gets a unique
+    color; sentences matching multiple sources show all source numbers in their badge row
+    (Turnitin-style). save_mode overrides HIGHLIGHT_SAVE_MODE.
     """
     output_dir = os.path.dirname(output_pdf_path)
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
     pymupdf = _require_pymupdf()
-
-    extracted_sentences = extract_pdf_sentences_with_bboxes(input_pdf_path)
-    located_sentences = locate_matched_sentences(extracted_sentences, matches)
+    save_mode = (save_mode or HIGHLIGHT_SAVE_MODE).lower()
     annotation_count = 0
     highlight_count = 0
 
-    with pymupdf.open(input_pdf_path) as doc:
+    # Incremental saves append to the file that was opened, so annotate a copy of the input.
+    source_path = input_pdf_path
+    if save_mode == "incremental":
+        shutil.copyfile(input_pdf_path, output_pdf_path)
+        source_path = output_pdf_path
+
+    with pymupdf.open(source_path) as doc:
         for row in located_sentences:
-            page = doc[row["page_number"] - 1]
-            regions = _locate_sentence_regions(page, row)
+            regions = [pymupdf.Rect(bbox) for bbox in row.get("regions") or []]
             if not regions:
                 continue
-            row["regions"] = [_region_to_bbox(region) for region in regions]
+            page = doc[row["page_number"] - 1]
 
             match_indices = row.get("match_indices", [row.get("match_index", 0)])
             primary_idx = match_indices[0] if match_indices else 0
@@ -446,12 +744,35 @@ def highlight_pdf_matches(input_pdf_path: str, matches: List[Dict], output_pdf_p
                         ov_text, fontsize=font_sz, color=(1, 1, 1),
                     )
 
-        doc.save(output_pdf_path, garbage=4, deflate=True)
+        pending_path = _save_annotated(doc, output_pdf_path, save_mode)
+    if pending_path:
+        os.replace(pending_path, output_pdf_path)
 
     return {
         "output_path": output_pdf_path,
-        "located_sentence_count": len(located_sentences),
         "highlight_count": highlight_count,
         "annotation_count": annotation_count,
-        "located_sentences": located_sentences,
+    }
+
+
+def highlight_pdf_matches(
+    input_pdf_path: str,
+    matches: List[Dict],
+    output_pdf_path: str,
+    extraction: Optional[PdfExtraction] = None,
+    save_mode: Optional[str] = None,
+) -> Dict:
+    """
+    Locate matched sentences and write the annotated PDF in one go.
+    Pass the PdfExtraction from process_document to reuse its blocks and words instead of
+    parsing the pages again.
+    """
+    summary = locate_pdf_highlights(input_pdf_path, matches, extraction)
+    written = write_highlight_annotations(input_pdf_path, summary["located_sentences"], output_pdf_path, save_mode)
+    return {
+        "output_path": output_pdf_path,
+        "located_sentence_count": summary["located_sentence_count"],
+        "highlight_count": written["highlight_count"],
+        "annotation_count": written["annotation_count"],
+        "located_sentences": summary["located_sentences"],
     }
@@ -0,0 +1,56 @@
+"""
+Worker process pools for CPU-bound work that should not hold the GIL in the server process:
+report rendering (report_generator), batch comparison (diff_checker) and highlight region
+location (pdf_highlight_pipeline).
+
+Each caller asks for a pool by name and size; the pool starts on first use and is kept for
+the life of the server. main.py calls shutdown_all() when the app stops so no spawned
+interpreter outlives it.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_pool(name: str, workers: int) -> Optional[ProcessPoolExecutor]:
+    """The shared pool called name, started with workers processes; None when workers <= 0."""
+    if workers <= 0:
+        return None
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            # spawn, not fork: the server process has model and event-loop threads running.
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[name] = pool
+        return pool
+
+
+def reset_pool(name: str, pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """Drop a (broken) pool so the next get_pool() starts a fresh one. With pool given, only
+    drop it if it is still the current one; a replacement started since is left running."""
+    with _lock:
+        current = _pools.get(name)
+        if current is None or (pool is not None and current is not pool):
+            return
+        del _pools[name]
+    current.shutdown(wait=False, cancel_futures=True)
+
+
+def reset_if_broken(name: str, exc: BaseException, pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """reset_pool(name, pool) when exc says a worker died and took the pool with it."""
+    if isinstance(exc, BrokenProcessPool):
+        reset_pool(name, pool)
+
+
+def shutdown_all(wait: bool = True) -> None:
+    """Stop every pool, cancelling work that has not started."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,88 @@
+"""
+On-disk cache of rendered report PDFs.
+
+Teachers often download the same report more than once. A report is a pure function of
+its kind, job and posted result JSON (which refers to PDFs by content-addressed blob URL),
+so the rendered file is stored under a hash of those and served again on the next request.
+Overlay-mode annotated PDFs, which are derived the same way, are cached here as well.
+This module has no ReportLab dependency so the server can prune the cache without loading it.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(_THIS_DIR, "artifacts", "reports"))
+# Cached reports unused for this long are removed by the housekeeping sweep.
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", str(7 * 86400)))
+# Part of every key: bump it when a report layout changes so old renders are not served.
+REPORT_LAYOUT_VERSION = "2"
+
+
+def cache_key(kind: str, data: Dict[str, Any], job_id: Optional[str] = None) -> str:
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    h = hashlib.sha256()
+    for part in (REPORT_LAYOUT_VERSION, kind, job_id or "", payload):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(REPORT_CACHE_DIR, f"{key}.pdf")
+
+
+def get(key: str) -> Optional[str]:
+    """Path of a cached report, or None. A hit refreshes its age for prune()."""
+    path = _path(key)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def put(key: str, render: Callable[[str], Any]) -> str:
+    """Run render(tmp_path) and move the result into the cache. Returns the cached path."""
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=REPORT_CACHE_DIR, prefix=".tmp-", suffix=".pdf")
+    os.close(fd)
+    try:
+        render(tmp_path)
+        # Rename into place so a concurrent request never serves a half-written report.
+        os.replace(tmp_path, _path(key))
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return _path(key)
+
+
+def prune(max_age: float = REPORT_CACHE_TTL) -> int:
+    """Remove cached reports not used for max_age seconds. Returns how many were removed."""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(REPORT_CACHE_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def count() -> int:
+    try:
+        return sum(1 for entry in os.scandir(REPORT_CACHE_DIR) if entry.name.endswith(".pdf"))
+    except FileNotFoundError:
+        return 0
@@ -1,12 +1,24 @@
 """
 Turnitin-style Similarity Report Generator
 Generates a professional PDF report matching Turnitin's visual style.
+
+Paragraph styles, the sample style sheet and the small drawings (score rings, source
+badges, metric bars) are built once per process and reused. Finished reports are cached
+on disk by report_cache, and main.py renders cache misses in a process pool
+(get_report_pool) so a large report does not occupy a server thread.
 """
+import functools
 import io
 import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+import process_pools
+import report_cache
+
 try:
     from reportlab.lib import colors
     from reportlab.lib.pagesizes import A4
@@ -25,6 +37,11 @@ try:
 except ImportError:
     REPORTLAB_AVAILABLE = False
 
+# Matched-sentence rows shown in detail per report; later sources go to a compact appendix.
+REPORT_MAX_DETAIL_ROWS = int(os.getenv("REPORT_MAX_DETAIL_ROWS", "400"))
+_TABLE_CHUNK_ROWS = 100  # rows per Table for long source lists (even, to keep row shading aligned)
+# Processes rendering reports; 0 renders in the calling thread.
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(2, os.cpu_count() or 1))))
 
 # ─── Turnitin-inspired color palette ───────────────────────────────────────
 RED_HIGH    = colors.HexColor("#e53e3e")
@@ -50,6 +67,24 @@ MATCH_COLORS = [
 ]
 
 
+_style_cache: Dict[tuple, Any] = {}
+
+
+def _pstyle(name: str, **kw):
+    """ParagraphStyle(name, **kw), created once per distinct definition. Paragraphs only
+    read their style, so one instance can be shared by every paragraph and report."""
+    key = (name, tuple(sorted(kw.items())))
+    style = _style_cache.get(key)
+    if style is None:
+        style = _style_cache[key] = ParagraphStyle(name, **kw)
+    return style
+
+
+@functools.lru_cache(maxsize=1)
+def _sample_styles():
+    return getSampleStyleSheet()
+
+
 def _score_color(pct: float):
     if pct >= 60:
         return RED_HIGH
@@ -66,6 +101,7 @@ def _score_label(pct: float) -> str:
     return "LOW SIMILARITY"
 
 
+@functools.lru_cache(maxsize=256)
 def _make_ring_gauge(value: float, size: float = 90) -> Drawing:
     """Draw a circular gauge like Turnitin's score ring."""
     d = Drawing(size, size)
@@ -102,19 +138,25 @@ def _make_ring_gauge(value: float, size: float = 90) -> Drawing:
     return d
 
 
-def _mini_bar_table(label: str, value: float, bar_color) -> Table:
-    """Single metric bar row."""
-    bar_width = 120
+@functools.lru_cache(maxsize=256)
+def _make_bar(value: float, bar_color, bar_width: int = 120) -> Drawing:
     filled = max(2, int(bar_width * value / 100))
     bar_drawing = Drawing(bar_width, 8)
     bar_drawing.add(Rect(0, 0, bar_width, 8, fillColor=BORDER_CLR, strokeColor=None, rx=4, ry=4))
     bar_drawing.add(Rect(0, 0, filled, 8, fillColor=bar_color, strokeColor=None, rx=4, ry=4))
+    return bar_drawing
+
+
+def _mini_bar_table(label: str, value: float, bar_color) -> Table:
+    """Single metric bar row."""
+    bar_width = 120
+    bar_drawing = _make_bar(value, bar_color, bar_width)
 
     data = [[
-        Paragraph(f'<font size="8" color="#718096">{label}</font>', ParagraphStyle('x')),
+        Paragraph(f'<font size="8" color="#718096">{label}</font>', _pstyle('x')),
         bar_drawing,
         Paragraph(f'<font size="8"><b>{int(value)}%</b></font>',
-                  ParagraphStyle('x', textColor=bar_color)),
+                  _pstyle('x', textColor=bar_color)),
     ]]
     t = Table(data, colWidths=[80, bar_width + 4, 30])
     t.setStyle(TableStyle([
@@ -129,26 +171,33 @@ def _mini_bar_table(label: str, value: float, bar_color) -> Table:
 
 
 class _NumberedCanvas(canvas.Canvas):
-    """Canvas that adds page numbers in Turnitin footer style."""
+    """Canvas that adds page numbers in Turnitin footer style.
+
+    The total page count is only known at the end, so each page's "Page N of M" is a form
+    XObject that the page references when it is finished and that save() fills in. Pages
+    are written out as they finish instead of being held until the end.
+    """
     def __init__(self, *args, **kwargs):
         canvas.Canvas.__init__(self, *args, **kwargs)
-        self._saved_page_states = []
+        self._finished_pages = 0
 
     def showPage(self):
-        self._saved_page_states.append(dict(self.__dict__))
-        self._startPage()
+        self._finished_pages += 1
+        self._draw_page_footer(self._finished_pages)
+        canvas.Canvas.showPage(self)
 
     def save(self):
-        num_pages = len(self._saved_page_states)
-        for state in self._saved_page_states:
-            self.__dict__.update(state)
-            self._draw_page_footer(num_pages)
-            canvas.Canvas.showPage(self)
+        w, h = A4
+        for page_num in range(1, self._finished_pages + 1):
+            self.beginForm(f"pageNumber{page_num}")
+            self.setFillColor(colors.white)
+            self.setFont("Helvetica", 8)
+            self.drawRightString(w - 15 * mm, 6 * mm, f"Page {page_num} of {self._finished_pages}")
+            self.endForm()
         canvas.Canvas.save(self)
 
-    def _draw_page_footer(self, page_count):
+    def _draw_page_footer(self, page_num):
         self.saveState()
-        page_num = self._pageNumber
         w, h = A4
         # Footer bar
         self.setFillColor(HEADER_BG)
@@ -160,14 +209,87 @@ class _NumberedCanvas(canvas.Canvas):
         self.setFont("Helvetica", 7)
         self.setFillColor(TEXT_LIGHT)
         self.drawString(15 * mm, 4 * mm, "Powered by AI Similarity Detection")
-        # Right: page number
-        self.setFillColor(colors.white)
-        self.setFont("Helvetica", 8)
-        page_text = f"Page {page_num} of {page_count}"
-        self.drawRightString(w - 15 * mm, 6 * mm, page_text)
+        # Right: page number, drawn by save()
+        self.doForm(f"pageNumber{page_num}")
         self.restoreState()
 
 
+class _FlowableStream(list):
+    """Story for doc.build() whose long sections are generators of flowables.
+
+    The build loop only works on the front of the story (len(), [0], del [0], and split
+    remainders put back at the front), so generator sections are pulled in a few flowables
+    at a time as the build reaches them and memory follows the page being laid out rather
+    than the whole report.
+    """
+    _LOOKAHEAD = 32
+
+    def __init__(self, items):
+        super().__init__()
+        self._pending = deque(items)  # flowables and generators, in story order
+
+    def _fill(self):
+        while list.__len__(self) < self._LOOKAHEAD and self._pending:
+            head = self._pending[0]
+            if isinstance(head, Iterator):
+                try:
+                    self.append(next(head))
+                except StopIteration:
+                    self._pending.popleft()
+            else:
+                self.append(self._pending.popleft())
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+
+def _appendix_flowables(matches: List[Dict[str, Any]], start: int, W: float, heading_style):
+    """Compact table of matches[start:], the sources left without a detail card."""
+    rest = matches[start:]
+    n_sents = sum(len(m.get("similar_sentences") or []) for m in rest)
+    yield PageBreak()
+    yield Paragraph("Appendix: Further Matched Sources", heading_style)
+    yield HRFlowable(width=W, thickness=0.5, color=BORDER_CLR, spaceAfter=8)
+    yield Paragraph(
+        f'<font size="8" color="#718096">Sentence details are limited to {REPORT_MAX_DETAIL_ROWS} rows. '
+        f'The remaining {len(rest)} sources ({n_sents} matched sentences) are summarised below.</font>',
+        _sample_styles()["Normal"],
+    )
+    yield Spacer(1, 6)
+
+    th = _pstyle("ax_th", fontSize=8, fontName="Helvetica-Bold", textColor=colors.white, leading=10)
+    td = _pstyle("ax_td", fontSize=8, fontName="Helvetica", textColor=TEXT_DARK, leading=10)
+    for chunk_start in range(start, len(matches), _TABLE_CHUNK_ROWS):
+        rows = [[Paragraph(c, th) for c in ("#", "Source Document", "Similarity", "Sentences")]]
+        for i, m in enumerate(matches[chunk_start:chunk_start + _TABLE_CHUNK_ROWS], chunk_start):
+            combined = min(100, round(
+                float(m.get("combined_similarity", m.get("semantic_similarity", 0))) * 100
+            ))
+            fname = m.get("file_name") or m.get("filename") or "Unknown"
+            if len(fname) > 60:
+                fname = fname[:57] + "..."
+            rows.append([
+                Paragraph(str(i + 1), td),
+                Paragraph(fname, td),
+                Paragraph(f"{combined}%", td),
+                Paragraph(str(len(m.get("similar_sentences") or [])), td),
+            ])
+        table = Table(rows, colWidths=[30, W - 30 - 60 - 55, 60, 55], repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), HEADER_BG),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, CARD_BG]),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('BOX', (0, 0), (-1, -1), 0.5, BORDER_CLR),
+            ('INNERGRID', (0, 0), (-1, -1), 0.3, BORDER_CLR),
+        ]))
+        yield table
+
+
 def _generate_full_analysis_report(
     data: Dict[str, Any],
     output_path: str,
@@ -196,10 +318,10 @@ def _generate_full_analysis_report(
     story = []
 
     # ── Styles ──────────────────────────────────────────────────────────────
-    base = getSampleStyleSheet()
+    base = _sample_styles()
 
     def S(name, **kw):
-        return ParagraphStyle(name, **kw)
+        return _pstyle(name, **kw)
 
     h1 = S("h1", fontSize=22, fontName="Helvetica-Bold", textColor=colors.white,
             spaceAfter=2, leading=26)
@@ -355,7 +477,7 @@ def _generate_full_analysis_report(
         meta_rows.append(["Report Generated", generated_at])
 
         def meta_cell(txt, bold=False):
-            style = ParagraphStyle('mc', fontSize=8, fontName="Helvetica-Bold" if bold else "Helvetica",
+            style = _pstyle('mc', fontSize=8, fontName="Helvetica-Bold" if bold else "Helvetica",
                                    textColor=TEXT_DARK if bold else TEXT_MID, leading=11)
             return Paragraph(txt, style)
 
@@ -391,195 +513,217 @@ def _generate_full_analysis_report(
     else:
         # Summary table header
         hdr_data = [["#", "Source Document", "Overall", "Semantic", "Lexical", "Sentences"]]
-        hdr_style = ParagraphStyle('th', fontSize=8, fontName="Helvetica-Bold",
+        hdr_style = _pstyle('th', fontSize=8, fontName="Helvetica-Bold",
                                    textColor=colors.white, leading=10)
         hdr_row = [[
             Paragraph(c, hdr_style) for c in hdr_data[0]
         ]]
-        rows_data = [hdr_row[0]]
-        for i, m in enumerate(matches):
-            col = MATCH_COLORS[i % len(MATCH_COLORS)]
-            sem = min(100, round(float(m.get("semantic_similarity", 0)) * 100))
-            lex = min(100, round(float(m.get("lexical_similarity", 0)) * 100))
-            combined = min(100, round(float(m.get("combined_similarity", m.get("semantic_similarity", 0))) * 100))
-            n_sents = len(m.get("similar_sentences") or [])
-            fname = m.get("file_name") or m.get("filename") or "Unknown"
-            if len(fname) > 40:
-                fname = fname[:37] + "..."
-
-            def rc(txt, color=TEXT_DARK, bold=False):
-                st = ParagraphStyle('rc', fontSize=8,
-                                    fontName="Helvetica-Bold" if bold else "Helvetica",
-                                    textColor=color, leading=10)
-                return Paragraph(str(txt), st)
-
-            # Color dot + number
-            num_cell = Paragraph(
-                f'<font color="{col.hexval()}" size="9"><b>{i+1}</b></font>',
-                ParagraphStyle('dot', fontSize=9, fontName="Helvetica-Bold",
-                               textColor=col, alignment=TA_CENTER, leading=12)
-            )
-            rows_data.append([
-                num_cell,
-                rc(fname),
-                rc(f"{combined}%", color=_score_color(combined), bold=True),
-                rc(f"{sem}%", color=BLUE_ACCENT),
-                rc(f"{lex}%", color=colors.HexColor("#319795")),
-                rc(str(n_sents)),
-            ])
 
-        summary_table = Table(
-            rows_data,
-            colWidths=[18, W - 18 - 45 - 45 - 45 - 35, 45, 45, 45, 35]
-        )
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), HEADER_BG),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, CARD_BG]),
-            ('BOX', (0, 0), (-1, -1), 0.5, BORDER_CLR),
-            ('INNERGRID', (0, 0), (-1, -1), 0.3, BORDER_CLR),
-            ('ROUNDEDCORNERS', [4, 4, 4, 4]),
-        ]))
-        story.append(summary_table)
+        def summary_tables():
+            # A long source list is laid out _TABLE_CHUNK_ROWS rows per Table, as the build
+            # reaches it, rather than as one Table holding every row.
+            for start in range(0, len(matches), _TABLE_CHUNK_ROWS):
+                rows_data = [hdr_row[0]] if start == 0 else []
+                first_row = 1 if start == 0 else 0
+                for i, m in enumerate(matches[start:start + _TABLE_CHUNK_ROWS], start):
+                    col = MATCH_COLORS[i % len(MATCH_COLORS)]
+                    sem = min(100, round(float(m.get("semantic_similarity", 0)) * 100))
+                    lex = min(100, round(float(m.get("lexical_similarity", 0)) * 100))
+                    combined = min(100, round(float(m.get("combined_similarity", m.get("semantic_similarity", 0))) * 100))
+                    n_sents = len(m.get("similar_sentences") or [])
+                    fname = m.get("file_name") or m.get("filename") or "Unknown"
+                    if len(fname) > 40:
+                        fname = fname[:37] + "..."
+
+                    def rc(txt, color=TEXT_DARK, bold=False):
+                        st = _pstyle('rc', fontSize=8,
+                                            fontName="Helvetica-Bold" if bold else "Helvetica",
+                                            textColor=color, leading=10)
+                        return Paragraph(str(txt), st)
+
+                    # Color dot + number
+                    num_cell = Paragraph(
+                        f'<font color="{col.hexval()}" size="9"><b>{i+1}</b></font>',
+                        _pstyle('dot', fontSize=9, fontName="Helvetica-Bold",
+                                       textColor=col, alignment=TA_CENTER, leading=12)
+                    )
+                    rows_data.append([
+                        num_cell,
+                        rc(fname),
+                        rc(f"{combined}%", color=_score_color(combined), bold=True),
+                        rc(f"{sem}%", color=BLUE_ACCENT),
+                        rc(f"{lex}%", color=colors.HexColor("#319795")),
+                        rc(str(n_sents)),
+                    ])
+
+                summary_table = Table(
+                    rows_data,
+                    colWidths=[18, W - 18 - 45 - 45 - 45 - 35, 45, 45, 45, 35]
+                )
+                table_style = [
+                    ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+                    ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                    ('TOPPADDING', (0, 0), (-1, -1), 6),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+                    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+                    ('ROWBACKGROUNDS', (0, first_row), (-1, -1), [colors.white, CARD_BG]),
+                    ('BOX', (0, 0), (-1, -1), 0.5, BORDER_CLR),
+                    ('INNERGRID', (0, 0), (-1, -1), 0.3, BORDER_CLR),
+                    ('ROUNDEDCORNERS', [4, 4, 4, 4]),
+                ]
+                if start == 0:
+                    table_style += [
+                        ('BACKGROUND', (0, 0), (-1, 0), HEADER_BG),
+                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                    ]
+                summary_table.setStyle(TableStyle(table_style))
+                yield summary_table
+
+        story.append(summary_tables())
         story.append(Spacer(1, 16))
 
         # ── Per-match detail cards ──────────────────────────────────────────
         story.append(Paragraph("Match Details", h2))
         story.append(HRFlowable(width=W, thickness=0.5, color=BORDER_CLR, spaceAfter=10))
 
-        for i, m in enumerate(matches):
-            col = MATCH_COLORS[i % len(MATCH_COLORS)]
-            sem = min(100, round(float(m.get("semantic_similarity", 0)) * 100))
-            lex = min(100, round(float(m.get("lexical_similarity", 0)) * 100))
-            combined = min(100, round(float(m.get("combined_similarity", m.get("semantic_similarity", 0))) * 100))
-            fname = m.get("file_name") or m.get("filename") or "Unknown"
-            similar_sentences = m.get("similar_sentences") or []
-
-            # Card title bar
-            title_data = [[
-                Paragraph(
-                    f'<font color="white" size="9"><b>Match {i+1}</b></font>',
-                    base["Normal"]
-                ),
-                Paragraph(
-                    f'<font color="white" size="9">{fname}</font>',
-                    ParagraphStyle('fn', fontSize=9, fontName="Helvetica",
-                                   textColor=colors.white, leading=11, alignment=TA_LEFT)
-                ),
-                Paragraph(
-                    f'<font color="white" size="10"><b>{combined}%</b></font>',
-                    ParagraphStyle('sc', fontSize=10, fontName="Helvetica-Bold",
-                                   textColor=colors.white, alignment=TA_RIGHT, leading=12)
-                ),
-            ]]
-            title_table = Table(title_data, colWidths=[55, W - 55 - 50, 50])
-            title_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), col),
-                ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('TOPPADDING', (0, 0), (-1, -1), 7),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 7),
-                ('LEFTPADDING', (0, 0), (0, 0), 10),
-                ('LEFTPADDING', (1, 0), (1, 0), 6),
-                ('RIGHTPADDING', (2, 0), (2, 0), 10),
-                ('ROUNDEDCORNERS', [4, 4, 0, 0]),
-            ]))
-
-            # Metric sub-row
-            metric_data = [[
-                Paragraph(f'<font size="8" color="#718096">Semantic: </font>'
-                          f'<font size="8"><b>{sem}%</b></font>', base["Normal"]),
-                Paragraph(f'<font size="8" color="#718096">Lexical: </font>'
-                          f'<font size="8"><b>{lex}%</b></font>', base["Normal"]),
-                Paragraph(f'<font size="8" color="#718096">Matched sentences: </font>'
-                          f'<font size="8"><b>{len(similar_sentences)}</b></font>', base["Normal"]),
-            ]]
-            metric_table = Table(metric_data, colWidths=[W // 3, W // 3, W // 3])
-            metric_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), CARD_BG),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('LEFTPADDING', (0, 0), (-1, -1), 10),
-                ('INNERGRID', (0, 0), (-1, -1), 0.3, BORDER_CLR),
-                ('BOX', (0, 0), (-1, -1), 0.5, BORDER_CLR),
-                ('ROUNDEDCORNERS', [0, 0, 4, 4]),
-            ]))
-
-            card_content = [title_table, metric_table]
-
-            # Sentence matches
-            if similar_sentences:
-                card_content.append(Spacer(1, 5))
-                card_content.append(
-                    Paragraph("Similar Sentences Detected:", h3)
-                )
-                for j, sm in enumerate(similar_sentences[:8]):  # cap at 8 per match
-                    q = (sm.get("query_sentence") or "").strip()
-                    r = (sm.get("matched_sentence") or "").strip()
-                    s_sem = min(100, round(float(sm.get("semantic_similarity", 0)) * 100))
-                    s_lex = min(100, round(float(sm.get("lexical_similarity", 0)) * 100))
-
-                    sentence_data = [
-                        [
-                            Paragraph(
-                                f'<font size="8" color="{col.hexval()}"><b>Your text:</b></font> '
-                                f'<font size="8" color="#2d3748">{q}</font>',
-                                ParagraphStyle('qs', fontSize=8, fontName="Helvetica",
-                                               textColor=TEXT_DARK, leading=12)
-                            )
-                        ],
-                        [
-                            Paragraph(
-                                f'<font size="8" color="#718096"><b>Matched:</b></font> '
-                                f'<font size="8" color="#4a5568">{r}</font>',
-                                ParagraphStyle('rs', fontSize=8, fontName="Helvetica",
-                                               textColor=TEXT_MID, leading=12)
-                            )
-                        ],
-                        [
-                            Paragraph(
-                                f'<font size="7" color="#a0aec0">Semantic: {s_sem}%  •  '
-                                f'Lexical: {s_lex}%</font>',
-                                ParagraphStyle('ss', fontSize=7, fontName="Helvetica",
-                                               textColor=TEXT_LIGHT, leading=10)
-                            )
-                        ],
-                    ]
-                    sent_table = Table(sentence_data, colWidths=[W])
-                    sent_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-                        ('BACKGROUND', (0, 0), (0, 0), colors.HexColor("#fff5f5") if col == RED_HIGH
-                         else colors.HexColor("#ebf8ff")),
-                        ('BOX', (0, 0), (-1, -1), 0.5, BORDER_CLR),
-                        ('LEFTBORDER', (0, 0), (0, 0), 3, col),
-                        ('LINEAFTER', (0, 0), (0, 2), 0, colors.white),
-                        ('LINEBEFORE', (0, 0), (0, 2), 3, col),
-                        ('TOPPADDING', (0, 0), (-1, -1), 5),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 9),
-                        ('INNERGRID', (0, 0), (-1, -1), 0.3, BORDER_CLR),
-                        ('ROUNDEDCORNERS', [2, 2, 2, 2]),
-                    ]))
-                    card_content.append(sent_table)
-                    card_content.append(Spacer(1, 3))
-
-                if len(similar_sentences) > 8:
-                    card_content.append(Paragraph(
-                        f'<font size="8" color="#a0aec0">... and {len(similar_sentences) - 8} more matched sentences.</font>',
-                        small
-                    ))
-
-            story.append(KeepTogether(card_content[:3]))  # keep title+metrics together
-            for part in card_content[3:]:
-                story.append(part)
-            story.append(Spacer(1, 14))
+        def match_cards():
+            # Sentence rows are capped at REPORT_MAX_DETAIL_ROWS; the sources after that
+            # are listed in the appendix instead of getting a card.
+            rows_left = REPORT_MAX_DETAIL_ROWS
+            for i, m in enumerate(matches):
+                if rows_left <= 0:
+                    yield from _appendix_flowables(matches, i, W, h2)
+                    return
+                col = MATCH_COLORS[i % len(MATCH_COLORS)]
+                sem = min(100, round(float(m.get("semantic_similarity", 0)) * 100))
+                lex = min(100, round(float(m.get("lexical_similarity", 0)) * 100))
+                combined = min(100, round(float(m.get("combined_similarity", m.get("semantic_similarity", 0))) * 100))
+                fname = m.get("file_name") or m.get("filename") or "Unknown"
+                similar_sentences = m.get("similar_sentences") or []
+                shown = similar_sentences[:min(8, rows_left)]  # cap at 8 per match
+                rows_left -= max(1, len(shown))
+
+                # Card title bar
+                title_data = [[
+                    Paragraph(
+                        f'<font color="white" size="9"><b>Match {i+1}</b></font>',
+                        base["Normal"]
+                    ),
+                    Paragraph(
+                        f'<font color="white" size="9">{fname}</font>',
+                        _pstyle('fn', fontSize=9, fontName="Helvetica",
+                                       textColor=colors.white, leading=11, alignment=TA_LEFT)
+                    ),
+                    Paragraph(
+                        f'<font color="white" size="10"><b>{combined}%</b></font>',
+                        _pstyle('sc', fontSize=10, fontName="Helvetica-Bold",
+                                       textColor=colors.white, alignment=TA_RIGHT, leading=12)
+                    ),
+                ]]
+                title_table = Table(title_data, colWidths=[55, W - 55 - 50, 50])
+                title_table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, -1), col),
+                    ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
+                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                    ('TOPPADDING', (0, 0), (-1, -1), 7),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 7),
+                    ('LEFTPADDING', (0, 0), (0, 0), 10),
+                    ('LEFTPADDING', (1, 0), (1, 0), 6),
+                    ('RIGHTPADDING', (2, 0), (2, 0), 10),
+                    ('ROUNDEDCORNERS', [4, 4, 0, 0]),
+                ]))
+
+                # Metric sub-row
+                metric_data = [[
+                    Paragraph(f'<font size="8" color="#718096">Semantic: </font>'
+                              f'<font size="8"><b>{sem}%</b></font>', base["Normal"]),
+                    Paragraph(f'<font size="8" color="#718096">Lexical: </font>'
+                              f'<font size="8"><b>{lex}%</b></font>', base["Normal"]),
+                    Paragraph(f'<font size="8" color="#718096">Matched sentences: </font>'
+                              f'<font size="8"><b>{len(similar_sentences)}</b></font>', base["Normal"]),
+                ]]
+                metric_table = Table(metric_data, colWidths=[W // 3, W // 3, W // 3])
+                metric_table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, -1), CARD_BG),
+                    ('TOPPADDING', (0, 0), (-1, -1), 6),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                    ('LEFTPADDING', (0, 0), (-1, -1), 10),
+                    ('INNERGRID', (0, 0), (-1, -1), 0.3, BORDER_CLR),
+                    ('BOX', (0, 0), (-1, -1), 0.5, BORDER_CLR),
+                    ('ROUNDEDCORNERS', [0, 0, 4, 4]),
+                ]))
+
+                card_content = [title_table, metric_table]
+
+                # Sentence matches
+                if similar_sentences:
+                    card_content.append(Spacer(1, 5))
+                    card_content.append(
+                        Paragraph("Similar Sentences Detected:", h3)
+                    )
+                    for j, sm in enumerate(shown):
+                        q = (sm.get("query_sentence") or "").strip()
+                        r = (sm.get("matched_sentence") or "").strip()
+                        s_sem = min(100, round(float(sm.get("semantic_similarity", 0)) * 100))
+                        s_lex = min(100, round(float(sm.get("lexical_similarity", 0)) * 100))
+
+                        sentence_data = [
+                            [
+                                Paragraph(
+                                    f'<font size="8" color="{col.hexval()}"><b>Your text:</b></font> '
+                                    f'<font size="8" color="#2d3748">{q}</font>',
+                                    _pstyle('qs', fontSize=8, fontName="Helvetica",
+                                                   textColor=TEXT_DARK, leading=12)
+                                )
+                            ],
+                            [
+                                Paragraph(
+                                    f'<font size="8" color="#718096"><b>Matched:</b></font> '
+                                    f'<font size="8" color="#4a5568">{r}</font>',
+                                    _pstyle('rs', fontSize=8, fontName="Helvetica",
+                                                   textColor=TEXT_MID, leading=12)
+                                )
+                            ],
+                            [
+                                Paragraph(
+                                    f'<font size="7" color="#a0aec0">Semantic: {s_sem}%  •  '
+                                    f'Lexical: {s_lex}%</font>',
+                                    _pstyle('ss', fontSize=7, fontName="Helvetica",
+                                                   textColor=TEXT_LIGHT, leading=10)
+                                )
+                            ],
+                        ]
+                        sent_table = Table(sentence_data, colWidths=[W])
+                        sent_table.setStyle(TableStyle([
+                            ('BACKGROUND', (0, 0), (-1, -1), colors.white),
+                            ('BACKGROUND', (0, 0), (0, 0), colors.HexColor("#fff5f5") if col == RED_HIGH
+                             else colors.HexColor("#ebf8ff")),
+                            ('BOX', (0, 0), (-1, -1), 0.5, BORDER_CLR),
+                            ('LEFTBORDER', (0, 0), (0, 0), 3, col),
+                            ('LINEAFTER', (0, 0), (0, 2), 0, colors.white),
+                            ('LINEBEFORE', (0, 0), (0, 2), 3, col),
+                            ('TOPPADDING', (0, 0), (-1, -1), 5),
+                            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+                            ('LEFTPADDING', (0, 0), (-1, -1), 9),
+                            ('INNERGRID', (0, 0), (-1, -1), 0.3, BORDER_CLR),
+                            ('ROUNDEDCORNERS', [2, 2, 2, 2]),
+                        ]))
+                        card_content.append(sent_table)
+                        card_content.append(Spacer(1, 3))
+
+                    if len(similar_sentences) > len(shown):
+                        card_content.append(Paragraph(
+                            f'<font size="8" color="#a0aec0">... and {len(similar_sentences) - len(shown)} more matched sentences.</font>',
+                            small
+                        ))
+
+                yield KeepTogether(card_content[:3])  # keep title+metrics together
+                yield from card_content[3:]
+                yield Spacer(1, 14)
+
+        story.append(match_cards())
 
     # ════════════════════════════════════════════════════════════════════════
     # SECTION 5 — DISCLAIMER
@@ -593,11 +737,11 @@ def _generate_full_analysis_report(
         "indicate plagiarism."
     )
     story.append(Paragraph(disclaimer,
-                            ParagraphStyle("disc", fontSize=7.5, fontName="Helvetica",
+                            _pstyle("disc", fontSize=7.5, fontName="Helvetica",
                                            textColor=TEXT_LIGHT, leading=11, alignment=TA_JUSTIFY)))
 
     # ── Build PDF ────────────────────────────────────────────────────────────
-    doc.build(story, canvasmaker=_NumberedCanvas)
+    doc.build(_FlowableStream(story), canvasmaker=_NumberedCanvas)
     return output_path
 
 
@@ -607,20 +751,13 @@ def _generate_full_analysis_report(
 
 def _get_highlighted_pdf_path(data: Dict[str, Any]) -> Optional[str]:
     """Extract the highlighted PDF file path from the analysis data."""
-    url = data.get("highlighted_pdf_url")
-    if not url:
-        return None
-    try:
-        artifact_name = url.rsplit("/artifacts/", 1)[-1]
-    except (IndexError, ValueError):
-        return None
-    if not artifact_name:
-        return None
-    artifacts_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
-    path = os.path.join(artifacts_dir, os.path.basename(artifact_name))
-    return path if os.path.isfile(path) else None
+    if data.get("highlighted_pdf_path") and os.path.isfile(data["highlighted_pdf_path"]):
+        return data["highlighted_pdf_path"]  # overlay-mode copy written by the server for this report
+    from blob_store import resolve_artifact_url
+    return resolve_artifact_url(data.get("highlighted_pdf_url"))
 
 
+@functools.lru_cache(maxsize=256)
 def _make_source_badge(number: int, badge_color) -> Drawing:
     """Colored rounded badge with white number — matches Turnitin source list style."""
     w, h = 20, 17
@@ -647,7 +784,7 @@ def _generate_source_list_pdf(data: Dict[str, Any], output_path: str) -> str:
     )
     W = A4[0] - 36 * mm
     story = []
-    base = getSampleStyleSheet()
+    base = _sample_styles()
 
     overall_pct = min(100, max(0, round(float(data.get("overall_similarity", 0)))))
     matches = data.get("matches") or []
@@ -660,31 +797,31 @@ def _generate_source_list_pdf(data: Dict[str, Any], output_path: str) -> str:
     # ── Header: Document name + ORIGINALITY REPORT ──
     story.append(Paragraph(
         f"<b>{filename}</b>",
-        ParagraphStyle("fn", fontSize=15, leading=20, textColor=TEXT_DARK,
+        _pstyle("fn", fontSize=15, leading=20, textColor=TEXT_DARK,
                        fontName="Helvetica-Bold"),
     ))
     story.append(Paragraph(
         "<b>ORIGINALITY REPORT</b>",
-        ParagraphStyle("or", fontSize=9, leading=12, textColor=TEXT_MID,
+        _pstyle("or", fontSize=9, leading=12, textColor=TEXT_MID,
                        fontName="Helvetica-Bold", spaceAfter=14),
     ))
 
     # ── Big similarity percentage ──
     story.append(Paragraph(
         f'<font size="42"><b>{overall_pct}%</b></font>',
-        ParagraphStyle("pct", fontSize=42, leading=48, textColor=score_clr,
+        _pstyle("pct", fontSize=42, leading=48, textColor=score_clr,
                        fontName="Helvetica-Bold"),
     ))
     story.append(Paragraph(
         "<b>SIMILARITY INDEX</b>",
-        ParagraphStyle("si", fontSize=9, leading=12, textColor=TEXT_MID,
+        _pstyle("si", fontSize=9, leading=12, textColor=TEXT_MID,
                        fontName="Helvetica-Bold", spaceAfter=18),
     ))
 
     # ── MATCHED SOURCES heading ──
     story.append(Paragraph(
         "<b>MATCHED SOURCES</b>",
-        ParagraphStyle("ms", fontSize=10, leading=13, textColor=TEXT_DARK,
+        _pstyle("ms", fontSize=10, leading=13, textColor=TEXT_DARK,
                        fontName="Helvetica-Bold", spaceAfter=8),
     ))
     story.append(HRFlowable(width=W, thickness=0.8, color=BORDER_CLR, spaceAfter=6))
@@ -693,133 +830,145 @@ def _generate_source_list_pdf(data: Dict[str, Any], output_path: str) -> str:
         story.append(Spacer(1, 10))
         story.append(Paragraph(
             '<font color="#38a169">\u2713 No matching sources found. Document appears original.</font>',
-            ParagraphStyle("ok", fontSize=10, textColor=GREEN_LOW, leading=14),
+            _pstyle("ok", fontSize=10, textColor=GREEN_LOW, leading=14),
         ))
     else:
-        sentence_style_q = ParagraphStyle(
+        sentence_style_q = _pstyle(
             "sq", fontSize=7.5, fontName="Helvetica", textColor=TEXT_DARK,
             leading=10, leftIndent=6,
         )
-        sentence_style_m = ParagraphStyle(
+        sentence_style_m = _pstyle(
             "sm", fontSize=7.5, fontName="Helvetica", textColor=TEXT_MID,
             leading=10, leftIndent=6,
         )
-        sentence_style_s = ParagraphStyle(
+        sentence_style_s = _pstyle(
             "ss_score", fontSize=7, fontName="Helvetica", textColor=TEXT_LIGHT,
             leading=9, leftIndent=6,
         )
 
-        for i, m in enumerate(matches):
-            col = MATCH_COLORS[i % len(MATCH_COLORS)]
-            col_light = colors.Color(
-                min(1, col.red * 0.15 + 0.85),
-                min(1, col.green * 0.15 + 0.85),
-                min(1, col.blue * 0.15 + 0.85),
-            )
-            fname = m.get("file_name") or m.get("filename") or "Unknown"
-            combined = min(100, round(
-                float(m.get("combined_similarity", m.get("semantic_similarity", 0))) * 100
-            ))
-            n_sents = len(m.get("similar_sentences") or [])
-            badge = _make_source_badge(i + 1, col)
-
-            # ── Source header row: badge | name | stats ──
-            name_para = Paragraph(
-                f'<font size="9"><b>{fname}</b></font><br/>'
-                f'<font size="7.5" color="#a0aec0">Repository Document</font>',
-                ParagraphStyle("sn", fontSize=9, leading=12, textColor=TEXT_DARK,
-                               fontName="Helvetica-Bold"),
-            )
-            stats_para = Paragraph(
-                f'<font size="9"><b>{combined}%</b></font> '
-                f'<font size="8" color="#a0aec0">\u2014 {n_sents} sentence{"s" if n_sents != 1 else ""}</font>',
-                ParagraphStyle("st", fontSize=9, alignment=TA_RIGHT, leading=12,
-                               fontName="Helvetica-Bold", textColor=col),
-            )
-            header_row = Table(
-                [[badge, name_para, stats_para]],
-                colWidths=[28, W - 28 - 120, 120],
-            )
-            header_row.setStyle(TableStyle([
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("TOPPADDING", (0, 0), (-1, -1), 7),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
-                ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                ("BACKGROUND", (0, 0), (-1, -1), colors.white),
-            ]))
-
-            card_items = [header_row]
-
-            # ── Matched sentences under this source ──
-            similar_sentences = m.get("similar_sentences") or []
-            shown = similar_sentences[:5]
-            if shown:
-                for j, sm in enumerate(shown):
-                    q = (sm.get("query_sentence") or "").strip()
-                    r = (sm.get("matched_sentence") or "").strip()
-                    s_sem = min(100, round(float(sm.get("semantic_similarity", 0)) * 100))
-                    s_lex = min(100, round(float(sm.get("lexical_similarity", 0)) * 100))
-                    if not q:
-                        continue
-
-                    sent_rows = [
-                        [Paragraph(
-                            f'<font color="{col.hexval()}"><b>Your text:</b></font> '
-                            f'<font color="#2d3748">{q[:200]}</font>',
-                            sentence_style_q,
-                        )],
-                    ]
-                    if r:
+        def source_cards():
+            # Sentence rows are capped at REPORT_MAX_DETAIL_ROWS; the sources after that
+            # are listed in the appendix instead of getting a card.
+            rows_left = REPORT_MAX_DETAIL_ROWS
+            for i, m in enumerate(matches):
+                if rows_left <= 0:
+                    yield from _appendix_flowables(matches, i, W, _pstyle(
+                        "ms", fontSize=10, leading=13, textColor=TEXT_DARK,
+                        fontName="Helvetica-Bold", spaceAfter=8,
+                    ))
+                    return
+                col = MATCH_COLORS[i % len(MATCH_COLORS)]
+                col_light = colors.Color(
+                    min(1, col.red * 0.15 + 0.85),
+                    min(1, col.green * 0.15 + 0.85),
+                    min(1, col.blue * 0.15 + 0.85),
+                )
+                fname = m.get("file_name") or m.get("filename") or "Unknown"
+                combined = min(100, round(
+                    float(m.get("combined_similarity", m.get("semantic_similarity", 0))) * 100
+                ))
+                n_sents = len(m.get("similar_sentences") or [])
+                badge = _make_source_badge(i + 1, col)
+
+                # ── Source header row: badge | name | stats ──
+                name_para = Paragraph(
+                    f'<font size="9"><b>{fname}</b></font><br/>'
+                    f'<font size="7.5" color="#a0aec0">Repository Document</font>',
+                    _pstyle("sn", fontSize=9, leading=12, textColor=TEXT_DARK,
+                                   fontName="Helvetica-Bold"),
+                )
+                stats_para = Paragraph(
+                    f'<font size="9"><b>{combined}%</b></font> '
+                    f'<font size="8" color="#a0aec0">\u2014 {n_sents} sentence{"s" if n_sents != 1 else ""}</font>',
+                    _pstyle("st", fontSize=9, alignment=TA_RIGHT, leading=12,
+                                   fontName="Helvetica-Bold", textColor=col),
+                )
+                header_row = Table(
+                    [[badge, name_para, stats_para]],
+                    colWidths=[28, W - 28 - 120, 120],
+                )
+                header_row.setStyle(TableStyle([
+                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                    ("TOPPADDING", (0, 0), (-1, -1), 7),
+                    ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+                    ("LEFTPADDING", (0, 0), (-1, -1), 4),
+                    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+                    ("BACKGROUND", (0, 0), (-1, -1), colors.white),
+                ]))
+
+                card_items = [header_row]
+
+                # ── Matched sentences under this source ──
+                similar_sentences = m.get("similar_sentences") or []
+                shown = similar_sentences[:min(5, rows_left)]
+                rows_left -= max(1, len(shown))
+                if shown:
+                    for j, sm in enumerate(shown):
+                        q = (sm.get("query_sentence") or "").strip()
+                        r = (sm.get("matched_sentence") or "").strip()
+                        s_sem = min(100, round(float(sm.get("semantic_similarity", 0)) * 100))
+                        s_lex = min(100, round(float(sm.get("lexical_similarity", 0)) * 100))
+                        if not q:
+                            continue
+
+                        sent_rows = [
+                            [Paragraph(
+                                f'<font color="{col.hexval()}"><b>Your text:</b></font> '
+                                f'<font color="#2d3748">{q[:200]}</font>',
+                                sentence_style_q,
+                            )],
+                        ]
+                        if r:
+                            sent_rows.append([Paragraph(
+                                f'<font color="#718096"><b>Matched:</b></font> '
+                                f'<font color="#4a5568">{r[:200]}</font>',
+                                sentence_style_m,
+                            )])
                         sent_rows.append([Paragraph(
-                            f'<font color="#718096"><b>Matched:</b></font> '
-                            f'<font color="#4a5568">{r[:200]}</font>',
-                            sentence_style_m,
+                            f'Semantic: {s_sem}%  \u2022  Lexical: {s_lex}%',
+                            sentence_style_s,
                         )])
-                    sent_rows.append([Paragraph(
-                        f'Semantic: {s_sem}%  \u2022  Lexical: {s_lex}%',
-                        sentence_style_s,
-                    )])
-
-                    sent_table = Table(sent_rows, colWidths=[W - 36])
-                    sent_table.setStyle(TableStyle([
-                        ("BACKGROUND", (0, 0), (-1, -1), col_light),
-                        ("TOPPADDING", (0, 0), (-1, -1), 3),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-                        ("LINEBEFORE", (0, 0), (0, -1), 2.5, col),
-                    ]))
-
-                    indent_table = Table(
-                        [[Paragraph("", base["Normal"]), sent_table]],
-                        colWidths=[32, W - 32],
-                    )
-                    indent_table.setStyle(TableStyle([
-                        ("TOPPADDING", (0, 0), (-1, -1), 1),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 0),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
-                    ]))
-                    card_items.append(indent_table)
-
-                remaining = len(similar_sentences) - 5
-                if remaining > 0:
-                    card_items.append(Table(
-                        [[Paragraph("", base["Normal"]), Paragraph(
-                            f'<font size="7" color="#a0aec0">... and {remaining} more matched sentences</font>',
-                            base["Normal"],
-                        )]],
-                        colWidths=[32, W - 32],
-                    ))
 
-            card_items.append(
-                HRFlowable(width=W, thickness=0.3, color=BORDER_CLR, spaceBefore=4, spaceAfter=4)
-            )
+                        sent_table = Table(sent_rows, colWidths=[W - 36])
+                        sent_table.setStyle(TableStyle([
+                            ("BACKGROUND", (0, 0), (-1, -1), col_light),
+                            ("TOPPADDING", (0, 0), (-1, -1), 3),
+                            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+                            ("LEFTPADDING", (0, 0), (-1, -1), 8),
+                            ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+                            ("LINEBEFORE", (0, 0), (0, -1), 2.5, col),
+                        ]))
+
+                        indent_table = Table(
+                            [[Paragraph("", base["Normal"]), sent_table]],
+                            colWidths=[32, W - 32],
+                        )
+                        indent_table.setStyle(TableStyle([
+                            ("TOPPADDING", (0, 0), (-1, -1), 1),
+                            ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
+                            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                            ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+                        ]))
+                        card_items.append(indent_table)
+
+                    remaining = len(similar_sentences) - len(shown)
+                    if remaining > 0:
+                        card_items.append(Table(
+                            [[Paragraph("", base["Normal"]), Paragraph(
+                                f'<font size="7" color="#a0aec0">... and {remaining} more matched sentences</font>',
+                                base["Normal"],
+                            )]],
+                            colWidths=[32, W - 32],
+                        ))
+
+                card_items.append(
+                    HRFlowable(width=W, thickness=0.3, color=BORDER_CLR, spaceBefore=4, spaceAfter=4)
+                )
+
+                yield KeepTogether(card_items[:2])
+                yield from card_items[2:]
 
-            story.append(KeepTogether(card_items[:2]))
-            for part in card_items[2:]:
-                story.append(part)
+        story.append(source_cards())
 
     # ── Disclaimer ──
     story.append(Spacer(1, 18))
@@ -828,11 +977,11 @@ def _generate_source_list_pdf(data: Dict[str, Any], output_path: str) -> str:
         "This report was generated by NSU PlagiChecker using AI-powered similarity analysis. "
         "Results are based on documents in the repository. A high similarity score does not "
         "automatically indicate plagiarism.",
-        ParagraphStyle("disc", fontSize=7.5, fontName="Helvetica",
+        _pstyle("disc", fontSize=7.5, fontName="Helvetica",
                        textColor=TEXT_LIGHT, leading=11, alignment=TA_JUSTIFY),
     ))
 
-    doc_builder.build(story, canvasmaker=_NumberedCanvas)
+    doc_builder.build(_FlowableStream(story), canvasmaker=_NumberedCanvas)
     return output_path
 
 
@@ -844,18 +993,7 @@ def generate_comparison_report(data: Dict[str, Any], output_path: str) -> str:
     if not REPORTLAB_AVAILABLE:
         raise ImportError("reportlab is required. pip install reportlab")
 
-    highlighted_url = data.get("highlighted_pdf_url")
-    highlighted_path = None
-    if highlighted_url:
-        try:
-            artifact_name = highlighted_url.rsplit("/artifacts/", 1)[-1]
-        except (IndexError, ValueError):
-            artifact_name = None
-        if artifact_name:
-            artifacts_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
-            candidate = os.path.join(artifacts_dir, os.path.basename(artifact_name))
-            if os.path.isfile(candidate):
-                highlighted_path = candidate
+    highlighted_path = _get_highlighted_pdf_path(data)
 
     cover_path = output_path + ".cover.tmp.pdf"
     try:
@@ -897,7 +1035,7 @@ def _generate_comparison_cover(data: Dict[str, Any], output_path: str) -> str:
     )
     W = A4[0] - 36 * mm
     story = []
-    base = getSampleStyleSheet()
+    base = _sample_styles()
 
     similarity = min(100, max(0, round(float(data.get("overall_similarity", 0)))))
     extra_pct = min(100, max(0, round(float(data.get("extra_percentage", 0)))))
@@ -940,7 +1078,7 @@ def _generate_comparison_cover(data: Dict[str, Any], output_path: str) -> str:
     ]
 
     def _cell(txt, bold=False):
-        style = ParagraphStyle(
+        style = _pstyle(
             'mc', fontSize=9,
             fontName="Helvetica-Bold" if bold else "Helvetica",
             textColor=TEXT_DARK if bold else TEXT_MID, leading=12,
@@ -964,7 +1102,7 @@ def _generate_comparison_cover(data: Dict[str, Any], output_path: str) -> str:
     story.append(Spacer(1, 18))
 
     # Similarity gauge
-    story.append(Paragraph("Similarity Overview", ParagraphStyle(
+    story.append(Paragraph("Similarity Overview", _pstyle(
         "h2", fontSize=13, fontName="Helvetica-Bold", textColor=TEXT_DARK,
         spaceBefore=10, spaceAfter=4, leading=16,
     )))
@@ -1012,7 +1150,7 @@ def _generate_comparison_cover(data: Dict[str, Any], output_path: str) -> str:
     # Extra text snippets
     snippets = data.get("extra_snippets") or []
     if snippets:
-        story.append(Paragraph("Extra Text Found in Suspect Document", ParagraphStyle(
+        story.append(Paragraph("Extra Text Found in Suspect Document", _pstyle(
             "h2s", fontSize=13, fontName="Helvetica-Bold", textColor=TEXT_DARK,
             spaceBefore=10, spaceAfter=4, leading=16,
         )))
@@ -1024,7 +1162,7 @@ def _generate_comparison_cover(data: Dict[str, Any], output_path: str) -> str:
         ))
         story.append(Spacer(1, 6))
 
-        snippet_style = ParagraphStyle(
+        snippet_style = _pstyle(
             "snip", fontSize=8, fontName="Helvetica", textColor=TEXT_DARK,
             leading=11, leftIndent=8, backColor=colors.HexColor("#fffff0"),
             borderPadding=4, borderColor=colors.HexColor("#fde68a"),
@@ -1051,7 +1189,7 @@ def _generate_comparison_cover(data: Dict[str, Any], output_path: str) -> str:
         "This report was generated by NSU PlagiChecker. It compares two documents word-by-word "
         "and highlights extra text found in the suspect document. Results should be reviewed "
         "by an instructor before any action is taken.",
-        ParagraphStyle("disc", fontSize=7.5, fontName="Helvetica",
+        _pstyle("disc", fontSize=7.5, fontName="Helvetica",
                        textColor=TEXT_LIGHT, leading=11, alignment=TA_JUSTIFY),
     ))
 
@@ -1090,3 +1228,32 @@ def generate_turnitin_report(data: Dict[str, Any], output_path: str) -> str:
         return output_path
 
     return _generate_full_analysis_report(data, output_path)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# Report cache and rendering pool
+# ════════════════════════════════════════════════════════════════════════════
+
+_REPORT_BUILDERS = {
+    "similarity": generate_turnitin_report,
+    "comparison": generate_comparison_report,
+}
+
+
+def render_report_cached(kind: str, data: Dict[str, Any], key: str) -> str:
+    """Render a report into the cache (unless it is already there) and return its path.
+    Runs in a report worker process or, as a fallback, a server thread."""
+    cached = report_cache.get(key)
+    if cached:
+        return cached
+    return report_cache.put(key, lambda tmp_path: _REPORT_BUILDERS[kind](data, tmp_path))
+
+
+def get_report_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared report worker pool, or None when REPORT_WORKERS is 0."""
+    return process_pools.get_pool("report", REPORT_WORKERS)
+
+
+def reset_report_pool() -> None:
+    """Drop a broken pool so the next get_report_pool() starts a fresh one."""
+    process_pools.reset_pool("report")
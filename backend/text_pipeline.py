@@ -10,9 +10,9 @@ import re
 import time
 import unicodedata
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 
 # PDF extraction
 try:
@@ -58,6 +58,8 @@ class DocumentMetadata:
     file_type: str  # 'pdf' or 'pptx'
     num_pages_or_slides: int = 0
     raw_text_length: int = 0
+    # PyMuPDF pages/blocks/words (pdf_extraction.PdfExtraction) for reuse by highlighting; not serialized.
+    extraction: Optional[Any] = field(default=None, repr=False, compare=False)
 
     def to_dict(self) -> dict:
         return {
@@ -76,59 +78,73 @@ class DocumentMetadata:
 # PDF TEXT EXTRACTION
 # =============================================================================
 
-def extract_text_from_pdf_pypdf2(pdf_path: str) -> List[Tuple[int, str]]:
+def extract_text_from_pdf_pypdf2(pdf_path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Tuple[int, str]]:
     """Extract text page by page using PyPDF2. Returns list of (page_number_1based, page_text)."""
     if PyPDF2 is None:
         raise ImportError("PyPDF2 is required. Install with: pip install PyPDF2")
     result = []
     with open(pdf_path, 'rb') as f:
         reader = PyPDF2.PdfReader(f)
+        total = len(reader.pages)
         for i, page in enumerate(reader.pages):
             try:
                 text = page.extract_text() or ""
                 result.append((i + 1, text))
             except Exception as e:
                 result.append((i + 1, f"[Error extracting page: {e}]"))
+            if progress_callback:
+                progress_callback(i + 1, total)
     return result
 
 
-def extract_text_from_pdf_pdfplumber(pdf_path: str) -> List[Tuple[int, str]]:
+def extract_text_from_pdf_pdfplumber(pdf_path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Tuple[int, str]]:
     """Extract text page by page using pdfplumber. Returns list of (page_number_1based, page_text)."""
     if pdfplumber is None:
         raise ImportError("pdfplumber is required. Install with: pip install pdfplumber")
     result = []
     with pdfplumber.open(pdf_path) as pdf:
+        total = len(pdf.pages)
         for i, page in enumerate(pdf.pages):
             try:
                 text = page.extract_text() or ""
                 result.append((i + 1, text))
             except Exception as e:
                 result.append((i + 1, f"[Error extracting page: {e}]"))
+            if progress_callback:
+                progress_callback(i + 1, total)
     return result
 
 
-def extract_text_from_pdf_pymupdf(pdf_path: str) -> List[Tuple[int, str]]:
+def extract_text_from_pdf_pymupdf(pdf_path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Tuple[int, str]]:
     """Extract text page by page using PyMuPDF. Returns list of (page_number_1based, page_text)."""
     if fitz is None:
         raise ImportError("PyMuPDF is required. Install with: pip install pymupdf")
     result = []
     with fitz.open(pdf_path) as pdf:
+        total = len(pdf)
         for i, page in enumerate(pdf):
             try:
                 text = page.get_text("text", sort=True) or ""
                 result.append((i + 1, text))
             except Exception as e:
                 result.append((i + 1, f"[Error extracting page: {e}]"))
+            if progress_callback:
+                progress_callback(i + 1, total)
     return result
 
 
-def extract_text_from_pdf(pdf_path: str, method: str = "pdfplumber") -> List[Tuple[int, str]]:
-    """Extract text from PDF page by page. method: 'pypdf2', 'pdfplumber', or 'pymupdf'."""
+def extract_text_from_pdf(
+    pdf_path: str,
+    method: str = "pdfplumber",
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> List[Tuple[int, str]]:
+    """Extract text from PDF page by page. method: 'pypdf2', 'pdfplumber', or 'pymupdf'.
+    progress_callback(pages_done, total_pages) is called after each page."""
     if method == "pypdf2" and PyPDF2:
-        return extract_text_from_pdf_pypdf2(pdf_path)
+        return extract_text_from_pdf_pypdf2(pdf_path, progress_callback)
     if method == "pymupdf" and fitz:
-        return extract_text_from_pdf_pymupdf(pdf_path)
-    return extract_text_from_pdf_pdfplumber(pdf_path)
+        return extract_text_from_pdf_pymupdf(pdf_path, progress_callback)
+    return extract_text_from_pdf_pdfplumber(pdf_path, progress_callback)
 
 
 def pdf_pages_to_full_text(pages: List[Tuple[int, str]]) -> str:
@@ -140,18 +156,21 @@ def pdf_pages_to_full_text(pages: List[Tuple[int, str]]) -> str:
 # PPTX TEXT EXTRACTION
 # =============================================================================
 
-def extract_text_from_pptx(pptx_path: str) -> List[Tuple[int, str]]:
+def extract_text_from_pptx(pptx_path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Tuple[int, str]]:
     """Extract text from PPTX slide by slide. Returns list of (slide_number_1based, slide_text)."""
     if Presentation is None:
         raise ImportError("python-pptx is required. Install with: pip install python-pptx")
     result = []
     prs = Presentation(pptx_path)
+    total = len(prs.slides)
     for i, slide in enumerate(prs.slides):
         parts = []
         for shape in slide.shapes:
             if hasattr(shape, "text") and shape.text:
                 parts.append(shape.text.strip())
         result.append((i + 1, "\n".join(parts)))
+        if progress_callback:
+            progress_callback(i + 1, total)
     return result
 
 
@@ -166,7 +185,8 @@ def pptx_slides_to_full_text(slides: List[Tuple[int, str]]) -> str:
 
 def extract_text_from_file(
     file_path: str,
-    pdf_method: str = "pdfplumber"
+    pdf_method: str = "pdfplumber",
+    progress_callback: Optional[Callable[[int, int], None]] = None,
 ) -> Tuple[str, str, int]:
     """Extract text from PDF or PPTX. Returns (full_text, file_type, num_pages_or_slides)."""
     path = Path(file_path)
@@ -174,13 +194,13 @@ def extract_text_from_file(
         raise FileNotFoundError(f"File not found: {file_path}")
     ext = path.suffix.lower()
     if ext == ".pdf":
-        pages = extract_text_from_pdf(file_path, method=pdf_method)
+        pages = extract_text_from_pdf(file_path, method=pdf_method, progress_callback=progress_callback)
         full_text = pdf_pages_to_full_text(pages)
         return full_text, "pdf", len(pages)
     elif ext in (".pptx", ".ppt"):
         if ext == ".ppt":
             raise ValueError("Only .pptx is supported; .ppt (old format) is not supported.")
-        slides = extract_text_from_pptx(file_path)
+        slides = extract_text_from_pptx(file_path, progress_callback=progress_callback)
         full_text = pptx_slides_to_full_text(slides)
         return full_text, "pptx", len(slides)
     else:
@@ -723,16 +743,19 @@ def process_document(
     max_chunk_size: int = 200,
     overlap: int = 20,
     document_id: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
 ) -> Tuple[List[str], DocumentMetadata, str]:
     """
     Full pipeline: extract, clean, chunk, build metadata.
     Returns (chunks, DocumentMetadata, cleaned_full_text).
+    progress_callback(pages_done, total_pages) reports extraction progress.
 
     For PDFs with 'words' strategy, page-aware chunking is used so that
     large PDFs (e.g. 300 pages) produce a proportionate number of chunks
     instead of collapsing into 10-15.
     """
     start_time = time.time()
+    extraction = None
     doc_id = document_id or str(uuid.uuid4())[:8]
     file_path = os.path.abspath(file_path)
     file_name = os.path.basename(file_path)
@@ -746,7 +769,13 @@ def process_document(
         # grouped into chunks of 2 complete sentences.  This eliminates the
         # "chunk boundary bleed" bug where the tail of one section bled into the
         # opening of the next section inside the same chunk.
-        pages = extract_text_from_pdf(file_path, method=pdf_method)
+        if pdf_method == "pymupdf" and fitz:
+            # One pass yields the page text plus the blocks and words the highlighter needs.
+            from pdf_extraction import extract_pdf
+            extraction = extract_pdf(file_path, progress_callback=progress_callback)
+            pages = extraction.page_texts()
+        else:
+            pages = extract_text_from_pdf(file_path, method=pdf_method, progress_callback=progress_callback)
         num_pages = len(pages)
         file_type = "pdf"
         full_text = pdf_pages_to_full_text(pages)
@@ -783,7 +812,9 @@ def process_document(
 
     else:
         # Original approach for PPTX or non-words strategies
-        full_text, file_type, num_pages = extract_text_from_file(file_path, pdf_method=pdf_method)
+        full_text, file_type, num_pages = extract_text_from_file(
+            file_path, pdf_method=pdf_method, progress_callback=progress_callback
+        )
         raw_length = len(full_text)
         cleaned = apply_file_processing_layer(full_text, lowercase=False, remove_stopwords_opt=False)
 
@@ -814,5 +845,6 @@ def process_document(
         file_type=file_type,
         num_pages_or_slides=num_pages,
         raw_text_length=raw_length,
+        extraction=extraction,
     )
     return chunks, meta, cleaned
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Word-level diff for document comparison that stays fast on long documents.
+
+difflib.SequenceMatcher(autojunk=False) over two theses' word lists is close to quadratic.
+This module diffs integer word ids instead:
+
+  1. Trim the common prefix and suffix.
+  2. Patience step: words that occur exactly once on each side are anchors; the longest run
+     of anchors in the same order on both sides (LIS) splits the range into smaller gaps,
+     which are diffed the same way.
+  3. Gaps without unique anchors go to Myers' O(ND) diff. A gap needing more than
+     MYERS_MAX_EDITS edits is treated as rewritten, which keeps the worst case bounded.
+
+Only the matched positions of the second sequence are needed, so the diff returns those.
+"""
+import os
+from bisect import bisect_left
+from typing import Dict, Hashable, List, Sequence, Set, Tuple
+
+MYERS_MAX_EDITS = int(os.getenv("MYERS_MAX_EDITS", "2000"))
+
+
+def to_word_ids(a: Sequence[Hashable], b: Sequence[Hashable]) -> Tuple[List[int], List[int]]:
+    """Map the words of both sequences to shared integer ids."""
+    ids: Dict[Hashable, int] = {}
+    a_ids = [ids.setdefault(w, len(ids)) for w in a]
+    b_ids = [ids.setdefault(w, len(ids)) for w in b]
+    return a_ids, b_ids
+
+
+def _unique_anchors(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int) -> List[Tuple[int, int]]:
+    """(i, j) pairs of tokens unique in both ranges, forming the longest in-order chain."""
+    in_a: Dict[int, int] = {}
+    for i in range(a_lo, a_hi):
+        tok = a[i]
+        in_a[tok] = -1 if tok in in_a else i
+    in_b: Dict[int, int] = {}
+    for j in range(b_lo, b_hi):
+        tok = b[j]
+        if tok in in_a:
+            in_b[tok] = -1 if tok in in_b else j
+    pairs = sorted((j, in_a[tok]) for tok, j in in_b.items() if j >= 0 and in_a[tok] >= 0)
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence of the a-positions, taken in b order (patience sorting).
+    tails: List[int] = []  # a-position ending the best chain of each length
+    tail_idx: List[int] = []
+    prev: List[int] = [-1] * len(pairs)
+    for k, (_, i) in enumerate(pairs):
+        pos = bisect_left(tails, i)
+        if pos == len(tails):
+            tails.append(i)
+            tail_idx.append(k)
+        else:
+            tails[pos] = i
+            tail_idx[pos] = k
+        prev[k] = tail_idx[pos - 1] if pos else -1
+    chain = []
+    k = tail_idx[-1]
+    while k >= 0:
+        j, i = pairs[k]
+        chain.append((i, j))
+        k = prev[k]
+    chain.reverse()
+    return chain
+
+
+def _myers_matches(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int, matched: Set[int]) -> bool:
+    """Add the b positions of a shortest edit script's matches to `matched`.
+    Returns False (adding nothing) when more than MYERS_MAX_EDITS edits would be needed."""
+    n, m = a_hi - a_lo, b_hi - b_lo
+    max_d = min(n + m, MYERS_MAX_EDITS)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace: List[List[int]] = []
+    for d in range(max_d + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                _myers_backtrack(trace, d, n, m, offset, b_lo, matched)
+                return True
+    return False
+
+
+def _myers_backtrack(trace: List[List[int]], d_end: int, n: int, m: int, offset: int,
+                     b_lo: int, matched: Set[int]) -> None:
+    x, y = n, m
+    for d in range(d_end, -1, -1):
+        v = trace[d]  # furthest x per diagonal before step d
+        k = x - y
+        if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[offset + prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matched.add(b_lo + y)
+        x, y = prev_x, prev_y
+
+
+def matched_positions(a: List[int], b: List[int]) -> Set[int]:
+    """Positions in b that are aligned with an equal word of a."""
+    matched: Set[int] = set()
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        # Common prefix and suffix.
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            matched.add(b_lo)
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            matched.add(b_hi - 1)
+            a_hi -= 1
+            b_hi -= 1
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        anchors = _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi)
+        if anchors:
+            prev_i, prev_j = a_lo, b_lo
+            for i, j in anchors:
+                matched.add(j)
+                stack.append((prev_i, i, prev_j, j))
+                prev_i, prev_j = i + 1, j + 1
+            stack.append((prev_i, a_hi, prev_j, b_hi))
+            continue
+        _myers_matches(a, a_lo, a_hi, b, b_lo, b_hi, matched)
+    return matched
+
+
+def extra_indices(source: Sequence[Hashable], suspect: Sequence[Hashable]) -> List[int]:
+    """Indices of suspect words not aligned with the source (inserted or replaced)."""
+    a, b = to_word_ids(source, suspect)
+    matched = matched_positions(a, b)
+    return [j for j in range(len(b)) if j not in matched]
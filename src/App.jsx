@@ -17,13 +17,17 @@ import AnalyzingProgress from './components/AnalyzingProgress';
 import { 
   LogOut, ShieldCheck, GraduationCap, User, Database, FolderOpen, Upload, 
   ArrowRightLeft, AlertTriangle, CheckCircle, GripHorizontal, FileSearch, 
-  Layers, ChevronRight, FileText, Trash2
+  Layers, ChevronRight, FileText, Trash2, Loader2
 } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 
 // Empty string = relative URL (works from any IP/network automatically)
 const API_BASE = import.meta.env.VITE_API_URL || '';
 
+// Slim placeholder results (localStorage or /jobs/saved summaries) have no report data yet.
+// Treats both old "[CACHED]" strings and {_cached:true} objects.
+const isCachedResult = (r) => r === '[CACHED]' || (r && typeof r === 'object' && r._cached);
+
 // The main plagiarism tool view (after auth)
 function MainApp() {
   const { user, logout } = useAuth();
@@ -164,67 +168,106 @@ function MainApp() {
     }
   }, [storageKey, user?.role]);
 
-  // Load saved results from DB on login (persists across logout)
-  useEffect(() => {
-    if (!user?.id || !user?.token) return;
-    axios.get(`${API_BASE}/jobs/saved?user_id=${user.id}`, {
-      headers: { Authorization: `Bearer ${user.token}` }
-    }).then(res => {
-      const saved = res.data?.results || [];
-      if (saved.length === 0) return;
-      setCheckQueue(q => {
-        const dbByJobId = new Map(saved.map(j => [j.job_id, j]));
-        const existingJobIds = new Set(q.map(i => i.jobId).filter(Boolean));
-
-        const makeDbItem = (j) => {
-          const fileName = j.result?.file_name || j.result?.filename || '';
-          const pathParts = fileName.split(/[/\\]/);
-          const hasFolder = pathParts.length > 1;
-          const folderName = hasFolder ? pathParts.slice(0, -1).join('/') : null;
-          const folderId = folderName ? `db-folder-${folderName}` : null;
-          return {
-            id: crypto.randomUUID(),
-            file: null,
-            directText: j.result?.direct_text ?? null,
-            status: 'completed',
-            jobId: j.job_id,
-            result: j.result,
-            error: null,
-            savedFromDb: true,
-            savedAt: j.created_at,
-            folderId,
-            folderName,
-          };
+  // Load saved result summaries from DB on login (persists across logout).
+  // Only id/filename/score come down here; the full result is fetched when a report is opened.
+  // The first page loads on login; older pages load from the "Load more" button via savedCursor.
+  const [savedCursor, setSavedCursor] = useState(null);
+  const [loadingSaved, setLoadingSaved] = useState(false);
+
+  const mergeSavedPage = (saved) => {
+    if (saved.length === 0) return;
+    setCheckQueue(q => {
+      const dbByJobId = new Map(saved.map(j => [j.job_id, j]));
+      const existingJobIds = new Set(q.map(i => i.jobId).filter(Boolean));
+
+      const makeDbItem = (j) => {
+        const fileName = j.filename || '';
+        const pathParts = fileName.split(/[/\\]/);
+        const hasFolder = pathParts.length > 1;
+        const folderName = hasFolder ? pathParts.slice(0, -1).join('/') : null;
+        const folderId = folderName ? `db-folder-${folderName}` : null;
+        return {
+          id: crypto.randomUUID(),
+          file: null,
+          directText: null,
+          status: 'completed',
+          jobId: j.job_id,
+          result: { _cached: true, filename: j.filename, overall_similarity: j.overall_similarity, warning: j.warning },
+          error: null,
+          savedFromDb: true,
+          savedAt: j.created_at,
+          folderId,
+          folderName,
         };
+      };
 
-        // Upgrade localStorage slim-result items to full DB data so reports are viewable.
-        // Matches on jobId; treats both old "[CACHED]" strings and new {_cached:true} objects.
-        const isCached = (r) => r === '[CACHED]' || (r && typeof r === 'object' && r._cached);
-        const upgraded = q.map(item => {
-          if (item.jobId && dbByJobId.has(item.jobId) && !item.savedFromDb && isCached(item.result)) {
-            const j = dbByJobId.get(item.jobId);
-            return { ...item, result: j.result, savedFromDb: true, savedAt: j.created_at };
-          }
-          return item;
-        });
-
-        // Add DB items that weren't in localStorage at all
-        const newItems = saved
-          .filter(j => !existingJobIds.has(j.job_id))
-          .map(makeDbItem);
-
-        if (newItems.length === 0 && upgraded === q) return q;
-
-        const sorted = [...newItems].sort(
-          (a, b) => new Date(a.savedAt || 0) - new Date(b.savedAt || 0)
-        );
-        const active = upgraded.filter(i => !i.savedFromDb);
-        const existingDb = upgraded.filter(i => i.savedFromDb);
-        return [...active, ...sorted, ...existingDb];
+      // Mark localStorage slim-result items that the DB has, so opening them loads the detail.
+      const upgraded = q.map(item => {
+        if (item.jobId && dbByJobId.has(item.jobId) && !item.savedFromDb && isCachedResult(item.result)) {
+          return { ...item, savedFromDb: true, savedAt: dbByJobId.get(item.jobId).created_at };
+        }
+        return item;
       });
+
+      // Add DB items that weren't in localStorage or an earlier page
+      const newItems = saved
+        .filter(j => !existingJobIds.has(j.job_id))
+        .map(makeDbItem);
+
+      if (newItems.length === 0 && upgraded.every((item, idx) => item === q[idx])) return q;
+
+      const active = upgraded.filter(i => !i.savedFromDb);
+      const dbItems = [...newItems, ...upgraded.filter(i => i.savedFromDb)].sort(
+        (a, b) => new Date(a.savedAt || 0) - new Date(b.savedAt || 0)
+      );
+      return [...active, ...dbItems];
+    });
+  };
+
+  const fetchSavedPage = (cursor) => axios.get(`${API_BASE}/jobs/saved`, {
+    headers: { Authorization: `Bearer ${user.token}` },
+    params: { user_id: user.id, ...(cursor ? { cursor } : {}) },
+  });
+
+  useEffect(() => {
+    setSavedCursor(null);
+    if (!user?.id || !user?.token) return;
+    let cancelled = false;
+    fetchSavedPage(null).then(res => {
+      if (cancelled) return;
+      setSavedCursor(res.data?.next_cursor || null);
+      mergeSavedPage(res.data?.results || []);
     }).catch(() => {});
+    return () => { cancelled = true; };
   }, [user?.id, user?.token]);
 
+  const loadMoreSaved = () => {
+    if (!savedCursor || loadingSaved || !user?.id || !user?.token) return;
+    setLoadingSaved(true);
+    fetchSavedPage(savedCursor).then(res => {
+      setSavedCursor(res.data?.next_cursor || null);
+      mergeSavedPage(res.data?.results || []);
+    }).catch(() => {}).finally(() => setLoadingSaved(false));
+  };
+
+  // Fetch the full saved result on demand when a summary-only item is opened.
+  useEffect(() => {
+    if (!viewingResultId || !user?.id || !user?.token) return;
+    const item = checkQueue.find(i => i.id === viewingResultId);
+    if (!item?.jobId || !isCachedResult(item.result)) return;
+    let cancelled = false;
+    axios.get(`${API_BASE}/jobs/saved/${item.jobId}`, {
+      headers: { Authorization: `Bearer ${user.token}` },
+      params: { user_id: user.id },
+    }).then(res => {
+      if (cancelled) return;
+      setCheckQueue(q => q.map(i => (i.id === item.id ? { ...i, result: res.data, savedFromDb: true } : i)));
+    }).catch(() => {
+      if (!cancelled) setViewingResultId(null);
+    });
+    return () => { cancelled = true; };
+  }, [viewingResultId, user?.id, user?.token]);
+
   useEffect(() => {
     if (!stateHydrated || !storageKey) return;
     try {
@@ -235,7 +278,12 @@ function MainApp() {
         ...q,
         file: null,
         result: q.result && typeof q.result === 'object'
-          ? { _cached: true, filename: q.result.filename || q.result.file_name || null }
+          ? {
+              _cached: true,
+              filename: q.result.filename || q.result.file_name || null,
+              overall_similarity: q.result.overall_similarity ?? null,
+              warning: q.result.warning || null,
+            }
           : (q.result || null),
       }));
 
@@ -328,7 +376,10 @@ function MainApp() {
       console.log('[PlagiChecker] Submitting to', `${API_BASE || window.location.origin}/analyze`, { repo_type: repoTypeValue, role: user?.role, add_to_repo, has_file: !!file, has_text: !!directText });
 
       const response = await axios.post(`${API_BASE}/analyze`, formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
+        headers: {
+          'Content-Type': 'multipart/form-data',
+          ...(user?.token ? { Authorization: `Bearer ${user.token}` } : {}),
+        },
         timeout: 0, // no client-side timeout — huge PDFs can take minutes to upload over WiFi
       });
       setCheckQueue(q => q.map(item => item.id === id ? { ...item, jobId: response.data.job_id } : item));
@@ -338,6 +389,10 @@ function MainApp() {
       if (error.response) {
         // Server responded with error
         msg = error.response.data?.detail || `Server error ${error.response.status}`;
+        const retryAfter = error.response.headers?.['retry-after'];
+        if ((error.response.status === 429 || error.response.status === 503) && retryAfter) {
+          msg = `${msg} Try again in about ${retryAfter}s.`;
+        }
       } else if (error.request) {
         // Request sent but no response — network/CORS/firewall
         msg = `Cannot reach server. Check WiFi connection and make sure you opened the correct http://<server-ip>:8000 link. (${error.message})`;
@@ -498,6 +553,10 @@ function MainApp() {
       let msg;
       if (error.response) {
         msg = error.response.data?.detail || `Server error ${error.response.status}`;
+        const retryAfter = error.response.headers?.['retry-after'];
+        if ((error.response.status === 429 || error.response.status === 503) && retryAfter) {
+          msg = `${msg} Try again in about ${retryAfter}s.`;
+        }
       } else if (error.request) {
         msg = `Cannot reach server. Check WiFi and the http://<server-ip>:8000 link. (${error.message})`;
       } else {
@@ -642,6 +701,14 @@ function MainApp() {
           {!restoring && viewingResultId && (() => {
             const viewItem = checkQueue.find(i => i.id === viewingResultId);
             const viewData = viewItem?.result;
+            // Summary-only result: the detail is being fetched (see effect above).
+            if (viewItem?.jobId && isCachedResult(viewData) && typeof viewData === 'object') {
+              return (
+                <div className="flex items-center justify-center w-full py-24">
+                  <Loader2 className="w-8 h-8 text-brand-600 animate-spin" />
+                </div>
+              );
+            }
             // Guard: only render if we have a real result object (not "[CACHED]" or null)
             if (!viewData || typeof viewData !== 'object') {
               // Auto-clear stale viewingResultId on next tick
@@ -1161,6 +1228,15 @@ function MainApp() {
                         </motion.div>
                         );
                       })}
+                      {savedCursor && (
+                        <div className="flex justify-center pt-2">
+                          <button onClick={loadMoreSaved} disabled={loadingSaved}
+                            className="px-6 py-3 text-sm font-bold text-slate-600 bg-white hover:bg-slate-50 border border-slate-200 rounded-2xl shadow-sm transition-all disabled:opacity-50 flex items-center gap-2">
+                            {loadingSaved && <Loader2 className="w-4 h-4 animate-spin" />}
+                            {loadingSaved ? 'Loading…' : 'Load more saved results'}
+                          </button>
+                        </div>
+                      )}
                     </div>
                   ) : (
                     <div className="w-full text-center p-20 bg-white rounded-[3rem] border border-slate-200 shadow-sm mt-8 relative overflow-hidden">
@@ -123,7 +123,10 @@ const AdminDashboard = () => {
             
             try {
                 const response = await axios.post('/analyze', formData, {
-                    headers: { 'Content-Type': 'multipart/form-data' },
+                    headers: {
+                        'Content-Type': 'multipart/form-data',
+                        ...(user?.token ? { Authorization: `Bearer ${user.token}` } : {}),
+                    },
                 });
                 setAdminQueue(q => q.map(i => i.id === item.id ? { ...i, jobId: response.data.job_id } : i));
             } catch (error) {
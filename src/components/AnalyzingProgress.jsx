@@ -11,6 +11,8 @@ const AnalyzingProgress = ({ jobId, onComplete, onError, title = "Analyzing Docu
     const esRef = useRef(null);
     const doneRef = useRef(false);
     const reconnectTimerRef = useRef(null);
+    // Sequence id of the last event seen, so a reconnect resumes instead of replaying from the start.
+    const lastEventIdRef = useRef(0);
 
     const fetchResultFallback = async () => {
         try {
@@ -25,17 +27,44 @@ const AnalyzingProgress = ({ jobId, onComplete, onError, title = "Analyzing Docu
         }
     };
 
+    // After a dropped stream: ask the server where the job is before reconnecting.
+    const checkStatus = async () => {
+        try {
+            const res = await axios.get(`/analyze/status/${jobId}`);
+            const { state, error: jobError } = res.data;
+            if (state === "done") return (await fetchResultFallback()) ? "finished" : "active";
+            if (state === "failed") {
+                doneRef.current = true;
+                const errMsg = jobError || "An error occurred during analysis.";
+                setError(errMsg);
+                if (onError) onError(errMsg);
+                return "finished";
+            }
+            return "active";
+        } catch (err) {
+            if (err.response?.status === 404) {
+                // Unknown job: it may have expired after finishing, so try the result once.
+                if (await fetchResultFallback()) return "finished";
+                doneRef.current = true;
+                setError("This analysis is no longer available. Please submit it again.");
+                return "finished";
+            }
+            return "active"; // server unreachable: keep retrying
+        }
+    };
+
     const openSSE = () => {
         if (doneRef.current) return;
 
         let serverErrorHandled = false;
 
-        const es = new EventSource(`/analyze/stream/${jobId}`);
+        const es = new EventSource(`/analyze/stream/${jobId}?last_event_id=${lastEventIdRef.current}`);
         esRef.current = es;
 
         es.onmessage = async (event) => {
             try {
                 const data = JSON.parse(event.data);
+                if (event.lastEventId) lastEventIdRef.current = Number(event.lastEventId) || lastEventIdRef.current;
 
                 if (data.error) {
                     setError(data.error);
@@ -46,6 +75,12 @@ const AnalyzingProgress = ({ jobId, onComplete, onError, title = "Analyzing Docu
 
                 setProgress(data.progress ?? 0);
                 setStage(data.stage ?? "Processing\u2026");
+                if (data.queue_position != null) {
+                    // Still waiting for a worker: the server's estimate beats the progress-based one.
+                    const wait = data.eta_seconds ?? 0;
+                    setEta(wait > 60 ? `~${Math.floor(wait / 60)}m ${wait % 60}s until start` : `~${wait}s until start`);
+                    setStartTime(Date.now());
+                }
 
                 if (data.progress === 100 && data.stage === "Done") {
                     doneRef.current = true;
@@ -78,8 +113,8 @@ const AnalyzingProgress = ({ jobId, onComplete, onError, title = "Analyzing Docu
         es.onerror = () => {
             if (doneRef.current || serverErrorHandled) return;
             es.close();
-            fetchResultFallback().then((ok) => {
-                if (!ok && !doneRef.current) {
+            checkStatus().then((status) => {
+                if (status === "active" && !doneRef.current) {
                     // Job still running but SSE dropped (tab was backgrounded, network hiccup).
                     // Reconnect after a short delay instead of showing a permanent error.
                     setStage("Reconnecting\u2026");
@@ -94,6 +129,7 @@ const AnalyzingProgress = ({ jobId, onComplete, onError, title = "Analyzing Docu
     useEffect(() => {
         if (!jobId) return;
         doneRef.current = false;
+        lastEventIdRef.current = 0;
         setError(null);
         setProgress(0);
         setStage("Starting\u2026");
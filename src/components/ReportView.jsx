@@ -85,8 +85,9 @@ const ReportView = ({ data, pdfFile, onReset }) => {
             setReportLoading(false);
         }
     };
-    // Decode embedded base64 PDF (no HTTP fetch needed — bypasses IDM entirely)
-    // We prefer the 'source_pdf_base64' (clean doc) so the frontend can draw interactive highlights.
+    // Legacy saved results embedded the PDF as base64; new results reference it by
+    // source_pdf_url (/blobs/<sha256>, served as octet-stream with Range support).
+    // We prefer the clean source doc so the frontend can draw interactive highlights.
     const pdfBytesFromBase64 = useMemo(() => {
         const base64Data = data.source_pdf_base64 || data.highlighted_pdf_base64;
         if (!base64Data) return null;
@@ -108,10 +109,11 @@ const ReportView = ({ data, pdfFile, onReset }) => {
     // Fallback to highlighted_pdf_url for DB-saved results where base64 was stripped.
     const pdfSource = useMemo(() => {
         if (pdfFile) return pdfFile;
+        if (data.source_pdf_url) return { url: data.source_pdf_url };
         if (pdfBytesFromBase64) return { data: pdfBytesFromBase64 };
         if (data.highlighted_pdf_url) return data.highlighted_pdf_url;
         return null;
-    }, [pdfFile, pdfBytesFromBase64, data.highlighted_pdf_url]);
+    }, [pdfFile, data.source_pdf_url, pdfBytesFromBase64, data.highlighted_pdf_url]);
 
 
     const interactiveHighlights = data.highlight_summary?.located_sentences || [];
@@ -253,6 +255,15 @@ const ReportView = ({ data, pdfFile, onReset }) => {
                         <div className="text-sm font-semibold text-slate-800 truncate">{data.filename || 'Document'}</div>
                     </div>
 
+                    {data.cached && (
+                        <span
+                            title="This file was already scanned against the same, unchanged repository; the earlier result is shown."
+                            className="inline-flex items-center px-3 py-1 rounded-full text-xs font-semibold border border-slate-200 bg-slate-50 text-slate-500"
+                        >
+                            Reused earlier scan
+                        </span>
+                    )}
+
                     <span className={`inline-flex items-center gap-1.5 px-3 py-1 rounded-full text-xs font-bold border ${severity.bg} ${severity.color} ${severity.border}`}>
                         <SeverityIcon size={11} />
                         {severity.label}